@@ -8,9 +8,32 @@
 # Author: Alexey Fedoseev <aleksey@fedoseev.net>, 2014
 # -----------------------------------------------------------------------------
 
+import random
+
+import memo
+from submission import validated
+import utils
+
 
 class AbstractModel:
-    def __init__(self, ml, model, team, logger, output):
+    # schema.compile_schema validators, None to keep the params as they are
+    input_params_schema = None
+    model_params_schema = None
+    components_schema = None
+
+    # open intermediate params with random text (utils.percentage_frame),
+    # made by render_volatile_params and never taken from result_cache
+    volatile_params = ()
+
+    # terms of simulate_pre_production kept in term_cache, with the
+    # params every term depends on, the term is computed again only
+    # when one of them changes:
+    # {term: {'input_params': (names), 'model_params': (names),
+    #         'components': (names)}}
+    term_dependencies = {}
+
+    def __init__(self, ml, model, team, logger, output, store=None,
+                 instrumentation=None, result_cache=None, term_cache=None):
         '''
         Parameters:
             ml  model loader instance
@@ -18,6 +41,10 @@ class AbstractModel:
             team    the unique team name
                 logger  model logger
                 output  model output file
+            store   teamstore.TeamArgumentsStore or None
+            instrumentation     instrumentation.Instrumentation or None
+            result_cache    memo.ResultCache for pre_production or None
+            term_cache  memo.ResultCache for term_dependencies or None
         '''
         self.ml = ml
         self.model = model
@@ -25,9 +52,33 @@ class AbstractModel:
         self.ml.check_model(model)
         self.team = team
         self.output = output
+        self.store = store
+        self.instrumentation = instrumentation
+        self.result_cache = result_cache
+        self.term_cache = term_cache
+
+    def _phase(self, phase, method, *args):
+        if self.instrumentation is None:
+            return method(*args)
+        return self.instrumentation.measure(self.model, phase, method, *args,
+                                            logger=self.logger)
+
+    def log_instrumentation(self):
+        '''
+        Write the phases timers and counters of the model to the logger
+        '''
+        if self.instrumentation is not None:
+            self.instrumentation.log(self.logger, self.model)
 
     def team_specific_num(self):
-        return hash(self.team)
+        return utils.stable_hash(self.team)
+
+    def team_random(self, *params):
+        '''
+        The random generator seeded by the model, the team
+        and the params, the same in every process
+        '''
+        return random.Random(utils.stable_hash(self.model, self.team, *params))
 
     def team_arguments(self, input_params):
         '''
@@ -39,9 +90,63 @@ class AbstractModel:
             Random or based on team_specific_num dict
                     {'x': 1, 'y': 2}
         '''
-        self.ml.check_input_params(self.model, input_params)
+        self._phase('team_arguments.check', self.ml.check_input_params,
+                    self.model, input_params)
+        return self._phase('team_arguments.generate',
+                           self._stored_team_arguments, input_params)
+
+    def _stored_team_arguments(self, input_params):
+        if self.store is None:
+            return self.generate_team_arguments(
+                input_params, self.team_random(input_params))
+        return self.store.get_or_create(
+            self.model, self.team, input_params,
+            lambda: self.generate_team_arguments(
+                input_params, self.team_random(input_params)))
+
+    def generate_team_arguments(self, input_params, rng):
+        '''
+        The model specific part of team_arguments, all the randomness
+        must come from rng (random.Random seeded by the team)
+        '''
         return {}
 
+    def validate_input_params(self, input_params):
+        if self.input_params_schema is None:
+            return input_params
+        return validated(input_params, self.input_params_schema)
+
+    def validate_model_params(self, model_params):
+        if self.model_params_schema is None:
+            return model_params
+        return validated(model_params, self.model_params_schema)
+
+    def validate_components(self, components):
+        if self.components_schema is None:
+            return components
+        return validated(components, self.components_schema)
+
+    def validate_pre_production(self, input_params, model_params,
+                                components):
+        '''
+        Return value:
+            clean (input_params, model_params, components)
+        '''
+        return (self.validate_input_params(input_params),
+                self.validate_model_params(model_params),
+                self.validate_components(components))
+
+    def check_pre_production(self, input_params, model_params, components):
+        self.ml.check_input_params(self.model, input_params)
+        self.ml.check_model_params(self.model, model_params)
+        self.ml.check_components(self.model, components)
+
+    def check_production(self, input_params, interm_params,
+                         hidden_params, components):
+        self.ml.check_input_params(self.model, input_params)
+        self.ml.check_interm_params(self.model, interm_params, hidden_params)
+        self.ml.check_components(self.model, components)
+
     def pre_production(self, input_params, model_params, components):
         '''
         Run the pre-production simulation
@@ -62,9 +167,24 @@ class AbstractModel:
             CriticalError - unpredicted
 
         '''
-        self.ml.check_input_params(self.model, input_params)
-        self.ml.check_model_params(self.model, model_params)
-        self.ml.check_components(self.model, components)
+        key = self._result_key(input_params, model_params, components)
+        if key is not None:
+            interm_params = self._cached_pre_production(key)
+            if interm_params is not None:
+                return interm_params
+        self._phase('pre_production.check', self.check_pre_production,
+                    input_params, model_params, components)
+        clean_params = self._phase(
+            'pre_production.validate', self.validate_pre_production,
+            input_params, model_params, components)
+        interm_params = self._phase(
+            'pre_production.simulate', self.simulate_pre_production,
+            *clean_params)
+        self._phase('pre_production.check_interm',
+                    self.ml.check_interm_params, self.model, *interm_params)
+        if key is not None:
+            self._cache_pre_production(key, clean_params, interm_params)
+        return interm_params
 
     def production(self, input_params, interm_params,
                    hidden_params, components):
@@ -88,6 +208,125 @@ class AbstractModel:
             CriticalError - unpredicted
 
         '''
-        self.ml.check_input_params(self.model, input_params)
-        self.ml.check_interm_params(self.model, interm_params, hidden_params)
-        self.ml.check_components(self.model, components)
+        self._phase('production.check', self.check_production,
+                    input_params, interm_params, hidden_params, components)
+        output_params = self._phase(
+            'production.simulate', self.simulate_production,
+            input_params, interm_params, hidden_params, components)
+        self._phase('production.check_output', self.ml.check_output_params,
+                    self.model, output_params)
+        return output_params
+
+    def simulate_pre_production(self, clean_input_params, clean_model_params,
+                                clean_components):
+        '''
+        The model specific part of pre_production, the parameters
+        are already checked by the model loader and validated
+        by validate_pre_production
+        '''
+        raise NotImplementedError
+
+    def render_volatile_params(self, clean_input_params, clean_model_params,
+                               clean_components):
+        '''
+        Make the volatile_params again for a cached result
+        Return value:
+            dict {param: value} of every name in volatile_params
+        '''
+        return {}
+
+    def _result_key(self, input_params, model_params, components):
+        if self.result_cache is None:
+            return None
+        return memo.result_key(self.model, self.team, input_params,
+                               model_params, components)
+
+    def _cached_pre_production(self, key):
+        cached = self.result_cache.get(key)
+        if cached is None:
+            return None
+        clean_params, interm_params = cached
+        if self.volatile_params:
+            interm_params[0].update(self.render_volatile_params(*clean_params))
+        return interm_params
+
+    def _cache_pre_production(self, key, clean_params, interm_params):
+        if self.volatile_params:
+            open_params = dict(
+                (name, value) for name, value in interm_params[0].items()
+                if name not in self.volatile_params)
+            interm_params = (open_params,) + tuple(interm_params[1:])
+        self.result_cache.put(key, (clean_params, interm_params))
+
+    def term(self, name, compute, clean_input_params, clean_model_params,
+             clean_components):
+        '''
+        compute(clean_input_params, clean_model_params, clean_components)
+        or its value cached for the same values of the params
+        the term depends on, term_dependencies[name] lists them
+        by group
+        '''
+        if self.term_cache is None:
+            return compute(clean_input_params, clean_model_params,
+                           clean_components)
+        dependencies = self.term_dependencies[name]
+        key = memo.result_key(self.model, name, [
+            [params.get(param) for param in dependencies.get(group, ())]
+            for group, params in (('input_params', clean_input_params),
+                                  ('model_params', clean_model_params),
+                                  ('components', clean_components))])
+        value = None if key is None else self.term_cache.get(key)
+        if value is None:
+            value = compute(clean_input_params, clean_model_params,
+                            clean_components)
+            if key is not None:
+                self.term_cache.put(key, value)
+        return value
+
+    def simulate_production(self, input_params, interm_params,
+                            hidden_params, components):
+        '''
+        The model specific part of production, the parameters
+        are already checked by the model loader
+        '''
+        return {'quality': hidden_params['quality']}
+
+    def pre_production_batch(self, submissions):
+        '''
+        Run the pre-production simulation for many submissions,
+        every one is checked and simulated as by pre_production and
+        a failed one does not stop the others.
+        Arguments:
+            iterable of (input_params, model_params, components)
+        Return value:
+            list of (interm_params, error) pairs in the submissions order,
+            error is the raised ModelError, the exception of a crash
+            or None
+        '''
+        results = []
+        for params in submissions:
+            try:
+                results.append((self.pre_production(*params), None))
+            except Exception as e:
+                results.append((None, e))
+        return results
+
+    def production_batch(self, submissions):
+        '''
+        Run the production simulation for many submissions,
+        like pre_production_batch
+        Arguments:
+            iterable of
+                (input_params, interm_params, hidden_params, components)
+        Return value:
+            list of (output_params, error) pairs in the submissions order,
+            error is the raised ModelError, the exception of a crash
+            or None
+        '''
+        results = []
+        for params in submissions:
+            try:
+                results.append((self.production(*params), None))
+            except Exception as e:
+                results.append((None, e))
+        return results
@@ -0,0 +1,89 @@
+import unittest
+
+import abstractmodel
+from errors import ModelError
+from mockloader import ANY_MODEL, CountingModelLoader
+import stub
+
+
+class MockModel(abstractmodel.AbstractModel):
+    def __init__(self, ml, team, logger, output):
+        abstractmodel.AbstractModel.__init__(
+            self, ml, self.__class__.__name__, team, logger, output)
+
+    def simulate_pre_production(self, input_params, model_params,
+                                components):
+        if model_params['x'] < 0:
+            raise ModelError('x < 0')
+        return {}, {'quality': model_params['x']}
+
+
+class RejectingModelLoader(CountingModelLoader):
+    '''
+    Rejects the model params with x > 6 like a model loader
+    checking the values
+    '''
+    def check_model_params(self, model, model_params):
+        CountingModelLoader.check_model_params(self, model, model_params)
+        if model_params['x'] > 6:
+            raise ModelError('x > 6')
+
+
+class CheckBatch(unittest.TestCase):
+    def setUp(self):
+        self.ml = CountingModelLoader()
+        self.model = MockModel(self.ml, 'foo', 'logger', 'out')
+
+    def test_pre_production_batch(self):
+        results = self.model.pre_production_batch(
+            [({}, {'x': x}, {}) for x in (3, -1, 5)])
+        self.assertEqual(results[0], (({}, {'quality': 3}), None))
+        self.assertIsNone(results[1][0])
+        self.assertIsInstance(results[1][1], ModelError)
+        self.assertEqual(results[2], (({}, {'quality': 5}), None))
+        # every submission is checked
+        self.assertEqual(self.ml.checks.count('model_params'), 3)
+        self.assertEqual(self.ml.checks.count('interm_params'), 2)
+
+    def test_matches_single(self):
+        model = MockModel(RejectingModelLoader(), 'foo', 'logger', 'out')
+        submissions = [({}, {'x': x}, {}) for x in range(-2, 10)]
+        results = model.pre_production_batch(submissions)
+        for submission, (interm_params, error) in zip(submissions, results):
+            try:
+                single = model.pre_production(*submission)
+            except ModelError as e:
+                self.assertIsNone(interm_params)
+                self.assertIsInstance(error, ModelError)
+                self.assertEqual(error.value, e.value)
+            else:
+                self.assertEqual((interm_params, error), (single, None))
+        self.assertEqual([error.value for _, error in results if error],
+                         ['x < 0', 'x < 0', 'x > 6', 'x > 6', 'x > 6'])
+
+    def test_crash(self):
+        # a crash is kept with its submission, the others are run
+        results = self.model.pre_production_batch(
+            [({}, {'x': 1}, {}), ({}, {}, {}), ({}, {'x': 2}, {})])
+        self.assertEqual(results[0], (({}, {'quality': 1}), None))
+        self.assertIsNone(results[1][0])
+        self.assertIsInstance(results[1][1], KeyError)
+        self.assertEqual(results[2], (({}, {'quality': 2}), None))
+
+    def test_production_batch(self):
+        results = self.model.production_batch(
+            [({}, {}, {'quality': q}, {}) for q in (1, 2)])
+        self.assertEqual(results, [({'quality': 1}, None),
+                                   ({'quality': 2}, None)])
+        self.assertEqual(self.ml.checks.count('output_params'), 2)
+
+    def test_stub(self):
+        # the stub takes any params of the model it stands for
+        model = stub.ITravel(CountingModelLoader({'ITravel': ANY_MODEL}),
+                             'foo', 'logger', 'out')
+        self.assertEqual(model.pre_production_batch([({}, {}, {})]),
+                         [(({}, {'quality': 0}), None)])
+
+
+if __name__ == '__main__':
+    unittest.main()
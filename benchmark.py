@@ -0,0 +1,304 @@
+# -*- coding: UTF-8 -*-
+"""
+Benchmarks of the models hot paths.
+
+Times team_arguments, pre_production and production of every model
+on generated submissions, reports throughput, latency percentiles and
+peak memory and saves them as JSON. The parameters are checked by
+mockloader.MockModelLoader, as they would be by the real loader:
+
+    python benchmark.py --sizes 1 1000 100000 --output bench.json
+    python benchmark.py --compare old.json --output new.json
+"""
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+import numpy
+
+from chem1 import OxygenRegeneration
+from chem2 import RocketFuel, FUEL_RECIPES
+from errors import ModelError
+from globalnav import GlobalNav
+from itravel import ITravel
+from mockloader import MockModelLoader
+from security import Security
+
+PHASES = ('team_arguments', 'pre_production', 'production')
+SIZES = (1, 1000, 100000)
+TEAMS = 500
+PERCENTILES = (50, 90, 99)
+
+
+def noisy(value, rng, spread=.1):
+    return str(value * (1 + rng.uniform(-spread, spread)))
+
+
+def oxygen_regeneration_submission(model, rng):
+    input_params = {'n': str(rng.randint(1, 5)), 't': str(rng.randint(1, 48))}
+    team_args = model.team_arguments(input_params)
+    model_params = {
+        'peroxide_name': rng.choice(['KO2', 'NaO2', 'LiO']),
+        'peroxide_weight': noisy(10, rng),
+        'carbon_dioxide_absorption': noisy(200, rng, .5),
+        'oxygen_allocation': noisy(250, rng, .5),
+        'electricity_amount': noisy(
+            17232 * team_args['oxygen_volume_required'], rng),
+        'peroxide_impurities': str(team_args['peroxide_impurities']),
+        'oxygen_volume_required': str(team_args['oxygen_volume_required'])}
+    components = {'water_quality': str(rng.randint(50, 99))}
+    return input_params, model_params, components
+
+
+def rocket_fuel_submission(model, rng):
+    recipe = rng.choice(FUEL_RECIPES)
+    model_params = {
+        'oxidizer': recipe[0],
+        'fuel': recipe[1],
+        'combustion_heat': noisy(recipe[2], rng),
+        'radicals_amount': noisy(.5, rng, .5)}
+    return {}, model_params, {}
+
+
+def global_nav_submission(model, rng):
+    input_params = {'revolution_period': str(rng.randint(90, 1500)),
+                    'orbital_inclination': str(rng.randint(1, 89))}
+    team_args = model.team_arguments(input_params)
+    model_params = {
+        'orbit_radius': noisy(7000, rng),
+        'pos_crit_accel': noisy(8, rng),
+        'neg_crit_accel': noisy(9, rng),
+        'permissible_variation': str(team_args['permissible_variation'])}
+    components = {'critical_errors_control': 'True',
+                  'security_quality': str(rng.randint(0, 20))}
+    return input_params, model_params, components
+
+
+def itravel_submission(model, rng):
+    input_params = {'dimensions': rng.choice(['2D', '3D']),
+                    'device_class': 'tourist'}
+    team_args = model.team_arguments(input_params)
+    model_params = {name: json.dumps(val) for name, val in team_args.items()}
+    model_params.update({'vector_length': noisy(100, rng, .5),
+                         'alpha_x': noisy(45, rng),
+                         'beta_y': noisy(45, rng),
+                         'gamma_z': noisy(45, rng)})
+    components = {'critical_errors_control': 'True',
+                  'security_quality': str(rng.randint(0, 20)),
+                  'capacitor_quality': str(rng.randint(0, 20)),
+                  'power_capacity': rng.choice(['2000-4000', '4000-8000'])}
+    return input_params, model_params, components
+
+
+def security_submission(model, rng):
+    input_params = {'error_control': 'False'}
+    team_args = model.team_arguments(input_params)
+    model_params = dict(
+        (name, team_args[name])
+        for name in ('user_point', 'first_key', 'second_key', 'u_domain'))
+    model_params.update({'psi': noisy(100, rng, .9),
+                         'u': noisy(100, rng, .9),
+                         'phi': noisy(100, rng, .9)})
+    return input_params, model_params, {}
+
+
+MODELS = (
+    (OxygenRegeneration, oxygen_regeneration_submission),
+    (RocketFuel, rocket_fuel_submission),
+    (GlobalNav, global_nav_submission),
+    (ITravel, itravel_submission),
+    (Security, security_submission))
+
+
+def make_submissions(model_class, make_submission, size, ml, seed=0):
+    '''
+    Return value:
+        list of (model, input_params, model_params, components),
+        one model per team
+    '''
+    rng = random.Random(seed)
+    models = {}
+    submissions = []
+    for i in range(size):
+        team = 'team{}'.format(i % TEAMS)
+        if team not in models:
+            models[team] = model_class(ml, team, None, None)
+        model = models[team]
+        submissions.append((model,) + make_submission(model, rng))
+    return submissions
+
+
+def phase_calls(phase, submissions):
+    '''
+    Return value:
+        list of (bound method, args) to be timed
+    '''
+    if phase == 'team_arguments':
+        return [(model.team_arguments, (input_params,))
+                for model, input_params, _, _ in submissions]
+    if phase == 'pre_production':
+        return [(model.pre_production,
+                 (input_params, model_params, components))
+                for model, input_params, model_params, components
+                in submissions]
+    calls = []
+    for model, input_params, model_params, components in submissions:
+        try:
+            interm_params, hidden_params = model.pre_production(
+                input_params, model_params, components)
+        except ModelError:
+            continue
+        calls.append((model.production,
+                      (input_params, interm_params, hidden_params,
+                       components)))
+    return calls
+
+
+def run_calls(calls):
+    '''
+    Return value:
+        (latencies in seconds, ModelError count, other errors count)
+    '''
+    latencies = numpy.empty(len(calls))
+    model_errors = errors = 0
+    perf_counter = time.perf_counter
+    for i, (method, args) in enumerate(calls):
+        start = perf_counter()
+        try:
+            method(*args)
+        except ModelError:
+            model_errors += 1
+        except Exception:
+            errors += 1
+        latencies[i] = perf_counter() - start
+    return latencies, model_errors, errors
+
+
+def peak_memory(calls):
+    tracemalloc.start()
+    try:
+        run_calls(calls)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def benchmark(sizes=SIZES, phases=PHASES, models=MODELS, memory=True,
+              ml=None):
+    ml = ml or MockModelLoader()
+    results = []
+    for model_class, make_submission in models:
+        for size in sizes:
+            submissions = make_submissions(
+                model_class, make_submission, size, ml)
+            for phase in phases:
+                calls = phase_calls(phase, submissions)
+                latencies, model_errors, errors = run_calls(calls)
+                total = float(latencies.sum())
+                result = {
+                    'model': model_class.__name__,
+                    'phase': phase,
+                    'size': size,
+                    'calls': len(calls),
+                    'model_errors': model_errors,
+                    'errors': errors,
+                    'seconds': total,
+                    'throughput': len(calls) / total if total else None,
+                    'latency': dict(
+                        ('p{}'.format(p),
+                         float(numpy.percentile(latencies, p))
+                         if len(calls) else None)
+                        for p in PERCENTILES)}
+                # None (null) when the memory is not tracked, not a 0
+                # looking like a measurement
+                result['peak_memory'] = peak_memory(calls) if memory else None
+                results.append(result)
+    return {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'numpy': numpy.__version__,
+        'results': results}
+
+
+def compare(old, new, tolerance=.2):
+    '''
+    Find the throughput regressions bigger than tolerance
+    Return value:
+        list of (model, phase, size, old throughput, new throughput)
+    '''
+    old_results = dict(((r['model'], r['phase'], r['size']), r['throughput'])
+                       for r in old['results'])
+    regressions = []
+    for r in new['results']:
+        key = r['model'], r['phase'], r['size']
+        old_throughput = old_results.get(key)
+        if (old_throughput and r['throughput'] is not None and
+                r['throughput'] < old_throughput * (1 - tolerance)):
+            regressions.append(key + (old_throughput, r['throughput']))
+    return regressions
+
+
+def memory_text(peak_memory):
+    if peak_memory is None:
+        return 'n/a'
+    return '{:.1f}'.format(peak_memory / 1024.)
+
+
+def report(results, stream=sys.stdout):
+    stream.write('{:<20} {:<16} {:>7} {:>12} {:>10} {:>10} {:>10} {:>12} '
+                 '{:>7}\n'.format('model', 'phase', 'size', 'calls/s',
+                                  'p50 us', 'p90 us', 'p99 us',
+                                  'peak KiB', 'errors'))
+    for r in results['results']:
+        latency = dict((k, (v or 0) * 1e6) for k, v in r['latency'].items())
+        stream.write(
+            '{model:<20} {phase:<16} {size:>7} {throughput:>12.0f} '
+            '{p50:>10.1f} {p90:>10.1f} {p99:>10.1f} {memory:>12} '
+            '{errors:>7}\n'.format(
+                throughput=r['throughput'] or 0,
+                memory=memory_text(r.get('peak_memory')),
+                errors=r['model_errors'] + r['errors'],
+                model=r['model'], phase=r['phase'], size=r['size'],
+                **latency))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES)
+    parser.add_argument('--models', nargs='+',
+                        help='model class names, all by default')
+    parser.add_argument('--phases', nargs='+', default=PHASES,
+                        choices=PHASES)
+    parser.add_argument('--no-memory', action='store_true',
+                        help='skip the peak memory pass')
+    parser.add_argument('--output', help='JSON file for the results')
+    parser.add_argument('--compare', help='JSON results of the older run')
+    parser.add_argument('--tolerance', type=float, default=.2,
+                        help='allowed throughput drop, 0.2 is 20%%')
+    args = parser.parse_args(argv)
+
+    models = [m for m in MODELS
+              if not args.models or m[0].__name__ in args.models]
+    results = benchmark(args.sizes, args.phases, models,
+                        memory=not args.no_memory)
+    report(results)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(json.load(f), results, args.tolerance)
+        for model, phase, size, old, new in regressions:
+            sys.stdout.write(
+                'REGRESSION {} {} {}: {:.0f} -> {:.0f} calls/s\n'.format(
+                    model, phase, size, old, new))
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,37 @@
+import io
+import unittest
+
+import benchmark
+
+
+class CheckBenchmark(unittest.TestCase):
+    def test_benchmark(self):
+        results = benchmark.benchmark(sizes=(3,))
+        self.assertEqual(len(results['results']),
+                         len(benchmark.MODELS) * len(benchmark.PHASES))
+        for r in results['results']:
+            self.assertEqual(r['errors'], 0)
+            self.assertGreater(r['peak_memory'], 0)
+            self.assertEqual(sorted(r['latency']), ['p50', 'p90', 'p99'])
+
+    def test_no_memory(self):
+        results = benchmark.benchmark(
+            sizes=(1,), phases=('team_arguments',),
+            models=benchmark.MODELS[:1], memory=False)
+        self.assertIsNone(results['results'][0]['peak_memory'])
+        stream = io.StringIO()
+        benchmark.report(results, stream)
+        self.assertIn(' n/a ', stream.getvalue().splitlines()[1])
+
+    def test_compare(self):
+        old = {'results': [{'model': 'M', 'phase': 'p', 'size': 1,
+                            'throughput': 100.}]}
+        new = {'results': [{'model': 'M', 'phase': 'p', 'size': 1,
+                            'throughput': 70.}]}
+        self.assertEqual(benchmark.compare(old, new),
+                         [('M', 'p', 1, 100., 70.)])
+        self.assertEqual(benchmark.compare(old, new, tolerance=.5), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
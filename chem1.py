@@ -1,8 +1,11 @@
+import functools
 import json
 import random
 
+import numpy
+
 from abstractmodel import AbstractModel
-from errors import ModelError
+from schema import compile_schema, Field, keep
 import utils
 
 
@@ -10,8 +13,23 @@ PEROXIDES = [{'name': 'KO2', 'q1': 157.75, 'q2': 80.55, 'q3': 236.62},
              {'name': 'NaO2', 'q1': 203.64, 'q2': 157.7, 'q3': 305.45},
              {'name': 'LiO', 'q1': 486.96, 'q2': 259.71, 'q3': 243.48}]
 
+IMPURITY_LEVELS = 10
+
 PEROXIDE_TO_QUALITY = {0: 25, 1: 15, 2: 10}
-DIFFERENCE_TO_QUALITY = [(5, 25), (10, 20), (20, 15), (25, 10), (50, 5)]
+DIFFERENCE_TO_QUALITY = utils.compile_quality(
+    [(5, 25), (10, 20), (20, 15), (25, 10), (50, 5)])
+
+
+def percents(param):
+    # !!!IMPORTANT!!!
+    # I assume that water_quality is in [0;100] diapason.
+    # If it is in [0;1] just use utils.to_float instead and change
+    # the ModelError text.
+    return utils.to_float(param) / 100
+
+
+def peroxide_impurities(param):
+    return json.loads(param.replace("'", '"'))
 
 
 class Peroxide(object):
@@ -27,8 +45,8 @@ class Peroxide(object):
             self._specific_oxygen_allocation_volume(q3))
 
     @staticmethod
-    def _random_impurity_factor():
-        return random.randrange(1, 11) * 0.01
+    def _random_impurity_factor(rng=random):
+        return rng.randrange(1, IMPURITY_LEVELS + 1) * 0.01
 
     def _specific_carbon_dioxide_absorption_volume(self, q1, q2):
         return q1 + (q2 * self.impurity_factor)
@@ -37,20 +55,150 @@ class Peroxide(object):
         return q3 * (1 - self.impurity_factor)
 
 
+class PeroxideTable(object):
+    '''
+    Specific volumes of every peroxide at every impurity factor
+    Peroxide._random_impurity_factor gives and the oxygen allocation rank
+    of every peroxide for every combination of the impurity factors
+    '''
+    def __init__(self, peroxides):
+        self.names = [p['name'] for p in peroxides]
+        self.factors = numpy.arange(1, IMPURITY_LEVELS + 1) * 0.01
+        q = numpy.array([[p['q1'], p['q2'], p['q3']] for p in peroxides])
+        # (peroxide, impurity level), the same sums and products as
+        # Peroxide does, so the values are equal to the last bit
+        self.absorption = q[:, :1] + q[:, 1:2] * self.factors
+        self.allocation = q[:, 2:] * (1 - self.factors)
+
+        count = len(peroxides)
+        levels = numpy.indices((IMPURITY_LEVELS,) * count)
+        allocations = numpy.stack(
+            [self.allocation[i][levels[i]] for i in range(count)], axis=-1)
+        # stable like sorted(..., reverse=True) in the closed form
+        order = numpy.argsort(-allocations, axis=-1, kind='stable')
+        self.rank = numpy.empty(order.shape, dtype=numpy.int8)
+        ranks = numpy.arange(count, dtype=numpy.int8)
+        numpy.put_along_axis(self.rank, order,
+                             ranks.reshape((1,) * count + (-1,)), axis=-1)
+        # shared by all the models of the process
+        for table in (self.absorption, self.allocation, self.rank):
+            table.flags.writeable = False
+
+    def levels(self, impurities):
+        '''
+        Arguments:
+            impurities - {peroxide name: impurity factor}
+        Return value:
+            tuple of impurity levels in PEROXIDES order or None
+            if some factor is not in the table
+        '''
+        levels = []
+        for name in self.names:
+            factor = impurities[name]
+            level = int(round(factor * 100)) - 1
+            if not 0 <= level < IMPURITY_LEVELS or \
+                    self.factors[level] != factor:
+                return None
+            levels.append(level)
+        return tuple(levels)
+
+    def lookup(self, impurities, peroxide_name):
+        '''
+        Return value:
+            (specific carbon dioxide absorption volume,
+             specific oxygen allocation volume,
+             oxygen allocation rank) of the peroxide or None
+            if some impurity factor is not in the table
+        '''
+        levels = self.levels(impurities)
+        if levels is None:
+            return None
+        i = self.names.index(peroxide_name)
+        return (float(self.absorption[i, levels[i]]),
+                float(self.allocation[i, levels[i]]),
+                int(self.rank[levels + (i,)]))
+
+
+@functools.lru_cache(maxsize=None)
+def peroxide_table():
+    '''
+    The PeroxideTable of PEROXIDES, built on the first call
+    '''
+    return PeroxideTable(PEROXIDES)
+
+
 class OxygenRegeneration(AbstractModel):
-    def __init__(self, ml, team, logger, output):
+    input_params_schema = compile_schema(
+        Field('n', utils.to_int, low=0,
+              message='Количество человек не может быть меньше 0.'),
+        Field('t', low=0,
+              message='Время работы не может быть меньше 0.'))
+    model_params_schema = compile_schema(
+        Field('peroxide_name', keep, choices=[p['name'] for p in PEROXIDES],
+              message='Выбранный вами пероксид не существует.'),
+        Field('peroxide_weight', low=0, message=(
+            'Рассчетное значение массы пероксида не может быть ниже 0.')),
+        Field('carbon_dioxide_absorption', low=0, message=(
+            'Рассчетное значение удельного поглощения углекислого газа'
+            ' не может быть ниже 0.')),
+        Field('oxygen_allocation', low=0, message=(
+            'Рассчетное значение удельного выделения кислорода'
+            ' не может быть ниже 0.')),
+        Field('electricity_amount', low=0, message=(
+            'Рассчетное значение необходимой электроэнергии'
+            ' не может быть ниже 0.')),
+        Field('peroxide_impurities', peroxide_impurities),
+        Field('oxygen_volume_required'))
+    components_schema = compile_schema(
+        Field('water_quality', percents, low=0, high=1, strict=True, message=(
+            'Качество воды должно лежать в диапазоне [0;100] процентов.')))
+
+    volatile_params = ('real_oxygen_allocation',
+                       'real_carbon_dioxide_absorption')
+
+    term_dependencies = {
+        'peroxide': {
+            'model_params': ('peroxide_impurities', 'peroxide_name',
+                             'carbon_dioxide_absorption',
+                             'oxygen_allocation')},
+        'electricity': {
+            'input_params': ('n', 't'),
+            'model_params': ('electricity_amount',)}}
+
+    def __init__(self, ml, team, logger, output, **kwargs):
         AbstractModel.__init__(self, ml, self.__class__.__name__,
-                               team, logger, output)
+                               team, logger, output, **kwargs)
 
     def chosen_peroxide(self, peroxides, peroxide_name):
-        return filter(lambda p: p.name == peroxide_name, peroxides)[0]
+        return next(p for p in peroxides if p.name == peroxide_name)
 
-    def check_peroxide(self, peroxides, peroxide_name):
+    def peroxide_rank(self, peroxides, peroxide_name):
         sorted_peroxide_names = [p.name for p in sorted(
             peroxides,
             key=lambda p: p.specific_oxygen_allocation_volume,
             reverse=True)]
-        return PEROXIDE_TO_QUALITY[sorted_peroxide_names.index(peroxide_name)]
+        return sorted_peroxide_names.index(peroxide_name)
+
+    def peroxide_volumes(self, impurities, peroxide_name):
+        '''
+        Return value:
+            (specific carbon dioxide absorption volume,
+             specific oxygen allocation volume,
+             oxygen allocation rank) of the chosen peroxide
+        '''
+        volumes = peroxide_table().lookup(impurities, peroxide_name)
+        if volumes is not None:
+            return volumes
+        # impurity factors the team arguments never give
+        peroxides = [Peroxide(impurity_factor=impurities[p['name']], **p)
+                     for p in PEROXIDES]
+        the_peroxide = self.chosen_peroxide(peroxides, peroxide_name)
+        return (the_peroxide.specific_carbon_dioxide_absorption_volume,
+                the_peroxide.specific_oxygen_allocation_volume,
+                self.peroxide_rank(peroxides, peroxide_name))
+
+    def check_peroxide(self, rank):
+        return PEROXIDE_TO_QUALITY[rank]
 
     @staticmethod
     def electricity_needed(oxygen_volume):
@@ -60,85 +208,72 @@ class OxygenRegeneration(AbstractModel):
     def oxygen_volume(men_count, time_hours):
         return 50 * men_count * time_hours
 
-    def check_carbon_dioxide_absorption(self, the_peroxide, absorption_volume):
+    def check_carbon_dioxide_absorption(self, real_volume, absorption_volume):
         return utils.quality_by_precision(
-            the_peroxide.specific_carbon_dioxide_absorption_volume,
-            absorption_volume,
-            DIFFERENCE_TO_QUALITY)
+            real_volume, absorption_volume, DIFFERENCE_TO_QUALITY)
 
-    def check_oxygen_allocation(self, the_peroxide, allocation_volume):
+    def check_oxygen_allocation(self, real_volume, allocation_volume):
         return utils.quality_by_precision(
-            the_peroxide.specific_oxygen_allocation_volume,
-            allocation_volume,
-            DIFFERENCE_TO_QUALITY)
+            real_volume, allocation_volume, DIFFERENCE_TO_QUALITY)
 
     def check_electricity_amount(self, computed_amount,
                                  player_amount, water_quality):
-        precision_quality = utils.quality_by_precision(
+        return self.electricity_precision(
+            computed_amount, player_amount) * water_quality ** 2
+
+    def electricity_precision(self, computed_amount, player_amount):
+        return utils.quality_by_precision(
             computed_amount, player_amount, DIFFERENCE_TO_QUALITY)
-        return precision_quality * water_quality ** 2
 
-    def validate_input_params(self, input_params):
-        oxygen_volume = utils.to_float(input_params['oxygen_volume'])
-        if oxygen_volume < 0:
-            raise ModelError('Требуемый объем кислорода не может быть '
-                             'меньше 0.')
-        return {
-            'oxygen_volume': oxygen_volume
-        }
-
-    def validate_model_params(self, model_params):
-        if utils.to_float(
-                model_params['carbon_dioxide_absorption']) < 0:
-            raise ModelError(
-                'Рассчетное значение удельного поглощения углекислого газа'
-                ' не может быть ниже 0.')
-        if utils.to_float(
-                model_params['oxygen_allocation']) < 0:
-            raise ModelError(
-                'Рассчетное значение удельного выделения кислорода'
-                ' не может быть ниже 0.')
-        if utils.to_float(
-                model_params['electricity_amount']) < 0:
-            raise ModelError(
-                'Рассчетное значение необходимой электроэнергии'
-                ' не может быть ниже 0.')
-        if utils.to_float(model_params['peroxide_weight']) < 0:
-            raise ModelError(
-                'Рассчетное значение массы пероксида не может быть ниже 0.')
+    def peroxide_term(self, clean_input_params, clean_model_params,
+                      clean_components):
+        '''
+        The quality of the peroxide choice and its volumes
+        '''
+        absorption_volume, allocation_volume, rank = self.peroxide_volumes(
+            clean_model_params['peroxide_impurities'],
+            clean_model_params['peroxide_name'])
+        quality = self.check_peroxide(rank)
+        quality += self.check_carbon_dioxide_absorption(
+            absorption_volume, clean_model_params['carbon_dioxide_absorption'])
+        quality += self.check_oxygen_allocation(
+            allocation_volume, clean_model_params['oxygen_allocation'])
+        return quality
+
+    def electricity_term(self, clean_input_params, clean_model_params,
+                         clean_components):
+        '''
+        The precision of the electricity amount, before the water quality
+        '''
+        oxygen_volume_required = self.oxygen_volume(
+            clean_input_params['n'], clean_input_params['t'])
+        return self.electricity_precision(
+            self.electricity_needed(oxygen_volume_required),
+            clean_model_params['electricity_amount'])
+
+    def render_volatile_params(self, clean_input_params, clean_model_params,
+                               clean_components):
+        absorption_volume, allocation_volume, _ = self.peroxide_volumes(
+            clean_model_params['peroxide_impurities'],
+            clean_model_params['peroxide_name'])
+        # the same submission gets the same frames
+        rng = self.team_random(
+            clean_input_params, clean_model_params, clean_components)
+        oxygen_allocation_text = ' '.join(
+            ['Полученное при испытаниях удельное выделение кислорода:',
+             utils.percentage_frame(allocation_volume, rng=rng)])
+        carbon_dioxide_absorption_text = ' '.join(
+            ['Полученное при испытаниях удельное поглощение углекислого газа:',
+             utils.percentage_frame(absorption_volume, rng=rng)])
         return {
-            'peroxide_name': model_params['peroxide_name'],
-            'peroxide_weight': utils.to_float(
-                model_params['peroxide_weight']),
-            'carbon_dioxide_absorption': utils.to_float(
-                model_params['carbon_dioxide_absorption']),
-            'oxygen_allocation': utils.to_float(
-                model_params['oxygen_allocation']),
-            'electricity_amount': utils.to_float(
-                model_params['electricity_amount']),
-            'peroxide_impurities': json.loads(
-                model_params['peroxide_impurities'].replace("'", '"')),
-            'oxygen_volume_required': utils.to_float(
-                model_params['oxygen_volume_required'])
-        }
-
-    def validate_components(self, components):
-        water_quality = utils.to_float(components['water_quality'])
-
-        # !!!IMPORTANT!!!
-        # I assume that water_quality is in [0;100] diapason.
-        # If it is in [0;1] just comment next line and change
-        # the ModelError text.
-        water_quality /= 100
-        if not (0 < water_quality < 1):
-            raise ModelError(
-                'Качество воды должно лежать в диапазоне [0;100] процентов.')
-        return {'water_quality': water_quality}
-
-    def team_arguments(self, input_params):
-        AbstractModel.team_arguments(self, input_params)
-
-        peroxides = [Peroxide(**p) for p in PEROXIDES]
+            'real_oxygen_allocation': oxygen_allocation_text,
+            'real_carbon_dioxide_absorption': carbon_dioxide_absorption_text}
+
+    def generate_team_arguments(self, input_params, rng):
+        peroxides = [
+            Peroxide(impurity_factor=Peroxide._random_impurity_factor(rng),
+                     **p)
+            for p in PEROXIDES]
 
         clean_input_params = self.validate_input_params(input_params)
         peroxide_impurities = {p.name: p.impurity_factor
@@ -148,10 +283,12 @@ class OxygenRegeneration(AbstractModel):
         return {'peroxide_impurities': peroxide_impurities,
                 'oxygen_volume_required': oxygen_volume_required}
 
-    def pre_production(self, input_params, model_params, components):
+    def simulate_pre_production(self, clean_input_params, clean_model_params,
+                                clean_components):
         '''
             input_params:
-                oxygen_volume - oxygen volume required
+                n - men count
+                t - time in hours
             model_params:
                 peroxide_name - name of the chosen peroxide
                 peroxide_weight
@@ -166,53 +303,15 @@ class OxygenRegeneration(AbstractModel):
                 chlorine_concentration
                 water_quality
         '''
-        AbstractModel.pre_production(
-            self, input_params, model_params, components)
-
-        clean_input_params = self.validate_input_params(input_params)
-        clean_model_params = self.validate_model_params(model_params)
-        clean_components = self.validate_components(components)
-
-        peroxides = [
-            Peroxide(clean_model_params['peroxide_impurities'][p.name], **p)
-            for p in PEROXIDES]
-
-        the_peroxide = self.chosen_peroxide(
-            peroxides, clean_model_params['peroxide_name'])
-        oxygen_volume_required = self.oxygen_volume(  # noqa
-            clean_input_params['n'], clean_input_params['t'])
-        quality = self.check_peroxide(
-            peroxides, clean_model_params['peroxide_name'])
-        quality += self.check_carbon_dioxide_absorption(
-            the_peroxide, clean_model_params['carbon_dioxide_absorption'])
-        quality += self.check_oxygen_allocation(
-            the_peroxide, clean_model_params['oxygen_allocation'])
-        quality += self.check_electricity_amount(
-            self.electricity_needed(oxygen_volume_required),
-            clean_model_params['electricity_amount'],
-            clean_components['water_quality'])
-
-        oxygen_allocation_text = ' '.join(
-            ['Полученное при испытаниях удельное выделение кислорода:',
-             utils.percentage_frame(
-                 the_peroxide.specific_oxygen_allocation_volume)])
-        carbon_dioxide_absorption_text = ' '.join(
-            ['Полученное при испытаниях удельное поглощение углекислого газа:',
-             utils.percentage_frame(
-                 the_peroxide.specific_carbon_dioxide_absorption_volume)])
+        clean_params = clean_input_params, clean_model_params, clean_components
+        quality = self.term('peroxide', self.peroxide_term, *clean_params)
+        quality += self.term(
+            'electricity', self.electricity_term,
+            *clean_params) * clean_components['water_quality'] ** 2
 
         interm_params = (
-            {'real_oxygen_allocation': oxygen_allocation_text,
-             'real_carbon_dioxide_absorption': carbon_dioxide_absorption_text},
+            self.render_volatile_params(
+                clean_input_params, clean_model_params, clean_components),
             {'quality': quality})
 
-        self.ml.check_interm_params(self.model, *interm_params)
         return interm_params
-
-    def production(self, input_params, interm_params,
-                   hidden_params, components):
-        AbstractModel.production(
-            self, input_params, interm_params, hidden_params, components)
-        output_params = {'quality': hidden_params['quality']}
-        self.ml.check_output_params(self.model, output_params)
-        return output_params
@@ -1,6 +1,7 @@
 import unittest
 
 import chem1
+from mockloader import ANY_MODEL, MockModelLoader
 
 
 class MockPeroxide(chem1.Peroxide):
@@ -39,26 +40,38 @@ class CheckPeroxide(unittest.TestCase):
             self.test_peroxide._specific_oxygen_allocation_volume(25), 24.75)
 
 
-class MockML(object):
-    def check_model(self, model):
-        pass
-
-    def check_input_params(self, model, input_params):
-        pass
-
-    def check_model_params(self, model, model_params):
-        pass
-
-    def check_components(self, model, components):
-        pass
-
-    def check_interm_params(self, model, interm_params, hidden_params):
-        pass
+class CheckPeroxideTable(unittest.TestCase):
+    def test_closed_form(self):
+        regenerator = chem1.OxygenRegeneration.__new__(
+            chem1.OxygenRegeneration)
+        for levels in ((1, 1, 1), (3, 7, 10), (10, 1, 5), (10, 10, 10)):
+            impurities = dict((p['name'], level * 0.01)
+                              for p, level in zip(chem1.PEROXIDES, levels))
+            peroxides = [
+                chem1.Peroxide(impurity_factor=impurities[p['name']], **p)
+                for p in chem1.PEROXIDES]
+            for p in peroxides:
+                self.assertEqual(
+                    chem1.peroxide_table().lookup(impurities, p.name),
+                    (p.specific_carbon_dioxide_absorption_volume,
+                     p.specific_oxygen_allocation_volume,
+                     regenerator.peroxide_rank(peroxides, p.name)))
+
+    def test_not_in_table(self):
+        impurities = {'KO2': 0.015, 'NaO2': 0.01, 'LiO': 0.01}
+        self.assertIsNone(chem1.peroxide_table().lookup(impurities, 'KO2'))
+        regenerator = chem1.OxygenRegeneration.__new__(
+            chem1.OxygenRegeneration)
+        absorption, allocation, rank = regenerator.peroxide_volumes(
+            impurities, 'KO2')
+        self.assertAlmostEqual(absorption, 157.75 + 80.55 * 0.015)
+        self.assertAlmostEqual(allocation, 236.62 * 0.985)
+        self.assertEqual(rank, 2)
 
 
 class CheckOxygenRegeneration(unittest.TestCase):
     def setUp(self):
-        mock_ml = MockML()
+        mock_ml = MockModelLoader({'OxygenRegeneration': ANY_MODEL})
         self.regenerator = chem1.OxygenRegeneration(
             mock_ml, 'foo', 'logger', 'out')
 
@@ -1,7 +1,9 @@
-import random
+from collections import namedtuple
+from types import MappingProxyType
 
 from abstractmodel import AbstractModel
 from errors import ModelError
+from schema import compile_schema, Field, keep
 import utils
 
 # For reference
@@ -19,70 +21,83 @@ FUEL_RECIPES = (
 RATE_AND_RADICALS = (
     (0.2349, 0.56), (0.4355, 0.7), (0.1284, 0.45), (0.0683, 0.325),
     (0.3646, 0.65), (0.2522, 0.6), (0.1457, 0.47), (0.5686, 0.75))
+HEAT_QUALITY = utils.compile_quality([(5, 40), (10, 30), (20, 15)])
+RADICALS_QUALITY = utils.compile_quality(
+    [(5, 30), (10, 25), (20, 20), (25, 15), (50, 5)])
 
 
-class BlendedFuel(object):
-    def __init__(self, oxidizer, fuel, combustion_heat, quality, density,
-                 chamber_temperature, rate_constant, radicals_amount):
-        self.oxidizer = oxidizer
-        self.fuel = fuel
-        self.combustion_heat = combustion_heat
-        self.quality = quality
-        self.density = density
-        self.chamber_temperature = chamber_temperature
-        self.rate_constant = rate_constant
-        self.radicals_amount = radicals_amount
+BlendedFuel = namedtuple('BlendedFuel', (
+    'oxidizer', 'fuel', 'combustion_heat', 'quality', 'density',
+    'chamber_temperature', 'rate_constant', 'radicals_amount'))
+
+
+def blend_index(rate_and_radicals):
+    '''
+    Mix the recipes with the rate constants and radicals amounts
+    Return value:
+        read-only {(oxidizer, fuel): BlendedFuel}
+    '''
+    return MappingProxyType(dict(
+        (recipe[:2], BlendedFuel(*(recipe + rate_and_radical)))
+        for recipe, rate_and_radical in zip(FUEL_RECIPES, rate_and_radicals)))
 
 
 class RocketFuel(AbstractModel):
-    def __init__(self, ml, team, logger, output):
+    model_params_schema = compile_schema(
+        Field('oxidizer', keep),
+        Field('fuel', keep),
+        Field('combustion_heat', low=0, message=(
+            "Рассчетное значение теплоты сгорания"
+            " не может быть ниже 0.")),
+        Field('radicals_amount', low=0, message=(
+            "Рассчетное значение образования свободных радикалов"
+            " не может быть ниже 0.")))
+
+    volatile_params = ('combustion_heat',)
+
+    def __init__(self, ml, team, logger, output, **kwargs):
         AbstractModel.__init__(self, ml, self.__class__.__name__,
-                               team, logger, output)
-        random.shuffle(RATE_AND_RADICALS)
-        random_recipe_mix = map(lambda x: x[0] + x[1],
-                                zip(FUEL_RECIPES, RATE_AND_RADICALS))
-        self.fuel_types = [BlendedFuel(*r) for r in random_recipe_mix]
+                               team, logger, output, **kwargs)
+        rate_and_radicals = list(RATE_AND_RADICALS)
+        self.team_random().shuffle(rate_and_radicals)
+        self.blends = blend_index(rate_and_radicals)
 
     def chosen_blend(self, oxidizer, fuel):
-        return filter(lambda f: f.oxidizer == oxidizer and f.fuel == fuel,
-                      self.fuel_types)[0]
+        return self.blends[(oxidizer, fuel)]
 
     def check_heat(self, the_blend, heat):
-        QUALITY = [(5, 40), (10, 30), (20, 15)]
         return utils.quality_by_precision(
-            the_blend.combustion_heat, heat, QUALITY)
+            the_blend.combustion_heat, heat, HEAT_QUALITY)
 
     def check_radicals(self, the_blend, radicals):
-        QUALITY = [(5, 30), (10, 25), (20, 20), (25, 15), (50, 5)]
         return utils.quality_by_precision(
-            the_blend.radicals_amount, radicals, QUALITY)
+            the_blend.radicals_amount, radicals, RADICALS_QUALITY)
 
     def validate_model_params(self, model_params):
         blend = model_params['oxidizer'], model_params['fuel']
-        if blend not in FUEL_RECIPES:
+        if blend not in self.blends:
             raise ModelError(
                 "Выбранная вами топливная смесь непригодна"
                 " для использования в ракетном двигателе.")
-        if utils.to_float(model_params['combustion_heat']) < 0:
-            raise ModelError(
-                "Рассчетное значение теплоты сгорания"
-                " не может быть ниже 0.")
-        if utils.to_float(model_params['radicals_amount']) < 0:
-            raise ModelError(
-                "Рассчетное значение образования свободных радикалов"
-                " не может быть ниже 0.")
+        return AbstractModel.validate_model_params(self, model_params)
 
-        return {
-            'oxidizer': model_params['oxidizer'],
-            'fuel': model_params['fuel'],
-            'combustion_heat': utils.to_float(model_params['combustion_heat']),
-            'radicals_amount': utils.to_float(model_params['radicals_amount'])
-        }
+    def render_volatile_params(self, clean_input_params, clean_model_params,
+                               clean_components):
+        the_blend = self.chosen_blend(
+            clean_model_params['oxidizer'], clean_model_params['fuel'])
+        # the same submission gets the same frame
+        rng = self.team_random(
+            clean_input_params, clean_model_params, clean_components)
+        heat_text = ' '.join(
+            ['Полученная при испытаниях теплота сгорания в пределах:',
+             utils.percentage_frame(the_blend.combustion_heat, rng=rng)])
+        return {'combustion_heat': heat_text}
 
-    def team_arguments(self, input_params):
-        return {(f.oxidizer, f.fuel): f.rate_constant for f in self.fuel_types}
+    def generate_team_arguments(self, input_params, rng):
+        return {blend: f.rate_constant for blend, f in self.blends.items()}
 
-    def pre_production(self, input_params, model_params, components):
+    def simulate_pre_production(self, clean_input_params, clean_model_params,
+                                clean_components):
         """
             model_params:
                 oxidizer - one of oxidizers
@@ -90,11 +105,6 @@ class RocketFuel(AbstractModel):
                 combustion_heat - calculated by players
                 radicals_amount - calculated by players
         """
-        AbstractModel.pre_production(
-            self, input_params, model_params, components)
-
-        clean_model_params = self.validate_model_params(model_params)
-
         the_blend = self.chosen_blend(
             clean_model_params['oxidizer'], clean_model_params['fuel'])
         quality = the_blend.quality
@@ -103,23 +113,11 @@ class RocketFuel(AbstractModel):
         quality += self.check_radicals(
             the_blend, clean_model_params['radicals_amount'])
 
-        heat_text = ' '.join(
-            ['Полученная при испытаниях теплота сгорания в пределах:',
-             utils.percentage_frame(
-                 the_blend.combustion_heat)])
-
-        interm_params = ({'combustion_heat': heat_text,
-                          'density': the_blend.density,
-                          'chamber_temperature': the_blend.chamber_temperature,
-                          'rate_constant': the_blend.rate_constant},
-                         {'quality': quality})
-        self.ml.check_interm_params(self.model, *interm_params)
+        open_params = self.render_volatile_params(
+            clean_input_params, clean_model_params, clean_components)
+        open_params.update(
+            density=the_blend.density,
+            chamber_temperature=the_blend.chamber_temperature,
+            rate_constant=the_blend.rate_constant)
+        interm_params = (open_params, {'quality': quality})
         return interm_params
-
-    def production(self, input_params, interm_params,
-                   hidden_params, components):
-        AbstractModel.production(
-            self, input_params, interm_params, hidden_params, components)
-        output_params = {'quality': hidden_params['quality']}
-        self.ml.check_output_params(self.model, output_params)
-        return output_params
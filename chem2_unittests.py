@@ -0,0 +1,59 @@
+# -*- coding: UTF-8 -*-
+import unittest
+
+import chem2
+from errors import ModelError
+from mockloader import MockModelLoader
+
+
+class CheckRocketFuel(unittest.TestCase):
+    def setUp(self):
+        self.model = chem2.RocketFuel(MockModelLoader(), 'foo',
+                                      'logger', 'out')
+
+    def test_blends(self):
+        self.assertEqual(len(self.model.blends), len(chem2.FUEL_RECIPES))
+        for recipe in chem2.FUEL_RECIPES:
+            blend = self.model.chosen_blend(*recipe[:2])
+            self.assertEqual(tuple(blend[:6]), recipe)
+        self.assertEqual(
+            sorted((b.rate_constant, b.radicals_amount)
+                   for b in self.model.blends.values()),
+            sorted(chem2.RATE_AND_RADICALS))
+        with self.assertRaises(TypeError):
+            self.model.blends[('oxygen', 'DMH')] = None
+
+    def test_same_team(self):
+        model = chem2.RocketFuel(MockModelLoader(), 'foo', 'logger', 'out')
+        self.assertEqual(dict(model.blends), dict(self.model.blends))
+        self.assertEqual(model.team_arguments({}),
+                         self.model.team_arguments({}))
+
+    def test_pre_production(self):
+        blend = self.model.chosen_blend('oxygen', 'DMH')
+        open_params, hidden_params = self.model.pre_production({}, {
+            'oxidizer': 'oxygen', 'fuel': 'DMH',
+            'combustion_heat': str(blend.combustion_heat),
+            'radicals_amount': str(blend.radicals_amount)}, {})
+        self.assertEqual(hidden_params['quality'], blend.quality + 40 + 30)
+        self.assertEqual(open_params['rate_constant'], blend.rate_constant)
+
+    def test_same_submission(self):
+        model_params = {'oxidizer': 'oxygen', 'fuel': 'DMH',
+                        'combustion_heat': '9000', 'radicals_amount': '1'}
+        first = self.model.pre_production({}, model_params, {})
+        model = chem2.RocketFuel(MockModelLoader(), 'foo', 'logger', 'out')
+        self.assertEqual(model.pre_production({}, model_params, {}), first)
+        model_params['combustion_heat'] = '9001'
+        self.assertNotEqual(
+            self.model.pre_production({}, model_params, {})[0],
+            first[0])
+
+    def test_wrong_blend(self):
+        self.assertRaises(ModelError, self.model.pre_production, {}, {
+            'oxidizer': 'nitric oxide', 'fuel': 'kerosene',
+            'combustion_heat': '1', 'radicals_amount': '1'}, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import concurrent.futures
+import random
+import sys
+import unittest
+
+import benchmark
+from mockloader import MockModelLoader
+
+
+class CheckReentrancy(unittest.TestCase):
+    '''
+    One model instance serving many threads gives the same results
+    as the serial runs
+    '''
+    SUBMISSIONS = 200
+    THREADS = 8
+
+    def setUp(self):
+        self.switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+
+    def tearDown(self):
+        sys.setswitchinterval(self.switch_interval)
+
+    def run_model(self, model_class, make_submission):
+        model = model_class(MockModelLoader(), 'foo', None, None)
+        rng = random.Random(0)
+        submissions = [make_submission(model, rng)
+                       for _ in range(self.SUBMISSIONS)]
+
+        def score(submission):
+            input_params = submission[0]
+            team_args = model.team_arguments(input_params)
+            interm_params = model.pre_production(*submission)
+            output_params = model.production(
+                input_params, interm_params[0], interm_params[1],
+                submission[2])
+            return team_args, interm_params, output_params
+
+        serial = [score(s) for s in submissions]
+        with concurrent.futures.ThreadPoolExecutor(self.THREADS) as pool:
+            concurrent_results = list(pool.map(score, submissions))
+        self.assertEqual(concurrent_results, serial)
+
+    def test_models(self):
+        for model_class, make_submission in benchmark.MODELS:
+            with self.subTest(model=model_class.__name__):
+                self.run_model(model_class, make_submission)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,70 +1,230 @@
 import math
-import random
+
+import numpy
 
 from abstractmodel import AbstractModel
 from errors import ModelError
+from schema import compile_schema, Field, keep
 import utils
 
+# orbit_radius_code values, indexes of ORBIT_RADIUS_TEXTS
+UNUSABLE_ORBIT, INCONSISTENT_ORBIT, CONSISTENT_ORBIT = range(3)
+ORBIT_RADIUS_TEXTS = (
+    'Из-за высокого сопротивления атмосферы орбита непригодна.',
+    'Не согласуется с периодом обращения.',
+    'Согласуется с периодом обращения.')
 
-class GlobalNav(AbstractModel):
-    def __init__(self, ml, team, logger, output):
-        AbstractModel.__init__(self, ml, self.__class__.__name__,
-                               team, logger, output)
 
-    def validate_input_params(self, input_params):
-        revolution_period = utils.to_int(input_params['revolution_period'])
-        if revolution_period <= 0:
-            raise ModelError('Период обращения должен быть больше 0.')
+def _radius(revolution_period):
+    return 21.7 * ((revolution_period * 60) ** (2. / 3.))
 
-        orbital_inclination = utils.to_int(input_params['orbital_inclination'])
-        if not 0 < orbital_inclination < 90:
-            raise ModelError(
-                'Наклонение орбиты должно лежать в пределах [0;90].')
 
-        return {
-            'revolution_period': revolution_period,
-            'orbital_inclination': orbital_inclination}
+def _acos(x):
+    return math.acos(x) if -1. <= x <= 1. else math.nan
 
-    def validate_model_params(self, model_params):
-        orbit_radius = utils.to_float(model_params['orbit_radius'])
-        if orbit_radius <= 0:
-            raise ModelError('Проектный радиус орбиты должен быть больше 0.')
 
-        pos_crit_accel = utils.to_float(model_params['pos_crit_accel'])
-        if pos_crit_accel <= 0:
-            raise ModelError(
-                'Критическое нормальное положительное ускорение '
-                'должно быть больше 0.')
+# libm pow and acos, applied along the revolution period axis only:
+# the last bits of numpy.power and numpy.arccos differ from them,
+# and the single designs must score as they always did
+_orbit_radius = numpy.frompyfunc(_radius, 1, 1)
+_arccos = numpy.frompyfunc(_acos, 1, 1)
 
-        neg_crit_accel = utils.to_float(model_params['neg_crit_accel'])
-        if neg_crit_accel <= 0:
-            raise ModelError(
-                'Критическое нормальное отрицательное ускорение '
-                'должно быть больше 0.')
+SWEEP_DTYPES = (
+    ('orbit_radius', numpy.float64),
+    ('orbit_radius_code', numpy.int8),
+    ('pos_crit_accel', numpy.float64),
+    ('neg_crit_accel', numpy.float64),
+    ('coverage', numpy.float64),
+    ('quality', numpy.float64))
 
-        permissible_variation = utils.to_int('model_params')
 
-        return {
-            'orbit_radius': orbit_radius,
+def evaluate_orbit(revolution_period, orbital_inclination,
+                   permissible_variation, model_params):
+    '''
+    The part of evaluate not depending on the components
+    Return value:
+        evaluate value without quality, with accel_quality
+        for combine_quality
+    '''
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        orbit_radius = numpy.asarray(
+            _orbit_radius(revolution_period), dtype=float)
+        orbit_radius_code = numpy.where(
+            orbit_radius < 150, UNUSABLE_ORBIT,
+            numpy.where(
+                numpy.abs(orbit_radius - model_params['orbit_radius']) > 50,
+                INCONSISTENT_ORBIT, CONSISTENT_ORBIT))
+
+        crit_acceleration = (39.82 * 10000 / (orbit_radius ** 2)) * 1.05
+        pos_crit_accel = crit_acceleration * (
+            1. - numpy.divide(permissible_variation, 100.))
+        neg_crit_accel = crit_acceleration * (
+            1. + numpy.divide(permissible_variation, 100.))
+
+        coverage = orbital_inclination + numpy.degrees(
+            numpy.asarray(_arccos(6400. / orbit_radius), dtype=float))
+
+        accel_quality = (
+            100 -
+            (numpy.abs(pos_crit_accel - model_params['pos_crit_accel']) /
+                pos_crit_accel * 100) -
+            (numpy.abs(neg_crit_accel - model_params['neg_crit_accel']) /
+                neg_crit_accel * 100))
+
+    return {'orbit_radius': orbit_radius,
+            'orbit_radius_code': orbit_radius_code,
             'pos_crit_accel': pos_crit_accel,
             'neg_crit_accel': neg_crit_accel,
-            'permissible_variation': permissible_variation}
+            'coverage': coverage,
+            'accel_quality': accel_quality}
+
+
+def combine_quality(accel_quality, security_quality):
+    quality = (accel_quality + security_quality) / 2.
+    return numpy.where(quality < 0, 0., quality)
+
+
+def evaluate(revolution_period, orbital_inclination, permissible_variation,
+             model_params, components):
+    '''
+    The pre_production formulas on numbers or NumPy arrays,
+    broadcast together. GlobalNav.simulate_pre_production uses it too,
+    so a sweep gives exactly the numbers of the single designs.
+    Arguments:
+        revolution_period - in minutes
+        orbital_inclination - degrees
+        permissible_variation - percents
+        model_params - orbit_radius, pos_crit_accel and neg_crit_accel
+        components - security_quality
+    Return value:
+        {'orbit_radius': ..., 'orbit_radius_code': ...,
+         'pos_crit_accel': ..., 'neg_crit_accel': ..., 'coverage': ...,
+         'accel_quality': ..., 'quality': ...}, coverage is nan
+        where the orbit is lower than the Earth surface
+    '''
+    result = evaluate_orbit(revolution_period, orbital_inclination,
+                            permissible_variation, model_params)
+    result['quality'] = combine_quality(result['accel_quality'],
+                                        components['security_quality'])
+    return result
 
-    def validate_components(self, components):
-        if not components['critical_errors_control'] == 'True':
-            raise ModelError(
-                'Ваша система должна включать модуль '
-                'контроля критических помех.')
 
-        security_quality = utils.to_int(components['security_quality'])
-        return {'security_quality': security_quality}
+def sweep_chunks(revolution_periods, orbital_inclinations,
+                 permissible_variations, model_params, components,
+                 chunk_size=2 ** 16):
+    '''
+    evaluate over the grid of the three axes, a few revolution periods
+    at a time, so at most about chunk_size designs are in memory
+    Return value:
+        generator of (slice of revolution_periods,
+                      {name: array of shape (periods in the slice,
+                                             inclinations, variations)})
+    '''
+    periods = numpy.asarray(revolution_periods).reshape(-1, 1, 1)
+    inclinations = numpy.asarray(orbital_inclinations).reshape(1, -1, 1)
+    variations = numpy.asarray(permissible_variations).reshape(1, 1, -1)
+    step = max(1, chunk_size // max(1, inclinations.size * variations.size))
+    for start in range(0, len(periods), step):
+        chunk = slice(start, start + step)
+        result = evaluate(periods[chunk], inclinations, variations,
+                          model_params, components)
+        shape = (len(periods[chunk]), inclinations.size, variations.size)
+        yield chunk, dict((name, numpy.broadcast_to(result[name], shape))
+                          for name, _ in SWEEP_DTYPES)
+
+
+def sweep(revolution_periods, orbital_inclinations, permissible_variations,
+          model_params, components, chunk_size=2 ** 16):
+    '''
+    Evaluate every (revolution_period, orbital_inclination,
+    permissible_variation) design of the grid:
+
+        cube = sweep(range(90, 1500), range(0, 91), range(2, 11),
+                     {'orbit_radius': 7000., 'pos_crit_accel': 7.,
+                      'neg_crit_accel': 8.}, {'security_quality': 40})
+        cube['quality'][i, j, k]  # quality of revolution_periods[i], ...
+
+    Return value:
+        {name: array of shape (periods, inclinations, variations)}
+        of the evaluate values
+    '''
+    shape = (len(revolution_periods), len(orbital_inclinations),
+             len(permissible_variations))
+    cube = dict((name, numpy.empty(shape, dtype=dtype))
+                for name, dtype in SWEEP_DTYPES)
+    for chunk, result in sweep_chunks(
+            revolution_periods, orbital_inclinations,
+            permissible_variations, model_params, components, chunk_size):
+        for name, values in result.items():
+            cube[name][chunk] = values
+    return cube
+
+
+class GlobalNav(AbstractModel):
+    input_params_schema = compile_schema(
+        Field('revolution_period', utils.to_int, low=0, strict=True,
+              message='Период обращения должен быть больше 0.'),
+        Field('orbital_inclination', utils.to_int, low=0, high=90,
+              strict=True,
+              message='Наклонение орбиты должно лежать в пределах [0;90].'))
+    model_params_schema = compile_schema(
+        Field('orbit_radius', low=0, strict=True,
+              message='Проектный радиус орбиты должен быть больше 0.'),
+        Field('pos_crit_accel', low=0, strict=True, message=(
+            'Критическое нормальное положительное ускорение '
+            'должно быть больше 0.')),
+        Field('neg_crit_accel', low=0, strict=True, message=(
+            'Критическое нормальное отрицательное ускорение '
+            'должно быть больше 0.')),
+        Field('permissible_variation', utils.to_int))
+    components_schema = compile_schema(
+        Field('critical_errors_control', keep, choices=['True'], message=(
+            'Ваша система должна включать модуль '
+            'контроля критических помех.')),
+        Field('security_quality', utils.to_int))
 
-    def team_arguments(self, input_params):
-        AbstractModel.team_arguments(self, input_params)
-        self.permissible_variation = random.randint(2, 10)
-        return {'permissible_variation': self.permissible_variation}
+    term_dependencies = {
+        'orbit': {
+            'input_params': ('revolution_period', 'orbital_inclination'),
+            'model_params': ('orbit_radius', 'pos_crit_accel',
+                             'neg_crit_accel', 'permissible_variation')}}
 
-    def pre_production(self, input_params, model_params, components):
+    def __init__(self, ml, team, logger, output, **kwargs):
+        AbstractModel.__init__(self, ml, self.__class__.__name__,
+                               team, logger, output, **kwargs)
+
+    def generate_team_arguments(self, input_params, rng):
+        return {'permissible_variation': rng.randint(2, 10)}
+
+    def orbit_term(self, clean_input_params, clean_model_params,
+                   clean_components):
+        '''
+        Return value:
+            orbit_radius_text, coverage_text, accel_quality
+        '''
+        orbit = evaluate_orbit(
+            clean_input_params['revolution_period'],
+            clean_input_params['orbital_inclination'],
+            clean_model_params['permissible_variation'],
+            clean_model_params)
+        orbit_radius_text = ORBIT_RADIUS_TEXTS[
+            int(orbit['orbit_radius_code'])]
+
+        coverage = float(orbit['coverage'])
+        if math.isnan(coverage):
+            raise ModelError(
+                'Орбита с таким периодом обращения проходит '
+                'ниже поверхности Земли.')
+        if coverage < 90:
+            coverage_text = '[0;{}]'.format(coverage)
+        else:
+            coverage_text = 'Вся Земля.'
+
+        return (orbit_radius_text, coverage_text,
+                float(orbit['accel_quality']))
+
+    def simulate_pre_production(self, clean_input_params, clean_model_params,
+                                clean_components):
         '''
             input_params:
                 revolution_period - in minutes
@@ -80,48 +240,11 @@ class GlobalNav(AbstractModel):
                 critical_errors_control - must be True
                 security_quality
         '''
-        AbstractModel.pre_production(
-            self, input_params, model_params, components)
-        clean_input_params = self.validate_input_params(input_params)
-        clean_model_params = self.validate_model_params(model_params)
-        clean_components = self.validate_components(components)
-
-        orbit_radius = 21.7 * (
-            (clean_input_params['revolution_period'] * 60) ** (2. / 3.))
-        if orbit_radius < 150:
-            orbit_radius_text = (
-                'Из-за высокого сопротивления атмосферы орбита непригодна.')
-        elif abs(orbit_radius - clean_model_params['orbit_radius']) > 50:
-            orbit_radius_text = (
-                'Не согласуется с периодом обращения.')
-        else:
-            orbit_radius_text = (
-                'Согласуется с периодом обращения.')
-
-        crit_acceleration = (39.82 * 10000 / (orbit_radius ** 2)) * 1.05
-        pos_crit_accel = crit_acceleration * (
-            1. - clean_model_params['permissible_variation'] / 100.)
-        neg_crit_accel = crit_acceleration * (
-            1. + clean_model_params['permissible_variation'] / 100.)
-
-        coverage = (
-            clean_input_params['orbital_inclination'] +
-            math.degrees(math.acos(6400. / orbit_radius)))
-        if coverage < 90:
-            coverage_text = '[0;{}]'.format(coverage)
-        else:
-            coverage_text = 'Вся Земля.'
-
-        quality = (
-            100 -
-            (abs(pos_crit_accel - clean_model_params['pos_crit_accel']) /
-                pos_crit_accel * 100) -
-            (abs(neg_crit_accel - clean_model_params['neg_crit_accel']) /
-                neg_crit_accel * 100) +
-            clean_components['security_quality']) / 2.
-
-        if quality < 0:
-            quality = 0
+        orbit_radius_text, coverage_text, accel_quality = self.term(
+            'orbit', self.orbit_term, clean_input_params, clean_model_params,
+            clean_components)
+        quality = float(combine_quality(
+            accel_quality, clean_components['security_quality']))
 
         interm_params = (
             {
@@ -131,15 +254,10 @@ class GlobalNav(AbstractModel):
                 'quality': quality,
                 'revolution_period': clean_input_params['revolution_period']})
 
-        self.ml.check_interm_params(self.model, *interm_params)
         return interm_params
 
-    def production(self, input_params, interm_params,
-                   hidden_params, components):
-        AbstractModel.production(
-            self, input_params, interm_params, hidden_params, components)
-        output_params = {
+    def simulate_production(self, input_params, interm_params,
+                            hidden_params, components):
+        return {
             'quality': hidden_params['quality'],
             'revolution_period': hidden_params['revolution_period']}
-        self.ml.check_output_params(self.model, output_params)
-        return output_params
@@ -0,0 +1,134 @@
+# -*- coding: UTF-8 -*-
+import math
+import unittest
+
+import numpy
+
+from errors import ModelError
+import globalnav
+from mockloader import MockModelLoader
+
+MODEL_PARAMS = {'orbit_radius': 7000., 'pos_crit_accel': 6.8,
+                'neg_crit_accel': 7.9}
+COMPONENTS = {'critical_errors_control': 'True', 'security_quality': 40}
+
+
+def original_pre_production(input_params, model_params, components):
+    '''
+    GlobalNav.simulate_pre_production as it was before the sweep
+    '''
+    orbit_radius = 21.7 * ((input_params['revolution_period'] * 60) ** (
+        2. / 3.))
+    if orbit_radius < 150:
+        orbit_radius_text = (
+            'Из-за высокого сопротивления атмосферы орбита непригодна.')
+    elif abs(orbit_radius - model_params['orbit_radius']) > 50:
+        orbit_radius_text = 'Не согласуется с периодом обращения.'
+    else:
+        orbit_radius_text = 'Согласуется с периодом обращения.'
+    crit_acceleration = (39.82 * 10000 / (orbit_radius ** 2)) * 1.05
+    pos_crit_accel = crit_acceleration * (
+        1. - model_params['permissible_variation'] / 100.)
+    neg_crit_accel = crit_acceleration * (
+        1. + model_params['permissible_variation'] / 100.)
+    coverage = (input_params['orbital_inclination'] +
+                math.degrees(math.acos(6400. / orbit_radius)))
+    if coverage < 90:
+        coverage_text = '[0;{}]'.format(coverage)
+    else:
+        coverage_text = 'Вся Земля.'
+    quality = (
+        100 -
+        (abs(pos_crit_accel - model_params['pos_crit_accel']) /
+            pos_crit_accel * 100) -
+        (abs(neg_crit_accel - model_params['neg_crit_accel']) /
+            neg_crit_accel * 100) +
+        components['security_quality']) / 2.
+    if quality < 0:
+        quality = 0
+    return ({'coverage': coverage_text,
+             'orbit_radius_text': orbit_radius_text},
+            {'quality': quality,
+             'revolution_period': input_params['revolution_period']})
+
+
+class CheckSweep(unittest.TestCase):
+    def setUp(self):
+        self.model = globalnav.GlobalNav(MockModelLoader(), 'foo',
+                                         'logger', 'out')
+
+    def test_same_as_pre_production(self):
+        periods = [1, 50, 85, 97, 98, 99, 100, 183, 1440]
+        inclinations = [0, 15, 45, 90]
+        variations = [2, 5, 10]
+        cube = globalnav.sweep(periods, inclinations, variations,
+                               MODEL_PARAMS, COMPONENTS, chunk_size=10)
+        for i, period in enumerate(periods):
+            for j, inclination in enumerate(inclinations):
+                for k, variation in enumerate(variations):
+                    model_params = dict(MODEL_PARAMS,
+                                        permissible_variation=variation)
+                    input_params = {'revolution_period': period,
+                                    'orbital_inclination': inclination}
+                    self.assertEqual(
+                        cube['quality'][i, j, k],
+                        globalnav.evaluate(period, inclination, variation,
+                                           MODEL_PARAMS,
+                                           COMPONENTS)['quality'])
+                    if numpy.isnan(cube['coverage'][i, j, k]):
+                        self.assertRaises(
+                            ModelError, self.model.simulate_pre_production,
+                            input_params, model_params, COMPONENTS)
+                        continue
+                    open_params, hidden_params = \
+                        self.model.simulate_pre_production(
+                            input_params, model_params, COMPONENTS)
+                    self.assertEqual(hidden_params['quality'],
+                                     cube['quality'][i, j, k])
+                    self.assertEqual(
+                        open_params['orbit_radius_text'],
+                        globalnav.ORBIT_RADIUS_TEXTS[
+                            cube['orbit_radius_code'][i, j, k]])
+                    coverage = float(cube['coverage'][i, j, k])
+                    self.assertIn(open_params['coverage'], (
+                        '[0;{}]'.format(coverage), 'Вся Земля.'))
+
+    def test_original_formulas(self):
+        for period in range(1, 1501):
+            for inclination in (0, 45, 89):
+                for variation in (2, 7, 10):
+                    params = ({'revolution_period': period,
+                               'orbital_inclination': inclination},
+                              {'orbit_radius': 7000. + period,
+                               'pos_crit_accel': 6.8,
+                               'neg_crit_accel': 7.9,
+                               'permissible_variation': variation},
+                              COMPONENTS)
+                    try:
+                        expected = original_pre_production(*params)
+                    except ValueError:
+                        # the orbit is lower than the Earth surface
+                        self.assertRaises(
+                            ModelError,
+                            self.model.simulate_pre_production, *params)
+                        continue
+                    self.assertEqual(
+                        self.model.simulate_pre_production(*params),
+                        expected)
+
+    def test_chunks(self):
+        args = (numpy.arange(90, 200), numpy.arange(0, 91, 10), range(2, 11),
+                MODEL_PARAMS, COMPONENTS)
+        whole = globalnav.sweep(*args)
+        chunked = globalnav.sweep(*args, chunk_size=100)
+        for name, dtype in globalnav.SWEEP_DTYPES:
+            self.assertEqual(whole[name].shape, (110, 10, 9))
+            self.assertEqual(whole[name].dtype, dtype)
+            numpy.testing.assert_array_equal(whole[name], chunked[name])
+        chunks = list(globalnav.sweep_chunks(*args, chunk_size=100))
+        self.assertEqual(len(chunks), 110)
+        self.assertEqual(chunks[0][1]['quality'].shape, (1, 10, 9))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,243 @@
+"""
+Score a file of submissions.
+
+The submissions are read one by one from JSONL or CSV, every one goes
+to the model named in it and the results are written out as JSON lines
+as soon as they are ready, so the memory does not grow with the file:
+
+    python ingest.py submissions.jsonl --loader myloader:ModelLoader \\
+        --output results.jsonl
+
+A JSONL submission:
+
+    {"id": 1, "model": "GlobalNav", "team": "foo",
+     "phase": "pre_production", "input_params": {...},
+     "model_params": {...}, "components": {...}}
+
+phase is pre_production by default, production also needs
+interm_params and hidden_params, team_arguments only input_params.
+A CSV file has the columns id, model, team, phase and one column per
+parameter, named like input_params.revolution_period.
+
+A result line:
+
+    {"id": 1, "model": "GlobalNav", "team": "foo",
+     "phase": "pre_production", "result": ..., "error": null,
+     "crash": null}
+
+error is the ModelError text, crash the traceback of other exceptions.
+"""
+import argparse
+from collections import OrderedDict
+import contextlib
+import csv
+import importlib
+import json
+import sys
+import traceback
+
+import numpy
+
+from errors import ModelError
+import registry
+from resultstore import ResultStore
+from runner import Result
+from submission import PARAM_GROUPS, Submission
+
+PARAMS = {
+    'team_arguments': ('input_params',),
+    'pre_production': ('input_params', 'model_params', 'components'),
+    'production': ('input_params', 'interm_params', 'hidden_params',
+                   'components')}
+
+
+def load_object(path):
+    '''
+    Arguments:
+        path - 'module:name'
+    '''
+    module_name, name = path.split(':')
+    return getattr(importlib.import_module(module_name), name)
+
+
+def read_jsonl(stream):
+    for number, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as e:
+            # one broken line does not stop the stream
+            yield {'invalid': 'line {}: {}'.format(number, e)}
+
+
+def read_csv(stream):
+    for row in csv.DictReader(stream):
+        record = {}
+        for column, value in row.items():
+            group, _, name = column.partition('.')
+            if name and group in PARAM_GROUPS:
+                record.setdefault(group, {})[name] = value
+            elif value != '':
+                record[column] = value
+        yield record
+
+
+def read_records(stream, file_format):
+    if file_format == 'csv':
+        return read_csv(stream)
+    return read_jsonl(stream)
+
+
+def guess_format(path):
+    return 'csv' if path.lower().endswith('.csv') else 'jsonl'
+
+
+def jsonable(value):
+    '''
+    The value with the NumPy data made lists and numbers
+    and the non-string keys made strings
+    '''
+    if isinstance(value, dict):
+        return dict((k if isinstance(k, str) else str(k), jsonable(v))
+                    for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return [jsonable(v) for v in value]
+    if isinstance(value, numpy.ndarray):
+        return value.tolist()
+    if isinstance(value, numpy.generic):
+        return value.item()
+    return value
+
+
+class Models(object):
+    '''
+    The model instances by (model name, team),
+    the least recently used ones are dropped above max_models
+    '''
+    def __init__(self, ml, max_models=1024, logger=None, output=None,
+                 **model_kwargs):
+        self.ml = ml
+        self.max_models = max_models
+        self.args = (logger, output)
+        self.kwargs = model_kwargs
+        self._models = OrderedDict()
+
+    def get(self, name, team):
+        key = name, team
+        model = self._models.get(key)
+        if model is None:
+            model = self._models[key] = registry.create_model(
+                name, self.ml, team, *self.args, **self.kwargs)
+            if len(self._models) > self.max_models:
+                self._models.popitem(last=False)
+        else:
+            self._models.move_to_end(key)
+        return model
+
+
+def run_phase(models, record):
+    '''
+    Return value:
+        runner.Result of the submission record
+    '''
+    try:
+        if 'invalid' in record:
+            raise ValueError(record['invalid'])
+        phase = record.get('phase') or 'pre_production'
+        if phase not in PARAMS:
+            raise ValueError('Unknown phase {}'.format(phase))
+        model = models.get(record['model'], record['team'])
+        submission = Submission.from_record(record)
+        params = [getattr(submission, name) for name in PARAMS[phase]]
+        return Result(getattr(model, phase)(*params), None, None)
+    except ModelError as e:
+        return Result(None, e, None)
+    except Exception:
+        return Result(None, None, traceback.format_exc())
+
+
+def score(models, record, result_store=None):
+    '''
+    Return value:
+        the result line dict of the submission record
+    '''
+    phase = record.get('phase') or 'pre_production'
+    value, error, crash = run_phase(models, record)
+    if result_store is not None:
+        result_store.append_result(record.get('team'), record.get('model'),
+                                   phase, value, error, crash)
+    if phase == 'pre_production' and value is not None:
+        value = {'interm_params': value[0], 'hidden_params': value[1]}
+    return {'id': record.get('id'), 'model': record.get('model'),
+            'team': record.get('team'), 'phase': phase,
+            'result': jsonable(value),
+            'error': None if error is None else error.value,
+            'crash': crash}
+
+
+def score_records(models, records, result_store=None):
+    for record in records:
+        yield score(models, record, result_store)
+
+
+def ingest(input_stream, output_stream, ml, file_format='jsonl',
+           max_models=1024, result_store=None, **model_kwargs):
+    '''
+    Score the submissions of input_stream to output_stream
+    and to the resultstore.ResultStore if it is given
+    Return value:
+        {'submissions': 10, 'errors': 1, 'crashes': 0}
+    '''
+    models = Models(ml, max_models, **model_kwargs)
+    counts = {'submissions': 0, 'errors': 0, 'crashes': 0}
+    for result in score_records(
+            models, read_records(input_stream, file_format), result_store):
+        output_stream.write(json.dumps(result, ensure_ascii=False) + '\n')
+        counts['submissions'] += 1
+        counts['errors'] += result['error'] is not None
+        counts['crashes'] += result['crash'] is not None
+    if result_store is not None:
+        result_store.flush()
+    return counts
+
+
+def open_stream(path, mode):
+    if path == '-':
+        return contextlib.nullcontext(sys.stdin if 'r' in mode else sys.stdout)
+    return open(path, mode, encoding='utf-8', newline='')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('submissions', help='JSONL or CSV file, - for stdin')
+    parser.add_argument('--loader', required=True,
+                        help='module:callable making the model loader')
+    parser.add_argument('--output', default='-',
+                        help='JSONL results file, stdout by default')
+    parser.add_argument('--format', choices=('jsonl', 'csv'),
+                        help='by the file extension by default')
+    parser.add_argument('--max-models', type=int, default=1024,
+                        help='model instances kept at once')
+    parser.add_argument('--results-store',
+                        help='resultstore.ResultStore directory to fill too')
+    args = parser.parse_args(argv)
+
+    ml = load_object(args.loader)()
+    input_format = args.format or guess_format(args.submissions)
+    with open_stream(args.submissions, 'r') as input_stream, \
+            open_stream(args.output, 'w') as output_stream:
+        result_store = None
+        if args.results_store:
+            result_store = ResultStore(args.results_store)
+        counts = ingest(input_stream, output_stream, ml, input_format,
+                        args.max_models, result_store)
+    sys.stderr.write(
+        '{submissions} submissions, {errors} errors, '
+        '{crashes} crashes\n'.format(**counts))
+    return 1 if counts['crashes'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
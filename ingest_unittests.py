@@ -0,0 +1,94 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import ingest
+from mockloader import MockModelLoader
+import resultstore
+
+
+ROCKET_FUEL = {'oxidizer': 'oxygen', 'fuel': 'DMH',
+               'combustion_heat': '9315.64', 'radicals_amount': '0.5'}
+
+
+class CheckIngest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_jsonl(self):
+        records = [
+            {'id': 1, 'model': 'RocketFuel', 'team': 'foo',
+             'model_params': ROCKET_FUEL},
+            {'id': 2, 'model': 'RocketFuel', 'team': 'foo',
+             'model_params': dict(ROCKET_FUEL, fuel='kerosene',
+                                  oxidizer='nitric oxide')},
+            {'id': 3, 'model': 'RocketFuel', 'team': 'foo',
+             'phase': 'production', 'hidden_params': {'quality': 5},
+             'interm_params': {'combustion_heat': '', 'density': 1,
+                               'chamber_temperature': 1,
+                               'rate_constant': 1}},
+            {'id': 4, 'model': 'RocketFuel', 'team': 'foo',
+             'phase': 'team_arguments'},
+            {'id': 5, 'model': 'Foo', 'team': 'foo'}]
+        stream = io.StringIO(
+            '\n'.join(json.dumps(r) for r in records) + '\n\n{broken\n')
+        output = io.StringIO()
+        counts = ingest.ingest(stream, output, MockModelLoader())
+        self.assertEqual(counts, {'submissions': 6, 'errors': 1,
+                                  'crashes': 2})
+        results = [json.loads(line) for line in output.getvalue().split('\n')
+                   if line]
+        self.assertEqual([r['id'] for r in results], [1, 2, 3, 4, 5, None])
+        self.assertEqual(
+            sorted(results[0]['result']), ['hidden_params', 'interm_params'])
+        self.assertIsNotNone(results[1]['error'])
+        self.assertEqual(results[2]['result'], {'quality': 5})
+        self.assertEqual(len(results[3]['result']), 8)
+        self.assertIn('Unknown model', results[4]['crash'])
+        self.assertIn('line 7', results[5]['crash'])
+
+    def test_csv_cli(self):
+        path = os.path.join(self.directory, 'submissions.csv')
+        output = os.path.join(self.directory, 'results.jsonl')
+        with open(path, 'w') as f:
+            f.write('id,model,team,' + ','.join(
+                'model_params.' + name for name in sorted(ROCKET_FUEL)) +
+                '\n')
+            for i in range(3):
+                f.write('{},RocketFuel,team{},'.format(i, i) + ','.join(
+                    ROCKET_FUEL[name] for name in sorted(ROCKET_FUEL)) +
+                    '\n')
+        store = os.path.join(self.directory, 'store')
+        self.assertEqual(ingest.main([
+            path, '--loader', 'mockloader:MockModelLoader', '--output', output,
+            '--max-models', '2', '--results-store', store]), 0)
+        with open(output) as f:
+            results = [json.loads(line) for line in f]
+        self.assertEqual([(r['id'], r['team']) for r in results],
+                         [('0', 'team0'), ('1', 'team1'), ('2', 'team2')])
+        for r in results:
+            self.assertIsNone(r['error'])
+            self.assertIsNotNone(r['result'])
+        best = resultstore.ResultStore(store).best_quality(
+            phase='pre_production')
+        self.assertEqual(sorted(best), [('RocketFuel', 'team{}'.format(i))
+                                        for i in range(3)])
+
+    def test_models_cache(self):
+        models = ingest.Models(MockModelLoader(), max_models=2)
+        first = models.get('RocketFuel', 'a')
+        models.get('RocketFuel', 'b')
+        self.assertIs(models.get('RocketFuel', 'a'), first)
+        models.get('RocketFuel', 'c')
+        self.assertEqual(list(models._models),
+                         [('RocketFuel', 'a'), ('RocketFuel', 'c')])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,133 @@
+"""
+Per-model, per-phase timers and counters.
+
+    instrumentation = Instrumentation()
+    model = GlobalNav(ml, team, logger, output,
+                      instrumentation=instrumentation)
+    ...
+    model.log_instrumentation()
+    instrumentation.snapshot()  # or exposition() for the scrapers
+
+Models made without instrumentation only pay one None check per phase.
+"""
+import json
+import threading
+import time
+
+from errors import ModelError
+
+
+class PhaseStats(object):
+    __slots__ = ('calls', 'model_errors', 'errors', 'seconds', 'max_seconds')
+
+    def __init__(self):
+        self.calls = 0
+        self.model_errors = 0
+        self.errors = 0
+        self.seconds = 0.
+        self.max_seconds = 0.
+
+    def as_dict(self):
+        return dict((name, getattr(self, name)) for name in self.__slots__)
+
+
+class Instrumentation(object):
+    def __init__(self, logger=None, slow_call=None):
+        '''
+        Parameters:
+            logger  where the calls slower than slow_call seconds
+                    are reported, the model logger is used by default
+                    when it has warning()
+        '''
+        self.logger = logger
+        self.slow_call = slow_call
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def measure(self, model, phase, method, *args, logger=None):
+        '''
+        Call method(*args) and record it, logger is the model logger
+        '''
+        start = time.perf_counter()
+        error = None
+        try:
+            return method(*args)
+        except ModelError:
+            error = 'model_errors'
+            raise
+        except Exception:
+            error = 'errors'
+            raise
+        finally:
+            self.record(model, phase, time.perf_counter() - start, error,
+                        logger)
+
+    def record(self, model, phase, seconds, error=None, logger=None):
+        with self._lock:
+            stats = self._stats.get((model, phase))
+            if stats is None:
+                stats = self._stats[(model, phase)] = PhaseStats()
+            stats.calls += 1
+            stats.seconds += seconds
+            if seconds > stats.max_seconds:
+                stats.max_seconds = seconds
+            if error is not None:
+                setattr(stats, error, getattr(stats, error) + 1)
+        if self.slow_call is None or seconds <= self.slow_call:
+            return
+        if self.logger is not None:
+            logger = self.logger
+        # the model loggers are not always loggers ('logger' in the
+        # tests), and a failed warning must not replace the result
+        # of the measured call
+        warning = getattr(logger, 'warning', None)
+        if callable(warning):
+            try:
+                warning('%s %s took %.6f s', model, phase, seconds)
+            except Exception:
+                pass
+
+    def snapshot(self):
+        '''
+        Return value:
+            {model: {phase: {'calls': 1, 'model_errors': 0, 'errors': 0,
+                             'seconds': 0.1, 'max_seconds': 0.1}}}
+        '''
+        with self._lock:
+            items = [(key, stats.as_dict())
+                     for key, stats in self._stats.items()]
+        snapshot = {}
+        for (model, phase), stats in sorted(items):
+            snapshot.setdefault(model, {})[phase] = stats
+        return snapshot
+
+    def dump(self, stream):
+        json.dump(self.snapshot(), stream, indent=2, sort_keys=True)
+
+    def exposition(self):
+        '''
+        The snapshot in the Prometheus text format
+        '''
+        lines = []
+        for model, phases in sorted(self.snapshot().items()):
+            for phase, stats in sorted(phases.items()):
+                for name, value in sorted(stats.items()):
+                    lines.append(
+                        'model_phase_{}{{model="{}",phase="{}"}} {}'.format(
+                            name, model, phase, value))
+        return '\n'.join(lines) + '\n'
+
+    def log(self, logger, model=None):
+        for model_name, phases in sorted(self.snapshot().items()):
+            if model is not None and model_name != model:
+                continue
+            for phase, stats in sorted(phases.items()):
+                logger.info(
+                    '%s %s: %d calls, %d model errors, %d errors, '
+                    '%.6f s, max %.6f s', model_name, phase, stats['calls'],
+                    stats['model_errors'], stats['errors'], stats['seconds'],
+                    stats['max_seconds'])
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
@@ -0,0 +1,107 @@
+import unittest
+
+from abstractmodel import AbstractModel
+from errors import ModelError
+from instrumentation import Instrumentation
+from mockloader import MockModelLoader
+
+
+class MockLogger(object):
+    def __init__(self):
+        self.lines = []
+
+    def info(self, message, *args):
+        self.lines.append(message % args)
+
+    warning = info
+
+
+class FailingLogger(object):
+    def warning(self, message, *args):
+        raise IOError('the log is gone')
+
+
+class MockModel(AbstractModel):
+    def __init__(self, ml, team, logger, output, **kwargs):
+        AbstractModel.__init__(self, ml, self.__class__.__name__,
+                               team, logger, output, **kwargs)
+
+    def simulate_pre_production(self, clean_input_params, clean_model_params,
+                                clean_components):
+        if clean_model_params['x'] < 0:
+            raise ModelError('x < 0')
+        if clean_model_params['x'] == 0:
+            raise ZeroDivisionError
+        return {}, {'quality': clean_model_params['x']}
+
+
+class CheckInstrumentation(unittest.TestCase):
+    def setUp(self):
+        self.logger = MockLogger()
+        self.instrumentation = Instrumentation()
+        self.model = MockModel(MockModelLoader(allow_unknown=True), 'foo',
+                               self.logger, 'out',
+                               instrumentation=self.instrumentation)
+
+    def test_phases(self):
+        for x in (1, 2, -1, 0):
+            try:
+                self.model.pre_production({}, {'x': x}, {})
+            except (ModelError, ZeroDivisionError):
+                pass
+        self.model.production({}, {}, {'quality': 1}, {})
+        self.model.team_arguments({})
+        snapshot = self.instrumentation.snapshot()['MockModel']
+        self.assertEqual(sorted(snapshot), [
+            'pre_production.check', 'pre_production.check_interm',
+            'pre_production.simulate', 'pre_production.validate',
+            'production.check', 'production.check_output',
+            'production.simulate', 'team_arguments.check',
+            'team_arguments.generate'])
+        simulate = snapshot['pre_production.simulate']
+        self.assertEqual(simulate['calls'], 4)
+        self.assertEqual(simulate['model_errors'], 1)
+        self.assertEqual(simulate['errors'], 1)
+        self.assertEqual(snapshot['pre_production.check_interm']['calls'], 2)
+        self.assertGreaterEqual(simulate['seconds'], simulate['max_seconds'])
+
+    def test_batch(self):
+        self.model.pre_production_batch([({}, {'x': x}, {}) for x in (1, 2)])
+        snapshot = self.instrumentation.snapshot()['MockModel']
+        self.assertEqual(snapshot['pre_production.simulate']['calls'], 2)
+        self.assertEqual(snapshot['pre_production.check']['calls'], 2)
+
+    def test_export(self):
+        self.model.pre_production({}, {'x': 1}, {})
+        self.model.log_instrumentation()
+        self.assertEqual(len(self.logger.lines), 4)
+        self.assertIn('model_phase_calls{model="MockModel",'
+                      'phase="pre_production.simulate"} 1',
+                      self.instrumentation.exposition())
+        self.instrumentation.reset()
+        self.assertEqual(self.instrumentation.snapshot(), {})
+
+    def test_slow_call(self):
+        instrumentation = Instrumentation(self.logger, slow_call=0)
+        instrumentation.record('M', 'p', 1.)
+        self.assertEqual(self.logger.lines, ['M p took 1.000000 s'])
+
+    def test_slow_call_model_logger(self):
+        self.model.instrumentation = Instrumentation(slow_call=0)
+        self.model.pre_production({}, {'x': 1}, {})
+        self.assertIn('MockModel pre_production.simulate took',
+                      ' '.join(self.logger.lines))
+
+    def test_slow_call_not_logger(self):
+        for logger in ('logger', None, FailingLogger()):
+            model = MockModel(MockModelLoader(allow_unknown=True), 'foo',
+                              logger, 'out',
+                              instrumentation=Instrumentation(slow_call=0))
+            self.assertEqual(model.pre_production({}, {'x': 1}, {}),
+                             ({}, {'quality': 1}))
+            self.assertRaises(ModelError, model.pre_production,
+                              {}, {'x': -1}, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
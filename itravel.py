@@ -1,14 +1,16 @@
 # -*- coding: UTF-8 -*-
 import json
-import math
 import random
 # import re
 
+import numpy
+
 from abstractmodel import AbstractModel
-from errors import ModelError
+from schema import compile_schema, Field, keep
 import utils
 
 
+NAVIGATOR_COORDS = [53, -36, 54]
 POINT_OF_INTEREST = [83, -15, 36]
 P1 = [20, 64, -95]
 P2 = [73, 28, -41]
@@ -24,6 +26,9 @@ MATRIXES = {
         [[-.44, -.79, -.43], [-.66, -.05,  .75], [-.61,  .61, -.50]],  # noqa
         [[-.05,  .79,  .61], [-.66,  .44, -.61], [-.75, -.43,  .50]]]  # noqa
 }
+DIMENSIONS = {'2D': 2, '3D': 3}
+TEAM_ARGUMENTS = ('base_station', 'point_of_interest', 'p1', 'p2',
+                  'center_shift', 'matrix')
 CAPACITORS = {
     'tourist': '2000-4000',
     'professional': '4000-8000',
@@ -32,49 +37,113 @@ CAPACITORS = {
 }
 
 
-def rnd_vector(dim):
-    return [random.randint(-100, 100) for _ in xrange(dim)]
+def rnd_vector(dim, rng=random):
+    return [rng.randint(-100, 100) for _ in range(dim)]
+
+
+def _pow(value, exponent):
+    return value ** exponent
+
+
+# the single team formula squares and roots with libm pow, it differs
+# in the last bit from value * value and sqrt for some values; one
+# Python call per element, so only for exact=True
+_libm_pow = numpy.frompyfunc(_pow, 2, 1)
+
+
+def navigation_vectors(base_station, matrix, center_shift, point_of_interest,
+                       exact=False):
+    '''
+    Compute the navigation vectors of N teams in one pass
+    Arguments (2D or 3D, the same for all the teams):
+        base_station - (N, dim) array
+        matrix - (N, dim, dim) array
+        center_shift - (N, dim) array
+        point_of_interest - (N, dim) array
+        exact - the vector lengths bit for bit the ones of the single
+            team formula (compute_2d/compute_3d before the batches),
+            several times slower
+    Return value:
+        vector lengths - (N,) array
+        direction angles in degrees - (N, dim) array of
+            alpha_x, beta_y[, gamma_z]
+    '''
+    base_station = numpy.asarray(base_station, dtype=float)
+    matrix = numpy.asarray(matrix, dtype=float)
+    dim = base_station.shape[-1]
+    navigator_coords = base_station + NAVIGATOR_COORDS[:dim]
+    # the sums go in the order of the single team formula (not einsum)
+    transformed_navi = navigator_coords[:, :1] * matrix[:, :, 0]
+    for j in range(1, dim):
+        transformed_navi += navigator_coords[:, j:j + 1] * matrix[:, :, j]
+    transformed_navi += center_shift
+    vectors = numpy.asarray(point_of_interest, dtype=float) - transformed_navi
+    if exact:
+        squares = _libm_pow(vectors[:, 0], 2)
+        for i in range(1, dim):
+            squares += _libm_pow(vectors[:, i], 2)
+        vector_lengths = numpy.asarray(_libm_pow(squares, .5), dtype=float)
+    else:
+        vector_lengths = numpy.sqrt(
+            numpy.einsum('ni,ni->n', vectors, vectors))
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        cosines = vectors / vector_lengths[:, numpy.newaxis]
+    angles = numpy.degrees(numpy.arccos(numpy.clip(cosines, -1, 1)))
+    return vector_lengths, angles
+
+
+def stack_navigation_params(model_params_list, dim):
+    '''
+    Stack the clean model params of many teams into the arrays
+    for navigation_vectors, only the first dim coordinates are used
+    '''
+    base_station, matrix, center_shift, point_of_interest = (
+        numpy.array([model_params[name] for model_params in model_params_list],
+                    dtype=float)
+        for name in ('base_station', 'matrix', 'center_shift',
+                     'point_of_interest'))
+    return (base_station[:, :dim], matrix[:, :dim, :dim],
+            center_shift[:, :dim], point_of_interest[:, :dim])
 
 
 class ITravel(AbstractModel):
-    def __init__(self, ml, team, logger, output):
+    input_params_schema = compile_schema(
+        Field('dimensions', keep, choices=DIMENSIONS, message=(
+            'Неверный пространственный охват, '
+            'обратитесь к техническому специалисту.')),
+        Field('device_class', keep, choices=CAPACITORS, message=(
+            'Неверный пользовательский класс, '
+            'обратитесь к техническому специалисту.')))
+    model_params_schema = compile_schema(
+        Field('vector_length', low=0, strict=True,
+              message='Длина вектора не может быть ниже 0.'),
+        Field('alpha_x'),
+        Field('beta_y'),
+        Field('gamma_z', required=False),
+        *[Field(name, json.loads) for name in TEAM_ARGUMENTS])
+    components_schema = compile_schema(
+        Field('critical_errors_control', keep, choices=['True'], message=(
+            'Ваша система должна включать модуль '
+            'контроля критических помех.')),
+        Field('security_quality', utils.to_int),
+        Field('capacitor_quality', utils.to_int),
+        Field('power_capacity', keep))
+
+    term_dependencies = {
+        'navigation': {
+            'input_params': ('dimensions',),
+            'model_params': ('vector_length', 'base_station', 'matrix',
+                             'center_shift', 'point_of_interest')}}
+
+    def __init__(self, ml, team, logger, output, **kwargs):
         AbstractModel.__init__(self, ml, self.__class__.__name__,
-                               team, logger, output)
-
-    def validate_input_params(self, input_params):
-        clean_input_params = {}
-        if input_params['dimensions'] in ('2D', '3D'):
-            clean_input_params['dimensions'] = input_params['dimensions']
-        else:
-            raise ModelError(
-                'Неверный пространственный охват, '
-                'обратитесь к техническому специалисту.')
-
-        if input_params['device_class'] in CAPACITORS.keys():
-            clean_input_params['device_class'] = input_params['device_class']
-        else:
-            raise ModelError(
-                'Неверный пользовательский класс, '
-                'обратитесь к техническому специалисту.')
-
-        return clean_input_params
+                               team, logger, output, **kwargs)
 
-    def validate_model_params(model_params, input_params):
-        clean_model_params = {}
-
-        vector_length = utils.to_float(model_params['vector_length'])
-        if vector_length > 0:
-            clean_model_params['vector_length'] = vector_length
-        else:
-            raise ModelError('Длина вектора не может быть ниже 0.')
-
-        clean_model_params['alpha_x'] = utils.to_float(
-            model_params['alpha_x'])
-        clean_model_params['beta_y'] = utils.to_float(
-            model_params['beta_y'])
-        if input_params['dimensions'] == '3D':
-            clean_model_params['gamma_z'] = utils.to_float(
-                model_params['gamma_z'])
+    def validate_pre_production(self, input_params, model_params,
+                                components):
+        clean_input_params, clean_model_params, clean_components = (
+            AbstractModel.validate_pre_production(
+                self, input_params, model_params, components))
 
         # Not needed, but can be useful if power_capacity of a component is
         # a single integer, not an interval
@@ -84,47 +153,24 @@ class ITravel(AbstractModel):
         #         re.match(
         #             '(\d+)-(\d+)', model_params['power_capacity']).groups())
 
-        team_args = ('base_station', 'point_of_interest', 'p1', 'p2',
-                     'center_shift', 'matrix')
-        for name in team_args:
-            clean_model_params[name] = json.loads(model_params[name])
-
-        return clean_model_params
-
-    def validate_components(self, components, input_params):
-        clean_components = {}
-        if not components['critical_errors_control'] == 'True':
-            raise ModelError(
-                'Ваша система должна включать модуль '
-                'контроля критических помех.')
+        # the validated components may be shared by the phases
+        clean_components = dict(clean_components, right_capacitor=(
+            CAPACITORS[clean_input_params['device_class']] ==
+            clean_components['power_capacity']))
 
-        clean_components['security_quality'] = utils.to_int(
-            components['security_quality'])
-        clean_components['capacitor_quality'] = utils.to_int(
-            components['capacitor_quality'])
-
-        clean_components['right_capacitor'] = (
-            CAPACITORS[input_params['device_class']] ==
-            components['power_capacity'])
-
-        return clean_components
-
-    def team_arguments(self, input_params):
-        AbstractModel.team_arguments(self, input_params)
+        return clean_input_params, clean_model_params, clean_components
 
+    def generate_team_arguments(self, input_params, rng):
         clean_input_params = self.validate_input_params(input_params)
 
-        if clean_input_params['dimensions'] == '2D':
-            dim = 2
-        else:
-            dim = 3
+        dim = DIMENSIONS[clean_input_params['dimensions']]
 
-        base_station = rnd_vector(dim)
+        base_station = rnd_vector(dim, rng)
         point_of_interest = POINT_OF_INTEREST[:dim]
         p1 = P1[:dim]
         p2 = P2[:dim]
-        center_shift = rnd_vector(dim)
-        matrix = random.choice(MATRIXES[dim])
+        center_shift = rnd_vector(dim, rng)
+        matrix = rng.choice(MATRIXES[dim])
 
         return {
             'base_station': (base_station),
@@ -142,84 +188,43 @@ class ITravel(AbstractModel):
         #     'center_shift': str(center_shift),
         #     'matrix': str(matrix)}
 
-    def compute_2d(self, model_params):
-        navigator_coords = [
-            53 + model_params['base_station'][0],
-            -36 + model_params['base_station'][1]]
-
-        transformed_navi = [
-            navigator_coords[0] * model_params['matrix'][0][0] +
-            navigator_coords[1] * model_params['matrix'][0][1] +
-            model_params['center_shift'][0],
+    def compute(self, model_params, dim):
+        '''
+            Return value:
+                vector_length, [alpha_x, beta_y[, gamma_z]]
+        '''
+        # one team, the exact lengths cost nothing and score
+        # the submissions as they always were
+        vector_lengths, angles = navigation_vectors(
+            *stack_navigation_params([model_params], dim), exact=True)
+        return float(vector_lengths[0]), angles[0].tolist()
 
-            navigator_coords[0] * model_params['matrix'][1][0] +
-            navigator_coords[1] * model_params['matrix'][1][1] +
-            model_params['center_shift'][1]]
+    def compute_2d(self, model_params):
+        return self.compute(model_params, 2)[0]
 
-        vector_length = (
-            ((model_params['point_of_interest'][0] -
-              transformed_navi[0]) ** 2 +
-             (model_params['point_of_interest'][1] -
-              transformed_navi[1]) ** 2) ** .5)
+    def compute_3d(self, model_params):
+        return self.compute(model_params, 3)[0]
 
-        alpha_x = math.acos(
-            (model_params['point_of_interest'][0] -
-             transformed_navi[0]) / vector_length)
-        alpha_x = math.degrees(alpha_x)
+    def navigation_term(self, clean_input_params, clean_model_params,
+                        clean_components):
+        '''
+        Return value:
+            the vector length part of the quality, accuracy text
+        '''
+        vector_length = self.compute(
+            clean_model_params,
+            DIMENSIONS[clean_input_params['dimensions']])[0]
 
-        return vector_length
+        length_diff = abs(
+            vector_length - clean_model_params['vector_length'])
+        if length_diff < 2:
+            accuracy_text = 'В рамках стандартов.'
+        else:
+            accuracy_text = 'Низкая.'
+        return 100 - length_diff * 10, accuracy_text
 
-    def compute_3d(self, model_params):
-        navigator_coords = [
-            53 + model_params['base_station'][0],
-            -36 + model_params['base_station'][1],
-            54 + model_params['base_station'][2]]
-
-        transformed_navi = [
-            navigator_coords[0] * model_params['matrix'][0][0] +
-            navigator_coords[1] * model_params['matrix'][0][1] +
-            navigator_coords[2] * model_params['matrix'][0][2] +
-            model_params['center_shift'][0],
-
-            navigator_coords[0] * model_params['matrix'][1][0] +
-            navigator_coords[1] * model_params['matrix'][1][1] +
-            navigator_coords[2] * model_params['matrix'][1][2] +
-            model_params['center_shift'][1],
-
-            navigator_coords[0] * model_params['matrix'][2][0] +
-            navigator_coords[1] * model_params['matrix'][2][1] +
-            navigator_coords[2] * model_params['matrix'][2][2] +
-            model_params['center_shift'][2]]
-
-        vector_length = (
-            ((model_params['point_of_interest'][0] -
-              transformed_navi[0]) ** 2 +
-             (model_params['point_of_interest'][1] -
-              transformed_navi[1]) ** 2 +
-             (model_params['point_of_interest'][2] -
-              transformed_navi[2]) ** 2) ** .5)
-
-        alpha_x = math.acos(
-            (model_params['point_of_interest'][0] -
-             transformed_navi[0]) / vector_length)
-        beta_y = math.acos(
-            (model_params['point_of_interest'][1] -
-             transformed_navi[1]) / vector_length)
-        gamma_z = math.acos(
-            (model_params['point_of_interest'][2] -
-             transformed_navi[2]) / vector_length)
-        alpha_x = math.degrees(alpha_x)
-        beta_y = math.degrees(beta_y)
-        gamma_z = math.degrees(gamma_z)
-
-        # print(alpha_x)
-        # print(beta_y)
-        # print(gamma_z)
-        # print(vector_length)
-
-        return vector_length
-
-    def pre_production(self, input_params, model_params, components):
+    def simulate_pre_production(self, clean_input_params, clean_model_params,
+                                clean_components):
         '''
             input_params:
                 dimensions
@@ -235,53 +240,32 @@ class ITravel(AbstractModel):
                 power_capacity
                 capacitor_quality
         '''
-        AbstractModel.pre_production(
-            self, input_params, model_params, components)
-
-        clean_input_params = self.validate_input_params(input_params)
-        clean_model_params = self.validate_model_params(
-            model_params, input_params)
-        clean_components = self.validate_components(components, input_params)
-
-        if clean_input_params['dimensions'] == '2D':
-            vector_length = self.compute_2d(clean_model_params)
-        else:
-            vector_length = self.compute_3d(clean_model_params)
-
-        length_diff = abs(vector_length - model_params['vector_length'])
+        length_quality, accuracy_text = self.term(
+            'navigation', self.navigation_term, clean_input_params,
+            clean_model_params, clean_components)
         quality_base = (
-            100 - length_diff * 10 + clean_components['security_quality'] +
+            length_quality + clean_components['security_quality'] +
             clean_components['capacitor_quality'])
         if not clean_components['right_capacitor']:
             quality_base -= 20
 
         quality = quality_base / 2
 
-        if length_diff < 2:
-            accuracy_text = 'В рамках стандартов.'
-        else:
-            accuracy_text = 'Низкая.'
-
         interm_params = (
             {'accuracy': accuracy_text},
             {'quality': quality})
 
-        self.ml.check_interm_params(self.model, *interm_params)
         return interm_params
 
-    def production(self, input_params, interm_params,
-                   hidden_params, components):
-        AbstractModel.production(
-            self, input_params, interm_params, hidden_params, components)
+    def simulate_production(self, input_params, interm_params,
+                            hidden_params, components):
         clean_input_params = self.validate_input_params(input_params)
         if clean_input_params['dimensions'] == '2D':
             coverage_text = 'Только поверхность Земли.'
         else:
             coverage_text = (
                 'Все среды, до верхней границы атмосферы включительно.')
-        output_params = {
+        return {
             'quality': hidden_params['quality'],
             'coverage': coverage_text,
             'device_class': clean_input_params['device_class']}
-        self.ml.check_output_params(self.model, output_params)
-        return output_params
@@ -1,23 +1,7 @@
 from itravel import ITravel
+from mockloader import MockModelLoader
 
-
-class MockML(object):
-    def check_model(self, model):
-        pass
-
-    def check_input_params(self, model, input_params):
-        pass
-
-    def check_model_params(self, model, model_params):
-        pass
-
-    def check_components(self, model, components):
-        pass
-
-    def check_interm_params(self, model, interm_params, hidden_params):
-        pass
-
-ml = MockML()
+ml = MockModelLoader()
 
 s = ITravel(ml, 'foo', 'logger', 'out')
 inp = {'dimensions': '3D', 'device_class': 'tourist'}
@@ -0,0 +1,97 @@
+# -*- coding: UTF-8 -*-
+import json
+import math
+import unittest
+
+import itravel
+from mockloader import MockModelLoader
+
+
+def scalar_navigation(model_params, dim):
+    '''
+    The per-team formula of compute_2d and compute_3d, the sums are
+    made with + from left to right as there: sum() of floats is
+    compensated since Python 3.12 and may differ in the last bit
+    '''
+    navigator_coords = [itravel.NAVIGATOR_COORDS[i] +
+                        model_params['base_station'][i] for i in range(dim)]
+    vector = []
+    for i in range(dim):
+        transformed = navigator_coords[0] * model_params['matrix'][i][0]
+        for j in range(1, dim):
+            transformed += navigator_coords[j] * model_params['matrix'][i][j]
+        transformed += model_params['center_shift'][i]
+        vector.append(model_params['point_of_interest'][i] - transformed)
+    squares = vector[0] ** 2
+    for v in vector[1:]:
+        squares += v ** 2
+    vector_length = squares ** .5
+    return vector_length, [math.degrees(math.acos(v / vector_length))
+                           for v in vector]
+
+
+class CheckNavigationVectors(unittest.TestCase):
+    def setUp(self):
+        self.model = itravel.ITravel(MockModelLoader(), 'foo', 'logger', 'out')
+
+    def team_params(self, dimensions):
+        return self.model.team_arguments(
+            {'dimensions': dimensions, 'device_class': 'tourist'})
+
+    def batch_params(self, dimensions):
+        return [itravel.ITravel(
+            MockModelLoader(), 'team{}'.format(i), None, None
+        ).team_arguments({'dimensions': dimensions, 'device_class': 'tourist'})
+            for i in range(1000)]
+
+    def test_batch(self):
+        for dimensions, dim in itravel.DIMENSIONS.items():
+            params = self.batch_params(dimensions)
+            self.assertGreater(
+                len(set(json.dumps(p, sort_keys=True) for p in params)), 900)
+            lengths, angles = itravel.navigation_vectors(
+                *itravel.stack_navigation_params(params, dim))
+            self.assertEqual(angles.shape, (1000, dim))
+            for i, p in enumerate(params):
+                length, p_angles = scalar_navigation(p, dim)
+                # sqrt and einsum may differ from the formula
+                # in the last bits
+                self.assertAlmostEqual(lengths[i], length, delta=1e-9)
+                for angle, p_angle in zip(angles[i], p_angles):
+                    self.assertAlmostEqual(angle, p_angle, delta=1e-9)
+
+    def test_exact(self):
+        for dimensions, dim in itravel.DIMENSIONS.items():
+            params = self.batch_params(dimensions)
+            lengths, _ = itravel.navigation_vectors(
+                *itravel.stack_navigation_params(params, dim), exact=True)
+            self.assertEqual(lengths.tolist(),
+                             [scalar_navigation(p, dim)[0] for p in params])
+
+    def test_compute(self):
+        params = self.team_params('3D')
+        self.assertEqual(self.model.compute_3d(params),
+                         scalar_navigation(params, 3)[0])
+        self.assertEqual(self.model.compute_2d(params),
+                         scalar_navigation(params, 2)[0])
+
+    def test_pre_production(self):
+        input_params = {'dimensions': '2D', 'device_class': 'tourist'}
+        params = self.team_params('2D')
+        length, angles = scalar_navigation(params, 2)
+        model_params = {name: json.dumps(val) for name, val in params.items()}
+        model_params.update({'vector_length': str(length),
+                             'alpha_x': str(angles[0]),
+                             'beta_y': str(angles[1])})
+        components = {'critical_errors_control': 'True',
+                      'security_quality': '10',
+                      'capacitor_quality': '20',
+                      'power_capacity': '2000-4000'}
+        open_params, hidden_params = self.model.pre_production(
+            input_params, model_params, components)
+        self.assertEqual(open_params, {'accuracy': 'В рамках стандартов.'})
+        self.assertAlmostEqual(hidden_params['quality'], 65)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+"""
+Cache of the model results for the resubmitted parameters.
+
+    cache = ResultCache(max_bytes=64 * 2 ** 20, ttl=3600)
+    model = GlobalNav(ml, team, logger, output, result_cache=cache)
+
+The same cache can be shared by the models of all the teams, the keys
+hold the model name and the team. The values are kept pickled, so
+the callers never share the cached dicts. The model fields listed in
+volatile_params are rendered again on every hit.
+
+A ResultCache given as term_cache keeps the terms of the quality the
+models declare in term_dependencies instead, keyed by the model name
+and the values of the params every term depends on. A changed
+component then only costs the terms depending on it:
+
+    model = OxygenRegeneration(ml, team, logger, output, term_cache=cache)
+"""
+from collections import OrderedDict
+import pickle
+import threading
+import time
+
+import utils
+
+
+def result_key(model, team, *params):
+    '''
+    Return value:
+        the canonical hash of the parameters or None if they
+        can not be hashed (not JSON data)
+    '''
+    try:
+        return utils.stable_digest(model, team, *params)
+    except (TypeError, ValueError):
+        return None
+
+
+class ResultCache(object):
+    def __init__(self, max_entries=100000, max_bytes=64 * 2 ** 20, ttl=None,
+                 clock=time.monotonic):
+        '''
+        Parameters:
+            max_entries     least recently used results are dropped above
+            max_bytes       the same for the total size of pickled results
+            ttl     seconds a result is kept, None keeps it until dropped
+        '''
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.clock = clock
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # key: (expires, pickled value)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        '''
+        Return value:
+            a fresh copy of the cached value or None
+        '''
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] is not None and \
+                    entry[0] <= self.clock():
+                self._drop(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return pickle.loads(entry[1])
+
+    def put(self, key, value):
+        try:
+            data = pickle.dumps(value, 2)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            return
+        if len(data) > self.max_bytes:
+            return
+        expires = None if self.ttl is None else self.clock() + self.ttl
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (expires, data)
+            self.size += len(data)
+            while (len(self._entries) > self.max_entries or
+                    self.size > self.max_bytes):
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _drop(self, key):
+        self.size -= len(self._entries.pop(key)[1])
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'bytes': self.size,
+                    'hits': self.hits, 'misses': self.misses,
+                    'evictions': self.evictions}
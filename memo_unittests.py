@@ -0,0 +1,158 @@
+import random
+import unittest
+
+from abstractmodel import AbstractModel
+import benchmark
+import chem1
+import chem2
+import globalnav
+import itravel
+import memo
+from mockloader import CountingModelLoader, MockModelLoader
+
+
+class MockClock(object):
+    def __init__(self):
+        self.now = 0.
+
+    def __call__(self):
+        return self.now
+
+
+class CheckResultCache(unittest.TestCase):
+    def test_lru(self):
+        cache = memo.ResultCache(max_entries=2)
+        cache.put('a', {'x': 1})
+        cache.put('b', {'x': 2})
+        self.assertEqual(cache.get('a'), {'x': 1})
+        cache.put('c', {'x': 3})
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), {'x': 1})
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+    def test_copies(self):
+        cache = memo.ResultCache()
+        cache.put('a', {'x': [1]})
+        cache.get('a')['x'].append(2)
+        self.assertEqual(cache.get('a'), {'x': [1]})
+
+    def test_ttl(self):
+        clock = MockClock()
+        cache = memo.ResultCache(ttl=10, clock=clock)
+        cache.put('a', 1)
+        clock.now = 9.9
+        self.assertEqual(cache.get('a'), 1)
+        clock.now = 10
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual((len(cache), cache.size), (0, 0))
+
+    def test_bytes(self):
+        cache = memo.ResultCache(max_bytes=300)
+        for i in range(10):
+            cache.put(i, 'x' * 100)
+        self.assertLessEqual(cache.size, 300)
+        self.assertEqual(len(cache), 2)
+        cache.put('big', 'x' * 1000)
+        self.assertIsNone(cache.get('big'))
+
+    def test_key(self):
+        self.assertEqual(memo.result_key('M', 't', {'a': 1, 'b': 2}),
+                         memo.result_key('M', 't', {'b': 2, 'a': 1}))
+        self.assertNotEqual(memo.result_key('M', 't', {'a': 1}),
+                            memo.result_key('M', 'u', {'a': 1}))
+        self.assertIsNone(memo.result_key('M', 't', {(1, 2): 1}))
+
+
+class MockModel(AbstractModel):
+    volatile_params = ('text',)
+
+    def __init__(self, ml, team, logger, output, **kwargs):
+        AbstractModel.__init__(self, ml, self.__class__.__name__,
+                               team, logger, output, **kwargs)
+        self.runs = 0
+        self.renders = 0
+
+    def render_volatile_params(self, clean_input_params, clean_model_params,
+                               clean_components):
+        self.renders += 1
+        return {'text': 'render {}'.format(self.renders)}
+
+    def simulate_pre_production(self, clean_input_params, clean_model_params,
+                                clean_components):
+        self.runs += 1
+        open_params = self.render_volatile_params(
+            clean_input_params, clean_model_params, clean_components)
+        open_params['x'] = clean_model_params['x']
+        return open_params, {'quality': clean_model_params['x']}
+
+
+class CheckMemoization(unittest.TestCase):
+    def test_volatile(self):
+        ml = CountingModelLoader()
+        model = MockModel(ml, 'foo', None, None,
+                          result_cache=memo.ResultCache())
+        first = model.pre_production({}, {'x': 1}, {})
+        second = model.pre_production({}, {'x': 1}, {})
+        self.assertEqual(first, ({'text': 'render 1', 'x': 1},
+                                 {'quality': 1}))
+        self.assertEqual(second, ({'text': 'render 2', 'x': 1},
+                                  {'quality': 1}))
+        self.assertEqual((model.runs, ml.checks.count('input_params')), (1, 1))
+        results = model.pre_production_batch([({}, {'x': 1}, {}),
+                                              ({}, {'x': 2}, {})])
+        self.assertEqual([r[0][1]['quality'] for r in results], [1, 2])
+        self.assertEqual(model.runs, 2)
+        model.pre_production({}, {'x': 2}, {})
+        self.assertEqual(model.runs, 2)
+
+    def test_rocket_fuel(self):
+        model = chem2.RocketFuel(MockModelLoader(), 'foo', None, None,
+                                 result_cache=memo.ResultCache())
+        model_params = {'oxidizer': 'oxygen', 'fuel': 'DMH',
+                        'combustion_heat': '9315', 'radicals_amount': '1'}
+        first = model.pre_production({}, model_params, {})
+        second = model.pre_production({}, model_params, {})
+        self.assertEqual(sorted(first[0]), sorted(second[0]))
+        self.assertEqual(first[1], second[1])
+        self.assertEqual(model.result_cache.stats()['hits'], 1)
+
+
+class CheckTermCache(unittest.TestCase):
+    def test_components_change(self):
+        makers = dict((model_class, make_submission)
+                      for model_class, make_submission in benchmark.MODELS)
+        for model_class in (chem1.OxygenRegeneration, globalnav.GlobalNav,
+                            itravel.ITravel):
+            cache = memo.ResultCache()
+            model = model_class(MockModelLoader(), 'foo', None, None,
+                                term_cache=cache)
+            plain = model_class(MockModelLoader(), 'foo', None, None)
+            rng = random.Random(0)
+            submissions = [makers[model_class](plain, rng)
+                           for _ in range(10)]
+            terms = len(model_class.term_dependencies)
+            for i, (input_params, model_params, _) in enumerate(submissions):
+                misses = cache.stats()['misses']
+                for _, _, components in submissions:
+                    params = input_params, model_params, components
+                    self.assertEqual(model.pre_production(*params),
+                                     plain.pre_production(*params))
+                # only the first components made the terms
+                self.assertEqual(cache.stats()['misses'] - misses, terms)
+            self.assertEqual(cache.stats()['hits'], 90 * terms)
+
+            # one of the terms depends on it
+            changed = {chem1.OxygenRegeneration: 'electricity_amount',
+                       globalnav.GlobalNav: 'pos_crit_accel',
+                       itravel.ITravel: 'vector_length'}[model_class]
+            input_params, model_params, components = submissions[0]
+            model_params = dict(model_params, **{changed: '1'})
+            misses = cache.stats()['misses']
+            self.assertEqual(
+                model.pre_production(input_params, model_params, components),
+                plain.pre_production(input_params, model_params, components))
+            self.assertEqual(cache.stats()['misses'] - misses, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
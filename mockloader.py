@@ -0,0 +1,201 @@
+# -*- coding: UTF-8 -*-
+"""
+In-process model loader for the tests and the benchmarks.
+
+MockModelLoader makes the same checks of the parameters as the model
+loader service: the model must be known, every parameter dict must
+have all the required names, no unknown names and JSON values only.
+The names are taken from the models schemas and from OUTPUT_PARAMS
+once per model, then every check is a couple of set operations:
+
+    ml = MockModelLoader()
+    model = GlobalNav(ml, team, logger, output)
+"""
+from collections import namedtuple
+import threading
+
+from errors import ModelError
+import registry
+
+JSON_TYPES = (str, int, float, bool, list, dict, type(None))
+
+# Parameters the models make, (required names, optional names)
+# for the open and the hidden intermediate and the output parameters
+OUTPUT_PARAMS = {
+    'OxygenRegeneration': {
+        'interm': (('real_oxygen_allocation',
+                    'real_carbon_dioxide_absorption'), ()),
+        'hidden': (('quality',), ()),
+        'output': (('quality',), ())},
+    'RocketFuel': {
+        'interm': (('combustion_heat', 'density', 'chamber_temperature',
+                    'rate_constant'), ()),
+        'hidden': (('quality',), ()),
+        'output': (('quality',), ())},
+    'GlobalNav': {
+        'interm': (('coverage', 'orbit_radius_text'), ()),
+        'hidden': (('quality', 'revolution_period'), ()),
+        'output': (('quality', 'revolution_period'), ())},
+    'ITravel': {
+        'interm': (('accuracy',), ()),
+        'hidden': (('quality',), ()),
+        'output': (('quality', 'coverage', 'device_class'), ())},
+    'Security': {
+        'interm': (('critical_error_handling', 'work_correctness'),
+                   ('super-bonus',)),
+        'hidden': (('quality',), ()),
+        'output': (('quality', 'critical_error_handling'), ())},
+}
+
+
+# required - frozenset of names, allowed - frozenset or None for any
+ParamsSpec = namedtuple('ParamsSpec', 'kind required allowed')
+ModelDescription = namedtuple(
+    'ModelDescription', 'input model components interm hidden output')
+
+
+def schema_spec(kind, schema):
+    '''
+    The spec of the parameters validated by a schema.Schema
+    '''
+    if schema is None:
+        return ParamsSpec(kind, frozenset(), None)
+    return ParamsSpec(
+        kind,
+        frozenset(f.name for f in schema.fields if f.required),
+        frozenset(f.name for f in schema.fields))
+
+
+def names_spec(kind, names):
+    required, optional = names
+    return ParamsSpec(kind, frozenset(required),
+                      frozenset(required) | frozenset(optional))
+
+
+def describe_model(name):
+    '''
+    Make the ModelDescription of a registry model
+    '''
+    model_class = registry.get_model(name)
+    outputs = OUTPUT_PARAMS.get(name, {})
+    return ModelDescription(
+        schema_spec('input_params', model_class.input_params_schema),
+        schema_spec('model_params', model_class.model_params_schema),
+        schema_spec('components', model_class.components_schema),
+        *[names_spec(kind, outputs[key]) if key in outputs
+          else ParamsSpec(kind, frozenset(), None)
+          for key, kind in (('interm', 'interm_params'),
+                            ('hidden', 'hidden_params'),
+                            ('output', 'output_params'))])
+
+
+ANY_MODEL = ModelDescription(*[
+    ParamsSpec(kind, frozenset(), None)
+    for kind in ('input_params', 'model_params', 'components',
+                 'interm_params', 'hidden_params', 'output_params')])
+
+
+class MockModelLoader(object):
+    def __init__(self, descriptions=None, allow_unknown=False):
+        '''
+        Parameters:
+            descriptions    {model name: ModelDescription} on top of
+                            the registry models
+            allow_unknown   accept any parameters of unknown models
+                            instead of raising ModelError
+        '''
+        self.descriptions = dict(descriptions or {})
+        self.allow_unknown = allow_unknown
+        self._lock = threading.Lock()
+
+    def description(self, model):
+        description = self.descriptions.get(model)
+        if description is not None:
+            return description
+        with self._lock:
+            if model not in self.descriptions:
+                if model in registry.MODELS:
+                    self.descriptions[model] = describe_model(model)
+                elif self.allow_unknown:
+                    self.descriptions[model] = ANY_MODEL
+                else:
+                    raise ModelError(
+                        'Неизвестная модель {model}.'.format(model=model))
+            return self.descriptions[model]
+
+    def check_params(self, model, spec, params):
+        if not isinstance(params, dict):
+            raise ModelError(
+                'Параметры {kind} модели {model} должны быть словарем.'.format(
+                    kind=spec.kind, model=model))
+        names = params.keys()
+        missing = spec.required - names
+        if missing:
+            raise ModelError(
+                'Не хватает параметров {kind} модели {model}: '
+                '{names}.'.format(kind=spec.kind, model=model,
+                                  names=', '.join(sorted(missing))))
+        if spec.allowed is not None and not spec.allowed.issuperset(names):
+            raise ModelError(
+                'Неизвестные параметры {kind} модели {model}: '
+                '{names}.'.format(kind=spec.kind, model=model,
+                                  names=', '.join(sorted(
+                                      set(names) - spec.allowed))))
+        for name, value in params.items():
+            if not isinstance(value, JSON_TYPES):
+                raise ModelError(
+                    'Недопустимое значение параметра {name} модели '
+                    '{model}.'.format(name=name, model=model))
+
+    def check_model(self, model):
+        self.description(model)
+
+    def check_input_params(self, model, input_params):
+        self.check_params(model, self.description(model).input, input_params)
+
+    def check_model_params(self, model, model_params):
+        self.check_params(model, self.description(model).model, model_params)
+
+    def check_components(self, model, components):
+        self.check_params(
+            model, self.description(model).components, components)
+
+    def check_interm_params(self, model, interm_params, hidden_params):
+        description = self.description(model)
+        self.check_params(model, description.interm, interm_params)
+        self.check_params(model, description.hidden, hidden_params)
+
+    def check_output_params(self, model, output_params):
+        self.check_params(model, self.description(model).output,
+                          output_params)
+
+
+class CountingModelLoader(MockModelLoader):
+    '''
+    MockModelLoader remembering the checks made, by the name
+    of the checked parameters
+    '''
+    def __init__(self, descriptions=None, allow_unknown=True):
+        MockModelLoader.__init__(self, descriptions, allow_unknown)
+        self.checks = []
+
+    def check_input_params(self, model, input_params):
+        self.checks.append('input_params')
+        MockModelLoader.check_input_params(self, model, input_params)
+
+    def check_model_params(self, model, model_params):
+        self.checks.append('model_params')
+        MockModelLoader.check_model_params(self, model, model_params)
+
+    def check_components(self, model, components):
+        self.checks.append('components')
+        MockModelLoader.check_components(self, model, components)
+
+    def check_interm_params(self, model, interm_params, hidden_params):
+        self.checks.append('interm_params')
+        MockModelLoader.check_interm_params(
+            self, model, interm_params, hidden_params)
+
+    def check_output_params(self, model, output_params):
+        self.checks.append('output_params')
+        MockModelLoader.check_output_params(self, model, output_params)
@@ -0,0 +1,59 @@
+# -*- coding: UTF-8 -*-
+import unittest
+
+from errors import ModelError
+import mockloader
+
+
+class CheckMockModelLoader(unittest.TestCase):
+    def setUp(self):
+        self.ml = mockloader.MockModelLoader()
+
+    def test_model(self):
+        self.ml.check_model('GlobalNav')
+        self.assertIs(self.ml.description('GlobalNav'),
+                      self.ml.description('GlobalNav'))
+        with self.assertRaises(ModelError) as cm:
+            self.ml.check_model('Foo')
+        self.assertEqual(cm.exception.value, 'Неизвестная модель Foo.')
+        mockloader.MockModelLoader(allow_unknown=True).check_input_params(
+            'Foo', {'x': 1})
+
+    def test_params(self):
+        self.ml.check_input_params(
+            'GlobalNav', {'revolution_period': '90',
+                          'orbital_inclination': '10'})
+        for input_params in ({'revolution_period': '90'},
+                             {'revolution_period': '90',
+                              'orbital_inclination': '10', 'x': '1'},
+                             {'revolution_period': object(),
+                              'orbital_inclination': '10'},
+                             None):
+            self.assertRaises(ModelError, self.ml.check_input_params,
+                              'GlobalNav', input_params)
+        # gamma_z is optional, the team arguments are required
+        model_params = dict((name, '1') for name in (
+            'vector_length', 'alpha_x', 'beta_y', 'base_station',
+            'point_of_interest', 'p1', 'p2', 'center_shift', 'matrix'))
+        self.ml.check_model_params('ITravel', model_params)
+        del model_params['matrix']
+        self.assertRaises(ModelError, self.ml.check_model_params,
+                          'ITravel', model_params)
+        # no schema, anything goes
+        self.ml.check_model_params('Security', {'psi': '1', 'x': [1]})
+
+    def test_outputs(self):
+        self.ml.check_interm_params(
+            'Security',
+            {'critical_error_handling': 'high', 'work_correctness': 'OK',
+             'super-bonus': True}, {'quality': 100})
+        self.assertRaises(ModelError, self.ml.check_interm_params,
+                          'Security', {'work_correctness': 'OK'},
+                          {'quality': 100})
+        self.ml.check_output_params('RocketFuel', {'quality': 1})
+        self.assertRaises(ModelError, self.ml.check_output_params,
+                          'RocketFuel', {'quality': 1, 'x': 2})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+"""
+Model classes by name.
+
+Nothing is imported until a model is asked for, so a worker scoring
+one model never loads the modules (and tables) of the others:
+
+    model_class = registry.get_model('GlobalNav')
+    model = registry.create_model('GlobalNav', ml, team, logger, output)
+"""
+import importlib
+import threading
+
+# name: 'module:class'
+MODELS = {
+    'OxygenRegeneration': 'chem1:OxygenRegeneration',
+    'RocketFuel': 'chem2:RocketFuel',
+    'GlobalNav': 'globalnav:GlobalNav',
+    'ITravel': 'itravel:ITravel',
+    'Security': 'security:Security',
+}
+
+_classes = {}
+_lock = threading.Lock()
+
+
+def register(name, path):
+    '''
+    Add a model or move it to another class
+    Arguments:
+        name - model name
+        path - 'module:class' of an AbstractModel subclass
+    '''
+    with _lock:
+        MODELS[name] = path
+        _classes.pop(name, None)
+
+
+def model_names():
+    return sorted(MODELS)
+
+
+def get_model(name):
+    '''
+    Import the model class on the first call
+    '''
+    model_class = _classes.get(name)
+    if model_class is not None:
+        return model_class
+    with _lock:
+        if name not in _classes:
+            if name not in MODELS:
+                raise ValueError('Unknown model {}, known are {}'.format(
+                    name, ', '.join(model_names())))
+            module_name, class_name = MODELS[name].split(':')
+            module = importlib.import_module(module_name)
+            _classes[name] = getattr(module, class_name)
+        return _classes[name]
+
+
+def create_model(name, ml, team, logger, output, **kwargs):
+    return get_model(name)(ml, team, logger, output, **kwargs)
@@ -0,0 +1,59 @@
+import os
+import subprocess
+import sys
+import unittest
+
+from abstractmodel import AbstractModel
+from mockloader import MockModelLoader
+import registry
+
+
+class CheckRegistry(unittest.TestCase):
+    def test_models(self):
+        self.assertEqual(registry.model_names(), [
+            'GlobalNav', 'ITravel', 'OxygenRegeneration', 'RocketFuel',
+            'Security'])
+        for name in registry.model_names():
+            model_class = registry.get_model(name)
+            self.assertEqual(model_class.__name__, name)
+            self.assertTrue(issubclass(model_class, AbstractModel))
+            self.assertIs(registry.get_model(name), model_class)
+
+    def test_create_model(self):
+        model = registry.create_model('RocketFuel', MockModelLoader(), 'foo',
+                                      None, None)
+        self.assertEqual((model.model, model.team), ('RocketFuel', 'foo'))
+
+    def test_unknown(self):
+        self.assertRaises(ValueError, registry.get_model, 'Foo')
+
+    def test_register(self):
+        registry.register('Abstract', 'abstractmodel:AbstractModel')
+        try:
+            self.assertIs(registry.get_model('Abstract'), AbstractModel)
+        finally:
+            registry.MODELS.pop('Abstract')
+
+    def test_lazy(self):
+        sys.modules.pop('security', None)
+        registry._classes.pop('Security', None)
+        registry.get_model('RocketFuel')
+        self.assertNotIn('security', sys.modules)
+        registry.get_model('Security')
+        # imported, but the tables are not built yet
+        self.assertEqual(
+            sys.modules['security'].rotation_packs.cache_info().currsize, 0)
+
+    def test_no_numpy(self):
+        # numpy is most of the start time, the models without arrays
+        # must not import it; a fresh interpreter, this one has it
+        code = ('import sys, registry; '
+                'assert "numpy" not in sys.modules, "registry"; '
+                'registry.get_model("RocketFuel"); '
+                'assert "numpy" not in sys.modules, "RocketFuel"')
+        subprocess.check_call([sys.executable, '-c', code],
+                              cwd=os.path.dirname(os.path.abspath(__file__)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,301 @@
+"""
+Record the scored submissions and replay them against the current code.
+
+A log holds one scenario per submission: the model, the team, the
+submitted parameters and what the models made of them. Every scenario
+is a zlib-compressed JSON record after its length, so a season of
+submissions stays small and is read one record at a time:
+
+    with LogWriter('season.replay') as log:
+        log.record(model, input_params, model_params, components)
+
+    python replay.py season.replay --loader mockloader:MockModelLoader \\
+        --tolerance hidden_params.quality=1e-9
+
+The replay runs the scenarios again in worker processes and prints
+the fields that changed by more than their tolerance as JSON lines.
+"""
+import argparse
+from collections import deque, namedtuple
+import concurrent.futures
+import json
+import os
+import struct
+import sys
+import traceback
+import zlib
+
+from errors import ModelError
+from ingest import jsonable, load_object
+import registry
+from runner import chunks
+from submission import Submission
+
+MAGIC = b'MODELREPLAY1\n'
+LENGTH = struct.Struct('<I')
+
+SCENARIO_PARAMS = ('input_params', 'model_params', 'components')
+OUTCOME_PARAMS = ('team_arguments', 'interm_params', 'hidden_params',
+                  'output_params', 'error', 'crash')
+
+# field is the dotted path of the value in the scenario
+Difference = namedtuple('Difference', 'field recorded current')
+# index of the scenario in the log, differences - list of Difference
+Drift = namedtuple('Drift', 'index model team differences')
+
+
+def run_scenario(model, input_params, model_params, components):
+    '''
+    Run all the phases of a submission
+    Return value:
+        {'team_arguments': ..., 'interm_params': ..., 'hidden_params': ...,
+         'output_params': ..., 'error': ModelError value or None,
+         'crash': last traceback line or None} as JSON data,
+        the phases after an error are None
+    '''
+    outcome = dict.fromkeys(OUTCOME_PARAMS)
+    submission = Submission(model.model, model.team, input_params,
+                            model_params, components)
+    try:
+        outcome['team_arguments'] = model.team_arguments(
+            submission.input_params)
+        interm_params, hidden_params = model.pre_production(
+            *submission.pre_production_params())
+        outcome['interm_params'] = interm_params
+        outcome['hidden_params'] = hidden_params
+        outcome['output_params'] = model.production(
+            submission.input_params, interm_params, hidden_params,
+            submission.components)
+    except ModelError as e:
+        outcome['error'] = e.value
+    except Exception:
+        # the line numbers of the traceback change with any edit
+        outcome['crash'] = traceback.format_exc().strip().splitlines()[-1]
+    # as it is read back from the log
+    return json.loads(json.dumps(jsonable(outcome)))
+
+
+def encode(scenario):
+    data = zlib.compress(json.dumps(
+        scenario, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+    return LENGTH.pack(len(data)) + data
+
+
+def read_log(path):
+    '''
+    Return value:
+        generator of the scenario dicts of the log
+    '''
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError('{} is not a replay log'.format(path))
+        while True:
+            header = f.read(LENGTH.size)
+            if not header:
+                return
+            data = b''
+            if len(header) == LENGTH.size:
+                length, = LENGTH.unpack(header)
+                data = f.read(length)
+            if not data or len(data) < length:
+                raise ValueError('{} is truncated'.format(path))
+            yield json.loads(zlib.decompress(data).decode('utf-8'))
+
+
+class LogWriter(object):
+    def __init__(self, path, append=False):
+        '''
+        Parameters:
+            path    the log file, made with the header if it does not exist
+            append  add to the scenarios already in the file
+                    instead of starting it anew
+        '''
+        exists = append and os.path.exists(path) and os.path.getsize(path)
+        self.file = open(path, 'ab' if exists else 'wb')
+        if not exists:
+            self.file.write(MAGIC)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.file.close()
+
+    def write(self, scenario):
+        self.file.write(encode(scenario))
+
+    def record(self, model, input_params, model_params, components):
+        '''
+        Run the submission with the AbstractModel and log the scenario
+        Return value:
+            the scenario dict
+        '''
+        scenario = {'model': model.model, 'team': model.team,
+                    'input_params': input_params,
+                    'model_params': model_params, 'components': components}
+        scenario = json.loads(json.dumps(jsonable(scenario)))
+        scenario.update(run_scenario(
+            model, input_params, model_params, components))
+        self.write(scenario)
+        return scenario
+
+
+def tolerance(tolerances, field, default):
+    '''
+    The tolerance of the field or of the nearest enclosing one
+    '''
+    while field:
+        if field in tolerances:
+            return tolerances[field]
+        field = field.rpartition('.')[0]
+    return default
+
+
+def compare(recorded, current, tolerances=None, default_tolerance=0.,
+            field=''):
+    '''
+    Return value:
+        list of Difference of the two JSON values, the numbers
+        may differ by their tolerance from tolerances
+        {dotted field path: absolute tolerance}
+    '''
+    tolerances = tolerances or {}
+    if isinstance(recorded, dict) and isinstance(current, dict):
+        differences = []
+        for key in sorted(set(recorded) | set(current)):
+            differences.extend(compare(
+                recorded.get(key), current.get(key), tolerances,
+                default_tolerance, '{}.{}'.format(field, key).lstrip('.')))
+        return differences
+    if isinstance(recorded, list) and isinstance(current, list) and \
+            len(recorded) == len(current):
+        differences = []
+        for i, (r, c) in enumerate(zip(recorded, current)):
+            differences.extend(compare(
+                r, c, tolerances, default_tolerance,
+                '{}.{}'.format(field, i).lstrip('.')))
+        return differences
+    numbers = (int, float)
+    if isinstance(recorded, numbers) and isinstance(current, numbers) and \
+            not isinstance(recorded, bool) and not isinstance(current, bool):
+        if abs(recorded - current) <= tolerance(
+                tolerances, field, default_tolerance):
+            return []
+    elif recorded == current and type(recorded) is type(current):
+        return []
+    return [Difference(field, recorded, current)]
+
+
+def diff_scenario(scenario, outcome, tolerances=None, default_tolerance=0.):
+    return compare(
+        dict((name, scenario.get(name)) for name in OUTCOME_PARAMS),
+        outcome, tolerances, default_tolerance)
+
+
+_worker = {}
+
+
+def _init_worker(loader_factory, tolerances, default_tolerance,
+                 model_kwargs):
+    _worker.clear()
+    _worker['ml'] = loader_factory()
+    _worker['models'] = {}
+    _worker['kwargs'] = dict(model_kwargs)
+    _worker['tolerances'] = (tolerances, default_tolerance)
+
+
+def _worker_model(name, team):
+    models = _worker['models']
+    if (name, team) not in models:
+        models[name, team] = registry.create_model(
+            name, _worker['ml'], team, None, None, **_worker['kwargs'])
+    return models[name, team]
+
+
+def _replay_chunk(chunk):
+    drifts = []
+    for index, scenario in chunk:
+        try:
+            model = _worker_model(scenario['model'], scenario['team'])
+            outcome = run_scenario(model, *[
+                scenario.get(name) or {} for name in SCENARIO_PARAMS])
+        except Exception:
+            outcome = dict.fromkeys(OUTCOME_PARAMS)
+            outcome['crash'] = traceback.format_exc().strip().splitlines()[-1]
+        differences = diff_scenario(scenario, outcome,
+                                    *_worker['tolerances'])
+        if differences:
+            drifts.append(Drift(index, scenario['model'], scenario['team'],
+                                differences))
+    return drifts
+
+
+def replay(scenarios, loader_factory, tolerances=None, default_tolerance=0.,
+           workers=None, chunksize=256, **model_kwargs):
+    '''
+    Run the scenarios again with the current models
+    Arguments:
+        scenarios - iterable of the scenario dicts, like read_log(path)
+        loader_factory - picklable callable making the model loader,
+            called once in every worker
+        tolerances - {dotted field path: absolute tolerance}, like
+            {'hidden_params.quality': 1e-9, 'output_params': 0.5}
+        workers - number of processes, os.cpu_count() by default
+    Return value:
+        generator of Drift of the changed scenarios, in the log order
+    '''
+    workers = workers or os.cpu_count() or 1
+    with concurrent.futures.ProcessPoolExecutor(
+            workers, initializer=_init_worker,
+            initargs=(loader_factory, tolerances or {}, default_tolerance,
+                      model_kwargs)) as executor:
+        max_pending = 2 * workers
+        pending = deque()
+        for chunk in chunks(enumerate(scenarios), chunksize):
+            pending.append(executor.submit(_replay_chunk, chunk))
+            if len(pending) >= max_pending:
+                for drift in pending.popleft().result():
+                    yield drift
+        while pending:
+            for drift in pending.popleft().result():
+                yield drift
+
+
+def parse_tolerance(text):
+    field, _, value = text.rpartition('=')
+    if not field:
+        raise argparse.ArgumentTypeError(
+            'expected field=tolerance, got {}'.format(text))
+    return field, float(value)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('log', help='replay log made by LogWriter')
+    parser.add_argument('--loader', required=True,
+                        help='module:callable making the model loader')
+    parser.add_argument('--tolerance', type=parse_tolerance, action='append',
+                        default=[], help='field=tolerance, may be repeated')
+    parser.add_argument('--default-tolerance', type=float, default=0.,
+                        help='tolerance of the other numbers')
+    parser.add_argument('--workers', type=int, help='number of processes')
+    args = parser.parse_args(argv)
+
+    drifts = 0
+    for drift in replay(read_log(args.log), load_object(args.loader),
+                        dict(args.tolerance), args.default_tolerance,
+                        args.workers):
+        drifts += 1
+        sys.stdout.write(json.dumps({
+            'index': drift.index, 'model': drift.model, 'team': drift.team,
+            'differences': [d._asdict() for d in drift.differences]},
+            ensure_ascii=False) + '\n')
+    sys.stderr.write('{} scenarios drifted\n'.format(drifts))
+    return 1 if drifts else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,83 @@
+import os
+import random
+import shutil
+import tempfile
+import unittest
+
+import benchmark
+from mockloader import MockModelLoader
+import replay
+
+
+class CheckReplay(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'season.replay')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def record_season(self):
+        rng = random.Random(0)
+        scenarios = []
+        with replay.LogWriter(self.path) as log:
+            for model_class, make_submission in benchmark.MODELS:
+                for team in ('foo', 'bar'):
+                    model = model_class(MockModelLoader(), team, None, None)
+                    for _ in range(5):
+                        scenarios.append(log.record(
+                            model, *make_submission(model, rng)))
+            model = model_class(MockModelLoader(), 'foo', None, None)
+            scenarios.append(log.record(model, {}, {}, {}))
+        return scenarios
+
+    def test_log(self):
+        scenarios = self.record_season()
+        self.assertEqual(list(replay.read_log(self.path)), scenarios)
+        self.assertIsNotNone(scenarios[-1]['error'])
+        self.assertIsNone(scenarios[-1]['hidden_params'])
+        with replay.LogWriter(self.path, append=True) as log:
+            log.write(scenarios[0])
+        self.assertEqual(list(replay.read_log(self.path)),
+                         scenarios + scenarios[:1])
+        with open(self.path, 'rb+') as f:
+            f.truncate(os.path.getsize(self.path) - 1)
+        with self.assertRaises(ValueError):
+            list(replay.read_log(self.path))
+
+    def test_replay(self):
+        scenarios = self.record_season()
+        self.assertEqual(list(replay.replay(
+            replay.read_log(self.path), MockModelLoader, workers=2,
+            chunksize=7)), [])
+
+        scenarios[3]['hidden_params']['quality'] += 1e-6
+        scenarios[8]['team_arguments'] = {}
+        drifts = list(replay.replay(scenarios, MockModelLoader, workers=2,
+                                    chunksize=4))
+        self.assertEqual([drift.index for drift in drifts], [3, 8])
+        field, recorded, current = drifts[0].differences[0]
+        self.assertEqual(field, 'hidden_params.quality')
+        self.assertAlmostEqual(recorded - current, 1e-6)
+        self.assertEqual(list(replay.replay(
+            scenarios[:5], MockModelLoader,
+            {'hidden_params.quality': 1e-3}, workers=1)), [])
+
+    def test_compare(self):
+        tolerances = {'a': .5, 'a.c': 0}
+        self.assertEqual(replay.compare(
+            {'a': {'b': 1., 'c': [1, 2]}, 'd': 'x'},
+            {'a': {'b': 1.25, 'c': [1, 2]}, 'd': 'x'}, tolerances), [])
+        self.assertEqual(replay.compare(
+            {'a': {'b': 1., 'c': [1, 2]}, 'd': 'x'},
+            {'a': {'b': 2., 'c': [1, 3]}, 'e': 'x'}, tolerances), [
+                replay.Difference('a.b', 1., 2.),
+                replay.Difference('a.c.1', 2, 3),
+                replay.Difference('d', 'x', None),
+                replay.Difference('e', None, 'x')])
+        self.assertEqual(replay.compare(True, 1, default_tolerance=1),
+                         [replay.Difference('', True, 1)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,191 @@
+"""
+Append-only columnar store of the scoring results.
+
+The results are kept in a NumPy structured array and flushed to
+memory-mapped .npy segments of one directory. The team, model and
+phase names are stored as codes into the names saved next to the
+segments, so the rows are small and the aggregations run over the
+columns without making Python objects of the rows:
+
+    with ResultStore('results') as store:
+        for result in results:
+            store.append(team, 'GlobalNav', 'production', quality)
+    ResultStore('results').best_quality()  # {('GlobalNav', team): 87.5}
+"""
+import glob
+import json
+import os
+
+import numpy
+from numpy.lib.format import open_memmap
+
+# error codes
+OK = 0
+MODEL_ERROR = 1
+CRASH = 2
+
+DTYPE = numpy.dtype([
+    ('team', numpy.uint32),
+    ('model', numpy.uint16),
+    ('phase', numpy.uint8),
+    ('error', numpy.uint8),
+    ('quality', numpy.float64)])
+
+SEGMENT_PATTERN = 'segment-{:06d}.npy'
+NAMES_FILE = 'names.json'
+
+
+def result_quality(phase, value):
+    '''
+    The quality of a pre_production or production result, nan otherwise
+    '''
+    try:
+        if phase == 'pre_production':
+            return float(value[1]['quality'])
+        if phase == 'production':
+            return float(value['quality'])
+    except (TypeError, KeyError, IndexError, ValueError):
+        pass
+    return float('nan')
+
+
+class Names(object):
+    '''
+    Codes of the names in the order they were seen
+    '''
+    def __init__(self, names=()):
+        self.names = list(names)
+        self.codes = dict((name, i) for i, name in enumerate(self.names))
+
+    def code(self, name):
+        code = self.codes.get(name)
+        if code is None:
+            code = self.codes[name] = len(self.names)
+            self.names.append(name)
+        return code
+
+
+class ResultStore(object):
+    def __init__(self, directory, segment_size=2 ** 20):
+        '''
+        Parameters:
+            directory   the segments directory, made if it does not exist,
+                        the results already there are kept
+            segment_size    rows buffered before they are flushed
+        '''
+        self.directory = directory
+        self.segment_size = segment_size
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        names = {}
+        names_path = os.path.join(directory, NAMES_FILE)
+        if os.path.exists(names_path):
+            with open(names_path, encoding='utf-8') as f:
+                names = json.load(f)
+        self.teams = Names(names.get('teams', ()))
+        self.models = Names(names.get('models', ()))
+        self.phases = Names(names.get('phases', ()))
+        self._segments = len(self.segment_paths())
+        self._buffer = numpy.zeros(segment_size, dtype=DTYPE)
+        self._size = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.flush()
+
+    def segment_paths(self):
+        return sorted(glob.glob(os.path.join(
+            self.directory, SEGMENT_PATTERN.replace('{:06d}', '*'))))
+
+    def append(self, team, model, phase, quality=float('nan'), error=OK):
+        self._buffer[self._size] = (
+            self.teams.code(team), self.models.code(model),
+            self.phases.code(phase), error, quality)
+        self._size += 1
+        if self._size == self.segment_size:
+            self.flush()
+
+    def append_result(self, team, model, phase, value, error=None,
+                      crash=None):
+        '''
+        Append a runner.Result-like outcome of a phase
+        '''
+        if crash is not None:
+            self.append(team, model, phase, error=CRASH)
+        elif error is not None:
+            self.append(team, model, phase, error=MODEL_ERROR)
+        else:
+            self.append(team, model, phase, result_quality(phase, value))
+
+    def flush(self):
+        '''
+        Write the buffered rows as a new segment and save the names
+        '''
+        if self._size:
+            path = os.path.join(self.directory,
+                                SEGMENT_PATTERN.format(self._segments))
+            segment = open_memmap(path + '.tmp', mode='w+', dtype=DTYPE,
+                                  shape=(self._size,))
+            segment[:] = self._buffer[:self._size]
+            segment.flush()
+            del segment
+            os.replace(path + '.tmp', path)
+            self._segments += 1
+            self._size = 0
+        names_path = os.path.join(self.directory, NAMES_FILE)
+        with open(names_path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump({'teams': self.teams.names,
+                       'models': self.models.names,
+                       'phases': self.phases.names}, f, ensure_ascii=False)
+        os.replace(names_path + '.tmp', names_path)
+
+    def segments(self):
+        '''
+        The flushed segments as read-only memory maps, then the buffer
+        '''
+        for path in self.segment_paths():
+            yield numpy.load(path, mmap_mode='r')
+        if self._size:
+            yield self._buffer[:self._size]
+
+    def __len__(self):
+        return sum(len(segment) for segment in self.segments())
+
+    def _selected(self, segment, model, phase):
+        mask = numpy.ones(len(segment), dtype=bool)
+        if model is not None:
+            mask &= segment['model'] == self.models.codes.get(model, -1)
+        if phase is not None:
+            mask &= segment['phase'] == self.phases.codes.get(phase, -1)
+        return segment[mask]
+
+    def best_quality(self, model=None, phase='production'):
+        '''
+        Return value:
+            {(model, team): the best quality of the results without errors}
+        '''
+        shape = (len(self.models.names), len(self.teams.names))
+        best = numpy.full(shape, -numpy.inf)
+        for segment in self.segments():
+            rows = self._selected(segment, model, phase)
+            rows = rows[rows['error'] == OK]
+            numpy.fmax.at(best, (rows['model'], rows['team']),
+                          rows['quality'])
+        model_codes, team_codes = numpy.nonzero(best > -numpy.inf)
+        return dict(
+            ((self.models.names[m], self.teams.names[t]), float(best[m, t]))
+            for m, t in zip(model_codes, team_codes))
+
+    def error_counts(self, model=None, phase=None):
+        '''
+        Return value:
+            {'ok': 10, 'model_error': 2, 'crash': 0}
+        '''
+        counts = numpy.zeros(3, dtype=numpy.int64)
+        for segment in self.segments():
+            rows = self._selected(segment, model, phase)
+            counts += numpy.bincount(rows['error'], minlength=3)[:3]
+        return {'ok': int(counts[OK]), 'model_error': int(counts[MODEL_ERROR]),
+                'crash': int(counts[CRASH])}
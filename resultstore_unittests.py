@@ -0,0 +1,61 @@
+import math
+import os
+import shutil
+import tempfile
+import unittest
+
+from errors import ModelError
+import resultstore
+
+
+class CheckResultStore(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_segments(self):
+        with resultstore.ResultStore(self.directory, segment_size=4) as store:
+            for i in range(10):
+                store.append('team{}'.format(i % 3), 'GlobalNav',
+                             'production', i)
+            self.assertEqual(len(store.segment_paths()), 2)
+            self.assertEqual(len(store), 10)
+        self.assertEqual(len(store.segment_paths()), 3)
+
+        store = resultstore.ResultStore(self.directory)
+        store.append('team0', 'GlobalNav', 'production', 100)
+        store.append('team1', 'GlobalNav', 'production',
+                     error=resultstore.MODEL_ERROR)
+        self.assertEqual(len(store), 12)
+        self.assertEqual(store.best_quality(), {
+            ('GlobalNav', 'team0'): 100., ('GlobalNav', 'team1'): 7.,
+            ('GlobalNav', 'team2'): 8.})
+
+    def test_results(self):
+        store = resultstore.ResultStore(self.directory)
+        store.append_result('foo', 'M', 'pre_production',
+                            ({}, {'quality': 3}))
+        store.append_result('foo', 'M', 'production', {'quality': 5})
+        store.append_result('foo', 'M', 'production', None,
+                            error=ModelError('x'))
+        store.append_result('bar', 'M', 'production', None, crash='trace')
+        store.append_result('bar', 'M', 'team_arguments', {'x': 1})
+        self.assertEqual(store.best_quality(), {('M', 'foo'): 5.})
+        self.assertEqual(store.best_quality(phase='pre_production'),
+                         {('M', 'foo'): 3.})
+        self.assertEqual(store.best_quality(model='N'), {})
+        self.assertEqual(store.error_counts(),
+                         {'ok': 3, 'model_error': 1, 'crash': 1})
+        self.assertEqual(store.error_counts(phase='production'),
+                         {'ok': 1, 'model_error': 1, 'crash': 1})
+        store.flush()
+        segment = next(store.segments())
+        self.assertTrue(math.isnan(segment['quality'][-1]))
+        self.assertTrue(os.path.exists(
+            os.path.join(self.directory, resultstore.NAMES_FILE)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,148 @@
+"""
+Process pool scoring runner.
+
+Spreads a stream of tasks for one model class over worker processes.
+Every worker makes its own model loader once and keeps one model per
+team, the tasks are sent in chunks and the results come back in order.
+
+    runner = ScoringRunner(GlobalNav, MyLoader)
+    for result in runner.run(tasks):
+        ...
+"""
+from collections import deque, namedtuple
+import concurrent.futures
+import itertools
+import os
+import traceback
+
+from errors import ModelError
+import teamstore
+
+
+# phase is 'team_arguments', 'pre_production' or 'production',
+# params are the phase method arguments
+Task = namedtuple('Task', 'team phase params')
+# exactly one of value, error (ModelError), crash (traceback text) is set
+Result = namedtuple('Result', 'value error crash')
+
+BATCH_PHASES = {
+    'pre_production': 'pre_production_batch',
+    'production': 'production_batch'}
+
+_worker = {}
+
+
+def _init_worker(model_class, loader_factory, logger, output,
+                 store_path, model_kwargs):
+    _worker.clear()
+    _worker['ml'] = loader_factory()
+    _worker['models'] = {}
+    _worker['model_class'] = model_class
+    _worker['args'] = (logger, output)
+    _worker['kwargs'] = dict(model_kwargs)
+    if store_path is not None:
+        _worker['kwargs']['store'] = teamstore.TeamArgumentsStore(store_path)
+
+
+def _worker_model(team):
+    models = _worker['models']
+    if team not in models:
+        models[team] = _worker['model_class'](
+            _worker['ml'], team, *_worker['args'], **_worker['kwargs'])
+    return models[team]
+
+
+def _run_one(task):
+    try:
+        value = getattr(_worker_model(task.team), task.phase)(*task.params)
+    except ModelError as e:
+        return Result(None, e, None)
+    except Exception:
+        return Result(None, None, traceback.format_exc())
+    return Result(value, None, None)
+
+
+def _batch_result(value, error):
+    '''
+    The Result of one (value, exception or None) item of a batch
+    '''
+    if error is None:
+        return Result(value, None, None)
+    if isinstance(error, ModelError):
+        return Result(None, error, None)
+    return Result(None, None, ''.join(traceback.format_exception(
+        type(error), error, error.__traceback__)))
+
+
+def _run_group(tasks):
+    '''
+    Tasks of one team and phase go through the model batch method,
+    a crash inside the batch falls back to running them one by one
+    '''
+    if len(tasks) == 1 or tasks[0].phase not in BATCH_PHASES:
+        return [_run_one(task) for task in tasks]
+    try:
+        batch = getattr(_worker_model(tasks[0].team),
+                        BATCH_PHASES[tasks[0].phase])
+        return [_batch_result(value, error)
+                for value, error in batch([task.params for task in tasks])]
+    except Exception:
+        return [_run_one(task) for task in tasks]
+
+
+def _run_chunk(chunk):
+    results = []
+    for _, group in itertools.groupby(
+            chunk, key=lambda task: (task.team, task.phase)):
+        results.extend(_run_group(list(group)))
+    return results
+
+
+def chunks(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class ScoringRunner(object):
+    def __init__(self, model_class, loader_factory, workers=None,
+                 chunksize=64, logger=None, output=None, store_path=None,
+                 **model_kwargs):
+        '''
+        Parameters:
+            model_class     AbstractModel subclass
+            loader_factory  picklable callable making the model loader,
+                            called once in every worker
+            workers     number of processes, os.cpu_count() by default
+            chunksize   tasks sent to a worker at once
+            store_path  teamstore.TeamArgumentsStore file for the workers
+            model_kwargs    picklable model keyword arguments
+        '''
+        self.model_class = model_class
+        self.workers = workers or os.cpu_count() or 1
+        self.chunksize = chunksize
+        self.initargs = (model_class, loader_factory, logger, output,
+                         store_path, model_kwargs)
+
+    def run(self, tasks):
+        '''
+        Run the Task stream, results are yielded in the tasks order.
+        Only a few chunks per worker are in flight, so the stream
+        is not read ahead of the results.
+        '''
+        with concurrent.futures.ProcessPoolExecutor(
+                self.workers, initializer=_init_worker,
+                initargs=self.initargs) as executor:
+            max_pending = 2 * self.workers
+            pending = deque()
+            for chunk in chunks(tasks, self.chunksize):
+                pending.append(executor.submit(_run_chunk, chunk))
+                if len(pending) >= max_pending:
+                    for result in pending.popleft().result():
+                        yield result
+            while pending:
+                for result in pending.popleft().result():
+                    yield result
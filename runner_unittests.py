@@ -0,0 +1,59 @@
+import functools
+import unittest
+
+from abstractmodel import AbstractModel
+from errors import ModelError
+from mockloader import MockModelLoader
+import runner
+
+# picklable loader factory of the workers
+LOADER = functools.partial(MockModelLoader, allow_unknown=True)
+
+
+class MockModel(AbstractModel):
+    def __init__(self, ml, team, logger, output, **kwargs):
+        AbstractModel.__init__(self, ml, self.__class__.__name__,
+                               team, logger, output, **kwargs)
+
+    def simulate_pre_production(self, input_params, model_params,
+                                components):
+        x = model_params['x']
+        if x < 0:
+            raise ModelError('x < 0')
+        if x == 13:
+            raise ZeroDivisionError
+        return {'team': self.team}, {'quality': x}
+
+
+class CheckScoringRunner(unittest.TestCase):
+    def test_run(self):
+        tasks = [runner.Task('team{}'.format(i % 3), 'pre_production',
+                             ({}, {'x': i - 5}, {}))
+                 for i in range(100)]
+        results = list(runner.ScoringRunner(
+            MockModel, LOADER, workers=2, chunksize=7).run(tasks))
+        self.assertEqual(len(results), len(tasks))
+        for i, result in enumerate(results):
+            x = i - 5
+            if x < 0:
+                self.assertIsInstance(result.error, ModelError)
+                self.assertIsNone(result.crash)
+            elif x == 13:
+                self.assertIn('ZeroDivisionError', result.crash)
+                self.assertIsNone(result.error)
+            else:
+                self.assertEqual(result.value,
+                                 ({'team': 'team{}'.format(i % 3)},
+                                  {'quality': x}))
+
+    def test_phases(self):
+        tasks = [runner.Task('foo', 'team_arguments', ({},)),
+                 runner.Task('foo', 'production',
+                             ({}, {}, {'quality': 3}, {}))]
+        results = list(runner.ScoringRunner(
+            MockModel, LOADER, workers=1).run(tasks))
+        self.assertEqual([r.value for r in results], [{}, {'quality': 3}])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+# -*- coding: UTF-8 -*-
+"""
+Declarative validation of the model parameters.
+
+A model declares its parameters once as Field lists, compile_schema
+turns them into a validator making the clean dict in a single pass:
+every value is converted once and then checked against its range.
+
+    validate = compile_schema(
+        Field('revolution_period', utils.to_int, low=0, strict=True,
+              message='Период обращения должен быть больше 0.'))
+    validate({'revolution_period': '90'}) -> {'revolution_period': 90}
+"""
+from errors import ModelError
+import utils
+
+
+def keep(param):
+    return param
+
+
+def is_true(param):
+    return param == 'True'
+
+
+class Field(object):
+    def __init__(self, name, convert=utils.to_float, low=None, high=None,
+                 strict=False, choices=None, message=None, required=True):
+        '''
+        Parameters:
+            name    parameter name
+            convert     function making the clean value,
+                        utils.to_float by default
+            low, high   allowed range of the clean value, None for no limit
+            strict      whether the range borders are excluded
+            choices     allowed raw values
+            message     ModelError text for the values out of range
+            required    whether a missing parameter is an error (KeyError)
+                        or just skipped
+        '''
+        self.name = name
+        self.convert = convert
+        self.low = low
+        self.high = high
+        self.strict = strict
+        self.choices = None if choices is None else frozenset(choices)
+        self.message = message
+        self.required = required
+
+    def out_of_range(self):
+        '''
+        Compile the range check into a predicate, None if not needed
+        '''
+        low, high = self.low, self.high
+        if low is None and high is None:
+            return None
+        if self.strict:
+            if high is None:
+                return lambda value: value <= low
+            if low is None:
+                return lambda value: value >= high
+            return lambda value: not low < value < high
+        if high is None:
+            return lambda value: value < low
+        if low is None:
+            return lambda value: value > high
+        return lambda value: not low <= value <= high
+
+
+class Schema(object):
+    '''
+    The single pass validator of the fields, made by compile_schema.
+    It is an object rather than a function so it can be kept
+    as a model class attribute.
+    '''
+    def __init__(self, fields):
+        self.fields = tuple(fields)
+        self._steps = tuple(
+            (field.name, field.convert, field.choices, field.out_of_range(),
+             field.message, field.required)
+            for field in self.fields)
+
+    def __call__(self, params):
+        clean_params = {}
+        for (name, convert, choices, out_of_range,
+                message, required) in self._steps:
+            if not required and name not in params:
+                continue
+            value = params[name]
+            if choices is not None and value not in choices:
+                raise ModelError(message)
+            value = convert(value)
+            if out_of_range is not None and out_of_range(value):
+                raise ModelError(message)
+            clean_params[name] = value
+        return clean_params
+
+
+def compile_schema(*fields):
+    '''
+    Make the single pass validator of the fields
+    Return value:
+        Schema, schema(params) -> clean params dict
+    Possible exceptions of the validator:
+        ModelError - the value is wrong
+        KeyError - the required parameter is missing
+    '''
+    return Schema(fields)
@@ -0,0 +1,73 @@
+# -*- coding: UTF-8 -*-
+import unittest
+
+import chem1
+from errors import ModelError
+import globalnav
+from mockloader import MockModelLoader
+from schema import compile_schema, Field, is_true, keep
+
+
+class CheckSchema(unittest.TestCase):
+    def test_convert(self):
+        validate = compile_schema(
+            Field('a'), Field('b', keep), Field('c', is_true),
+            Field('d', required=False))
+        self.assertEqual(validate({'a': '1,5', 'b': 'x', 'c': 'True'}),
+                         {'a': 1.5, 'b': 'x', 'c': True})
+        self.assertRaises(KeyError, validate, {'a': '1'})
+        self.assertRaises(ModelError, validate,
+                          {'a': 'x', 'b': 'x', 'c': 'True'})
+
+    def test_range(self):
+        for field, good, bad in (
+                (Field('x', low=0, message='m'), (0, 1), (-1,)),
+                (Field('x', low=0, strict=True, message='m'), (1,), (0, -1)),
+                (Field('x', high=5, message='m'), (5, -1), (6,)),
+                (Field('x', low=0, high=90, strict=True, message='m'),
+                 (1, 89), (0, 90, 100)),
+                (Field('x', low=0, high=1, message='m'), (0, 1), (-1, 2))):
+            validate = compile_schema(field)
+            for value in good:
+                self.assertEqual(validate({'x': value}), {'x': value})
+            for value in bad:
+                with self.assertRaises(ModelError) as cm:
+                    validate({'x': value})
+                self.assertEqual(cm.exception.value, 'm')
+
+    def test_choices(self):
+        validate = compile_schema(
+            Field('x', keep, choices=['True'], message='m'))
+        self.assertEqual(validate({'x': 'True'}), {'x': 'True'})
+        self.assertRaises(ModelError, validate, {'x': 'False'})
+
+
+class CheckModelSchemas(unittest.TestCase):
+    def test_globalnav(self):
+        model = globalnav.GlobalNav(MockModelLoader(), 'foo', 'logger', 'out')
+        self.assertEqual(
+            model.validate_pre_production(
+                {'revolution_period': '100', 'orbital_inclination': '45'},
+                {'orbit_radius': '7000', 'pos_crit_accel': '8,1',
+                 'neg_crit_accel': '8.9', 'permissible_variation': '5'},
+                {'critical_errors_control': 'True',
+                 'security_quality': '10'}),
+            ({'revolution_period': 100, 'orbital_inclination': 45},
+             {'orbit_radius': 7000., 'pos_crit_accel': 8.1,
+              'neg_crit_accel': 8.9, 'permissible_variation': 5},
+             {'critical_errors_control': 'True', 'security_quality': 10}))
+        self.assertRaises(
+            ModelError, model.validate_input_params,
+            {'revolution_period': '100', 'orbital_inclination': '90'})
+
+    def test_chem1(self):
+        model = chem1.OxygenRegeneration(MockModelLoader(), 'foo',
+                                         'logger', 'out')
+        self.assertEqual(model.validate_components({'water_quality': '50'}),
+                         {'water_quality': .5})
+        self.assertRaises(ModelError, model.validate_components,
+                          {'water_quality': '100'})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,117 +1,267 @@
 # -*- coding: UTF-8 -*-
 
+from collections import namedtuple
+import functools
 import random
+import re
 
 import numpy
 
 from abstractmodel import AbstractModel
 from errors import ModelError
+from schema import compile_schema, Field, is_true
 import utils
 
 
-S_MATRIXES = map(numpy.matrix, (
-    ' .13,  .78, -.61;  .93,  .13,  .35;  .35, -.61, -.71',
-    '-.92,  .18,  .35; -.31, -.88, -.35;  .25, -.43,  .87',
-    ' .53, -.81,  .25;  .81,  .40, -.43;  .25,  .43,  .87',
-    '-.44, -.79, -.43; -.66, -.05,  .75; -.61,  .61, -.50',
-    '-.05,  .79,  .61; -.66,  .44, -.61; -.75, -.43,  .50'))
+S_MATRIX_VALUES = (
+    (( .13,  .78, -.61), ( .93,  .13,  .35), ( .35, -.61, -.71)),  # noqa
+    ((-.92,  .18,  .35), (-.31, -.88, -.35), ( .25, -.43,  .87)),  # noqa
+    (( .53, -.81,  .25), ( .81,  .40, -.43), ( .25,  .43,  .87)),  # noqa
+    ((-.44, -.79, -.43), (-.66, -.05,  .75), (-.61,  .61, -.50)),  # noqa
+    ((-.05,  .79,  .61), (-.66,  .44, -.61), (-.75, -.43,  .50)))  # noqa
 ROTATIONS = (
     (30, 135, 60), (210, 330, 45), (150, 30, 210),
     (225, 120, 30), (120, 300, 45))
 U_DOMAINS = ('[90;180]', '[270;360]', '[0;90]', '[90;180]', '[270;360]')
-ROTATION_PACKS = zip(S_MATRIXES, ROTATIONS, U_DOMAINS)
-ROTATION_PACKS = [{
-    's_matrix': rp[0],
-    'rotation_angles': rp[1],
-    'u_domain': rp[2]}
-    for rp in ROTATION_PACKS]
-
-
-def random_vect(left=-100, right=100):
-    rnd_vect = [random.randint(left, right) for _ in range(3)]
-    return numpy.matrix(rnd_vect).T
+POINT_SEPARATORS = re.compile(r'[\s,;\[\]]+')
+
+# The two packages of many teams: packs (teams, 2) - indexes of
+# rotation_packs(), real_points and cypher_points (teams, 2, 3, 3),
+# crooked_cyphers (teams, 2, 3)
+Packages = namedtuple(
+    'Packages', 'packs real_points cypher_points crooked_cyphers')
+
+
+@functools.lru_cache(maxsize=None)
+def s_matrixes():
+    '''
+    (5, 3, 3) array of S_MATRIX_VALUES, built on the first call
+    '''
+    matrixes = numpy.array(S_MATRIX_VALUES)
+    matrixes.flags.writeable = False
+    return matrixes
+
+
+@functools.lru_cache(maxsize=None)
+def rotation_packs():
+    matrixes = s_matrixes()
+    return tuple({
+        's_matrix': matrixes[i],
+        'rotation_angles': ROTATIONS[i],
+        'u_domain': U_DOMAINS[i]}
+        for i in range(len(matrixes)))
+
+
+def random_vect(left=-100, right=100, rng=random):
+    return numpy.array([rng.randint(left, right) for _ in range(3)])
+
+
+def cypher(s_matrixes, real_points):
+    '''
+    Rotate the points of one (3, 3) or many (N, 3, 3) packages at once,
+    every row of real_points is a point
+    '''
+    return numpy.einsum('...ij,...kj->...ki', s_matrixes, real_points)
+
+
+def point_text(point):
+    '''
+    The column text of a point, as it is shown to the players
+        [[ 1]
+         [-2]
+         [ 3]]
+    '''
+    return str(numpy.reshape(point, (-1, 1)))
+
+
+def parse_point(text):
+    '''
+    Parse the point from its column text or any list of numbers
+    '''
+    values = [v for v in POINT_SEPARATORS.split(str(text)) if v]
+    try:
+        if len(values) != 3:
+            raise ValueError
+        return numpy.array([float(v) for v in values])
+    except ValueError:
+        raise ModelError(
+            "Не могу преобразовать {text} в координаты точки.".format(
+                text=text))
+
+
+def team_pack_indexes(team_num):
+    '''
+    Indexes of the team rotation packs, the ones the team got
+    with the global random seeded by team_specific_num
+    '''
+    indexes = list(range(len(ROTATIONS)))
+    random.Random(team_num).shuffle(indexes)
+    return indexes[:2]
+
+
+def draw_package_points(rng):
+    '''
+    The random part of the team packages, drawn in the order
+    the Package objects of generate_team_arguments drew it
+    Return value:
+        (2, 3, 3) real points, (2, 3) crooked cyphers
+    '''
+    first_points = [random_vect(rng=rng) for _ in range(3)]
+    first_crooked_cyphers = random_vect(-10000, 10000, rng) / 100.
+    second_points = [random_vect(rng=rng) for _ in range(2)]
+    second_points.append(
+        second_points[rng.randint(0, 1)] * rng.randint(2, 5))
+    second_crooked_cyphers = random_vect(-10000, 10000, rng) / 100.
+    return (numpy.array([first_points, second_points]),
+            numpy.array([first_crooked_cyphers, second_crooked_cyphers]))
+
+
+def generate_packages(pack_indexes, rngs):
+    '''
+    Draw the packages of many teams and cypher them all at once
+    Arguments:
+        pack_indexes - team_pack_indexes of every team
+        rngs - random.Random of every team
+    Return value:
+        Packages
+    '''
+    packs = numpy.asarray(pack_indexes, dtype=int).reshape(-1, 2)
+    real_points = numpy.zeros((len(packs), 2, 3, 3), dtype=int)
+    crooked_cyphers = numpy.zeros((len(packs), 2, 3))
+    for i, rng in enumerate(rngs):
+        real_points[i], crooked_cyphers[i] = draw_package_points(rng)
+    return Packages(packs, real_points,
+                    cypher(s_matrixes()[packs], real_points), crooked_cyphers)
+
+
+def team_packages(models, input_params):
+    '''
+    The Packages of the Security models of many teams,
+    the same the team_arguments of every model show
+    '''
+    return generate_packages(
+        [model.team_pack_indexes() for model in models],
+        [model.team_random(input_params) for model in models])
+
+
+def encode_packages(packages):
+    '''
+    Packages as JSON data, plain lists of the numbers
+    '''
+    return dict((name, array.tolist())
+                for name, array in packages._asdict().items())
+
+
+def decode_packages(data):
+    '''
+    Packages of the encode_packages data
+    '''
+    return Packages(
+        numpy.asarray(data['packs'], dtype=int).reshape(-1, 2),
+        numpy.asarray(data['real_points'], dtype=int).reshape(-1, 2, 3, 3),
+        numpy.asarray(data['cypher_points'],
+                      dtype=float).reshape(-1, 2, 3, 3),
+        numpy.asarray(data['crooked_cyphers'], dtype=float).reshape(-1, 2, 3))
+
+
+def parse_points(texts):
+    '''
+    Parse many points at once, like parse_point
+    Return value:
+        (len(texts), 3) array
+    '''
+    values = [[v for v in POINT_SEPARATORS.split(str(text)) if v]
+              for text in texts]
+    if all(len(point) == 3 for point in values):
+        try:
+            return numpy.array(values, dtype=float).reshape(-1, 3)
+        except ValueError:
+            pass
+    # parse_point raises the ModelError of the first wrong point,
+    # the points it takes are returned like the ones above
+    return numpy.array(
+        [parse_point(text) for text in texts], dtype=float).reshape(-1, 3)
 
 
 class Package(object):
-    def __init__(self, rotation_pack, real_points=None):
+    def __init__(self, rotation_pack, real_points=None, rng=random):
         self.rotation_pack = rotation_pack
 
         if real_points is None:
-            self.real_points = [random_vect() for _ in range(3)]
+            self.real_points = numpy.array(
+                [random_vect(rng=rng) for _ in range(3)])
         else:
-            self.real_points = real_points
+            self.real_points = numpy.asarray(real_points)
         self.cypher_points = self._cypher_points()
-        self.crooked_cyphers = self._crooked_cyphers()
+        self.crooked_cyphers = self._crooked_cyphers(rng)
 
     def _cypher_points(self):
-        return map(lambda x: self.rotation_pack['s_matrix'] * x,
-                   self.real_points)
+        return cypher(self.rotation_pack['s_matrix'], self.real_points)
 
-    def _crooked_cyphers(self):
-        crooked_cyphers = random_vect(-10000, 10000) / 100.
+    def _crooked_cyphers(self, rng=random):
+        crooked_cyphers = random_vect(-10000, 10000, rng) / 100.
         return crooked_cyphers
 
 
 class Security(AbstractModel):
-    def __init__(self, ml, team, logger, output):
-        AbstractModel.__init__(self, ml, self.__class__.__name__,
-                               team, logger, output)
+    input_params_schema = compile_schema(
+        Field('error_control', is_true, choices=['True', 'False'], message=(
+            'Что-то пошло не так с галочкой модуля '
+            'контроля критических помех.')))
 
-    def validate_input_params(self, input_params):
-        if input_params['error_control'] not in ('True', 'False'):
-            raise ModelError(
-                'Что-то пошло не так с галочкой модуля '
-                'контроля критических помех.')
-        return {'error_control': input_params['error_control'] == 'True'}
+    def __init__(self, ml, team, logger, output, **kwargs):
+        AbstractModel.__init__(self, ml, self.__class__.__name__,
+                               team, logger, output, **kwargs)
 
-    def team_arguments_without_control(self, first_package):
+    def team_arguments_without_control(self, packages, team=0):
+        '''
+        The first package of the team-th team of the Packages
+        '''
+        real_points = packages.real_points[team, 0]
+        cypher_points = packages.cypher_points[team, 0]
         return {
-            'user_point': str(first_package.real_points[0]),
-            'first_key': str(first_package.real_points[1]),
-            'second_key': str(first_package.real_points[2]),
-            'cyphered_user_point': str(first_package.cypher_points[0]),
-            'first_cyphered_key': str(first_package.cypher_points[1]),
-            'second_cyphered_key': str(first_package.cypher_points[2]),
-            'u_domain': first_package.rotation_pack['u_domain'],
-            # 'rotation_agnles': first_package.rotation_pack['rotation_angles'],  # noqa
+            'user_point': point_text(real_points[0]),
+            'first_key': point_text(real_points[1]),
+            'second_key': point_text(real_points[2]),
+            'cyphered_user_point': point_text(cypher_points[0]),
+            'first_cyphered_key': point_text(cypher_points[1]),
+            'second_cyphered_key': point_text(cypher_points[2]),
+            'u_domain': U_DOMAINS[packages.packs[team, 0]],
+            # 'rotation_agnles': ROTATIONS[packages.packs[team, 0]],
         }
 
-    def team_arguments_with_control(self, first_package, second_package):
-        first_package_args = self.team_arguments_without_control(first_package)
+    def team_arguments_with_control(self, packages, team=0):
+        first_package_args = self.team_arguments_without_control(
+            packages, team)
 
+        real_points = packages.real_points[team, 1]
+        crooked_cyphers = packages.crooked_cyphers[team, 1]
         second_package_args = {
-            'user_point': str(second_package.real_points[0]),
-            'first_key': str(second_package.real_points[1]),
-            'second_key': str(second_package.real_points[2]),
-            'cyphered_user_point': str(second_package.crooked_cyphers[0]),
-            'first_cyphered_key': str(second_package.crooked_cyphers[1]),
-            'second_cyphered_key': str(second_package.crooked_cyphers[2]),
-            'u_domain': second_package.rotation_pack['u_domain']}
+            'user_point': point_text(real_points[0]),
+            'first_key': point_text(real_points[1]),
+            'second_key': point_text(real_points[2]),
+            'cyphered_user_point': point_text(crooked_cyphers[0]),
+            'first_cyphered_key': point_text(crooked_cyphers[1]),
+            'second_cyphered_key': point_text(crooked_cyphers[2]),
+            'u_domain': U_DOMAINS[packages.packs[team, 1]]}
 
         return {'first_package': first_package_args,
                 'second_package': second_package_args}
 
-    def team_arguments(self, input_params):
-        AbstractModel.team_arguments(self, input_params)
-
-        random.seed(self.team_specific_num)
-        rotation_packs = ROTATION_PACKS[:]
-        random.shuffle(rotation_packs)
-        first_rotation_pack, second_rotation_pack = rotation_packs[:2]
-        random.seed()
+    def team_pack_indexes(self):
+        return team_pack_indexes(self.team_specific_num())
 
-        first_package = Package(first_rotation_pack)
+    def team_rotation_packs(self):
+        packs = rotation_packs()
+        return [packs[i] for i in self.team_pack_indexes()]
 
-        points = [random_vect() for _ in range(2)]
-        points.append(points[random.randint(0, 1)] * random.randint(2, 5))
-        second_package = Package(
-            second_rotation_pack, real_points=points)
+    def generate_team_arguments(self, input_params, rng):
+        packages = generate_packages([self.team_pack_indexes()], [rng])
 
         clean_input_params = self.validate_input_params(input_params)
         if clean_input_params['error_control']:
-            return self.team_arguments_with_control(
-                first_package, second_package)
-        return self.team_arguments_without_control(first_package)
+            return self.team_arguments_with_control(packages)
+        return self.team_arguments_without_control(packages)
 
     def _max_angle_diff(self, first_angles, second_angles):
         max_angle_diff = max(map(
@@ -131,6 +281,7 @@ class Security(AbstractModel):
                 phi - in degrees
         '''
         clean_model_params = {}
+        points = []
         for key, val in model_params.items():
             if key == 'single_solution':
                 clean_model_params[key] = (val == 'True')
@@ -139,26 +290,19 @@ class Security(AbstractModel):
             elif key == 'u_domain':
                 pass
             else:
-                clean_model_params[key] = numpy.matrix(val).T
+                points.append(val)
+        # the points are only checked, the score is made of the angles
+        parse_points(points)
 
         player_angles = [
             clean_model_params['psi'],
             clean_model_params['u'],
             clean_model_params['phi']]
 
-        random.seed(self.team_specific_num)
-        rotation_packs = ROTATION_PACKS[:]
-        first_rotation_pack, second_rotation_pack = random.shuffle(
-            rotation_packs)[:2]
-        random.seed()
-        real_points = [
-            clean_model_params['user_point'],
-            clean_model_params['first_key'],
-            clean_model_params['second_key']]
-        first_package = Package(first_rotation_pack, real_points=real_points)
+        first_rotation_pack = self.team_rotation_packs()[0]
 
         max_angle_diff, work_correctness = self._max_angle_diff(
-            player_angles, first_package.rotation_pack['rotation_angles'])
+            player_angles, first_rotation_pack['rotation_angles'])
 
         quality = 100 - 10 * max_angle_diff
 
@@ -188,6 +332,7 @@ class Security(AbstractModel):
                     single_solution - True / False
         '''
         clean_model_params = {'first_package': {}, 'second_package': {}}
+        points = []
         for pack_name, pack_dict in clean_model_params.items():
             for key, val in model_params[pack_name].items():
                 if key == 'single_solution':
@@ -197,7 +342,9 @@ class Security(AbstractModel):
                 elif key == 'u_domain':
                     pass
                 else:
-                    pack_dict[key] = numpy.matrix(val).T
+                    points.append(val)
+        # the points are only checked, the score is made of the angles
+        parse_points(points)
 
         first_pack_answers = clean_model_params['first_package']
         second_pack_answers = clean_model_params['second_package']
@@ -210,30 +357,14 @@ class Security(AbstractModel):
 
         if (first_pack_answers['single_solution'] and
                 not second_pack_answers['single_solution']):
-            short_model_params = model_params['first_package']
+            short_model_params = dict(model_params['first_package'])
             short_model_params.pop('single_solution')
             answer = self.pre_production_without_control(short_model_params)
-            if answer['work_correctness'] == 'OK':
-                answer['critical_error_handling'] = 'high'
+            if answer[0]['work_correctness'] == 'OK':
+                answer[0]['critical_error_handling'] = 'high'
             return answer
 
-        random.seed(self.team_specific_num)
-        rotation_packs = ROTATION_PACKS[:]
-        first_rotation_pack, second_rotation_pack = random.shuffle(
-            rotation_packs)[:2]
-        random.seed()
-        first_real_points = [
-            clean_model_params['first_package']['user_point'],
-            clean_model_params['first_package']['first_key'],
-            clean_model_params['first_package']['second_key']]
-        second_real_points = [
-            clean_model_params['second_package']['user_point'],
-            clean_model_params['second_package']['first_key'],
-            clean_model_params['second_package']['second_key']]
-        first_package = Package(first_rotation_pack,
-                                real_points=first_real_points)
-        second_package = Package(second_rotation_pack,
-                                 real_points=second_real_points)
+        first_rotation_pack, second_rotation_pack = self.team_rotation_packs()
 
         player_angles = [
             first_pack_answers['psi'],
@@ -244,8 +375,8 @@ class Security(AbstractModel):
             second_pack_answers['phi']]
 
         computed_angles = (
-            first_package.rotation_pack['rotation_angles'] +
-            second_package.rotation_pack['rotation_angles'])
+            first_rotation_pack['rotation_angles'] +
+            second_rotation_pack['rotation_angles'])
 
         max_angle_diff, work_correctness = self._max_angle_diff(
             player_angles, computed_angles)
@@ -271,32 +402,24 @@ class Security(AbstractModel):
 
         return (open_interm_params, {'quality': quality})
 
-    def pre_production(self, input_params, model_params, components):
+    def simulate_pre_production(self, clean_input_params, model_params,
+                                components):
         '''
             input_params:
                 error_control - ('True', 'False')
             model_params are described in related functions
             no components
         '''
-        AbstractModel.pre_production(
-            self, input_params, model_params, components)
-        clean_input_params = self.validate_input_params(input_params)  # noqa
-
         if clean_input_params['error_control']:
             interm_params = self.pre_production_with_control(model_params)
         else:
             interm_params = self.pre_production_without_control(model_params)
 
-        self.ml.check_interm_params(self.model, *interm_params)
         return interm_params
 
-    def production(self, input_params, interm_params,
-                   hidden_params, components):
-        AbstractModel.production(
-            self, input_params, interm_params, hidden_params, components)
-        output_params = {
+    def simulate_production(self, input_params, interm_params,
+                            hidden_params, components):
+        return {
             'critical_error_handling':
             interm_params['critical_error_handling'],
             'quality': hidden_params['quality']}
-        self.ml.check_output_params(self.model, output_params)
-        return output_params
@@ -1,23 +1,7 @@
 from security import Security
+from mockloader import MockModelLoader
 
-
-class MockML(object):
-    def check_model(self, model):
-        pass
-
-    def check_input_params(self, model, input_params):
-        pass
-
-    def check_model_params(self, model, model_params):
-        pass
-
-    def check_components(self, model, components):
-        pass
-
-    def check_interm_params(self, model, interm_params, hidden_params):
-        pass
-
-ml = MockML()
+ml = MockModelLoader()
 
 s = Security(ml, 'foo', 'logger', 'out')
 inp = {'error_control': 'False'}
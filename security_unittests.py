@@ -0,0 +1,117 @@
+import json
+import random
+import unittest
+from unittest import mock
+
+import numpy
+
+from errors import ModelError
+from mockloader import MockModelLoader
+import security
+
+
+class CheckCypher(unittest.TestCase):
+    def test_package(self):
+        rotation_pack = security.rotation_packs()[2]
+        package = security.Package(rotation_pack)
+        self.assertEqual(package.real_points.shape, (3, 3))
+        for point, cypher_point in zip(package.real_points,
+                                       package.cypher_points):
+            numpy.testing.assert_allclose(
+                cypher_point, rotation_pack['s_matrix'].dot(point))
+
+    def test_many_packages(self):
+        s_matrixes = security.s_matrixes()[[0, 3, 4]]
+        real_points = numpy.array(
+            [[security.random_vect() for _ in range(3)] for _ in range(3)])
+        cypher_points = security.cypher(s_matrixes, real_points)
+        for i in range(3):
+            numpy.testing.assert_allclose(
+                cypher_points[i],
+                security.cypher(s_matrixes[i], real_points[i]))
+
+    def test_parse_point(self):
+        point = numpy.array([-12.5, 3, 44])
+        for text in (security.point_text(point), '-12.5, 3, 44',
+                     '[-12.5, 3, 44]'):
+            numpy.testing.assert_array_equal(
+                security.parse_point(text), point)
+        for text in ('1, 2', 'a, b, c'):
+            self.assertRaises(ModelError, security.parse_point, text)
+        texts = [security.point_text(point), '1, 2, 3']
+        numpy.testing.assert_array_equal(
+            security.parse_points(texts), [point, [1, 2, 3]])
+        self.assertEqual(security.parse_points([]).shape, (0, 3))
+        for texts in (['1, 2, 3', '1, 2'], ['1, 2'] * 3, ['1, 2, c']):
+            self.assertRaises(ModelError, security.parse_points, texts)
+
+    def test_parse_points_one_by_one(self):
+        # the points numpy does not take in bulk are parsed one by one,
+        # and returned as well
+        array = numpy.array
+        bulk = []
+
+        def no_bulk(values, *args, **kwargs):
+            if not bulk:
+                bulk.append(values)
+                raise ValueError
+            return array(values, *args, **kwargs)
+
+        with mock.patch.object(security.numpy, 'array', no_bulk):
+            points = security.parse_points(['1, 2, 3', '4 5 6'])
+        numpy.testing.assert_array_equal(points, [[1, 2, 3], [4, 5, 6]])
+        self.assertEqual(bulk, [[['1', '2', '3'], ['4', '5', '6']]])
+
+
+class CheckSecurity(unittest.TestCase):
+    def setUp(self):
+        self.model = security.Security(MockModelLoader(), 'foo',
+                                       'logger', 'out')
+
+    def test_pre_production_without_control(self):
+        team_args = self.model.team_arguments({'error_control': 'False'})
+        first_rotation_pack = self.model.team_rotation_packs()[0]
+        psi, u, phi = first_rotation_pack['rotation_angles']
+        model_params = {
+            'user_point': team_args['user_point'],
+            'first_key': team_args['first_key'],
+            'second_key': team_args['second_key'],
+            'u_domain': team_args['u_domain'],
+            'psi': str(psi), 'u': str(u), 'phi': str(phi)}
+        open_params, hidden_params = self.model.pre_production(
+            {'error_control': 'False'}, model_params, {})
+        self.assertEqual(open_params['work_correctness'], 'OK')
+        self.assertEqual(hidden_params['quality'], 100)
+        model_params['first_key'] = '1, 2'
+        self.assertRaises(ModelError, self.model.pre_production,
+                          {'error_control': 'False'}, model_params, {})
+
+    def test_team_packages(self):
+        models = [security.Security(MockModelLoader(), team, None, None)
+                  for team in ('foo', 'bar', 'baz')]
+        packages = security.team_packages(models, {'error_control': 'True'})
+        self.assertEqual(packages.real_points.shape, (3, 2, 3, 3))
+        self.assertEqual(packages.crooked_cyphers.shape, (3, 2, 3))
+        for i, model in enumerate(models):
+            self.assertEqual(
+                model.team_arguments_with_control(packages, i),
+                model.team_arguments({'error_control': 'True'}))
+            self.assertEqual(
+                [security.rotation_packs()[p] for p in packages.packs[i]],
+                model.team_rotation_packs())
+        decoded = security.decode_packages(
+            json.loads(json.dumps(security.encode_packages(packages))))
+        for name, array in packages._asdict().items():
+            numpy.testing.assert_array_equal(getattr(decoded, name), array)
+            self.assertEqual(getattr(decoded, name).dtype, array.dtype)
+
+    def test_global_random(self):
+        state = random.getstate()
+        packs = self.model.team_rotation_packs()
+        self.model.team_arguments({'error_control': 'True'})
+        self.assertEqual(random.getstate(), state)
+        self.assertEqual(self.model.team_rotation_packs(), packs)
+
+
+if __name__ == '__main__':
+    unittest.main()
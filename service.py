@@ -0,0 +1,280 @@
+"""
+Asyncio service around the models.
+
+The model phases are CPU work, so they never run on the event loop.
+Requests go through a bounded queue, the ones arriving within
+batch_window of each other are grouped by team and phase and handed
+to the model batch methods in a worker pool:
+
+    service = ModelService(lambda team: GlobalNav(ml, team, logger, output))
+    async with service:
+        interm_params, hidden_params = await service.pre_production(
+            team, input_params, model_params, components)
+
+A full queue makes the callers wait (that is the backpressure) and
+timeout bounds the whole wait of one request, queueing included.
+ServiceClient drives a service from synchronous code and tests.
+"""
+import asyncio
+from collections import namedtuple
+import concurrent.futures
+import os
+import threading
+
+from runner import BATCH_PHASES
+
+
+Request = namedtuple('Request', 'team phase params future')
+
+
+class ServiceClosed(Exception):
+    pass
+
+
+class ModelService(object):
+    def __init__(self, factory, workers=None, queue_size=1024,
+                 batch_size=64, batch_window=0.002, timeout=None,
+                 executor=None):
+        '''
+        Parameters:
+            factory     callable making the model of a team, called once
+                        per team in a worker thread
+            workers     batches run at once, os.cpu_count() by default
+            queue_size  requests waiting for a worker
+            batch_size  most requests in one batch
+            batch_window    seconds to wait for more requests
+                            before a batch is started
+            timeout     default seconds per request, None waits forever
+            executor    concurrent.futures executor for the batches,
+                        a thread pool of workers threads by default
+        '''
+        self.factory = factory
+        self.workers = workers or os.cpu_count() or 1
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        self.timeout = timeout
+        self.executor = executor
+        self._own_executor = executor is None
+        self._models = {}
+        self._models_lock = threading.Lock()
+        self._queue = None
+        self._slots = None
+        self._running = None
+        self._dispatcher = None
+        self._closed = False
+
+    def model(self, team):
+        with self._models_lock:
+            model = self._models.get(team)
+            if model is None:
+                model = self._models[team] = self.factory(team)
+            return model
+
+    async def start(self):
+        if self._dispatcher is not None:
+            return
+        if self.executor is None:
+            self.executor = concurrent.futures.ThreadPoolExecutor(
+                self.workers, thread_name_prefix='model-service')
+        self._queue = asyncio.Queue(self.queue_size)
+        self._slots = asyncio.Semaphore(self.workers)
+        self._running = set()
+        self._closed = False
+        self._dispatcher = asyncio.ensure_future(self._dispatch())
+
+    async def close(self):
+        '''
+        Finish the queued requests and stop the workers
+        '''
+        if self._dispatcher is None:
+            return
+        self._closed = True
+        await self._queue.put(None)
+        await self._dispatcher
+        if self._running:
+            await asyncio.wait(self._running)
+        # the callers that were waiting for room in the queue
+        while not self._queue.empty():
+            while not self._queue.empty():
+                request = self._queue.get_nowait()
+                if request is not None and not request.future.done():
+                    request.future.set_exception(
+                        ServiceClosed('The model service is closed'))
+            await asyncio.sleep(0)
+        self._dispatcher = None
+        if self._own_executor:
+            self.executor.shutdown()
+            self.executor = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def team_arguments(self, team, input_params, timeout=None):
+        return await self.request(team, 'team_arguments',
+                                  (input_params,), timeout)
+
+    async def pre_production(self, team, input_params, model_params,
+                             components, timeout=None):
+        return await self.request(
+            team, 'pre_production',
+            (input_params, model_params, components), timeout)
+
+    async def production(self, team, input_params, interm_params,
+                         hidden_params, components, timeout=None):
+        return await self.request(
+            team, 'production',
+            (input_params, interm_params, hidden_params, components),
+            timeout)
+
+    async def request(self, team, phase, params, timeout=None):
+        '''
+        Queue a call of the phase method of the team model and wait
+        for its result. ModelError and the model crashes are raised here,
+        asyncio.TimeoutError after timeout seconds.
+        '''
+        if self._dispatcher is None or self._closed:
+            raise ServiceClosed('The model service is not running')
+        future = asyncio.get_running_loop().create_future()
+        request = Request(team, phase, params, future)
+        if timeout is None:
+            timeout = self.timeout
+        return await asyncio.wait_for(self._enqueue(request), timeout)
+
+    async def _enqueue(self, request):
+        await self._queue.put(request)
+        return await request.future
+
+    async def _dispatch(self):
+        loop = asyncio.get_running_loop()
+        stop = False
+        while not stop:
+            await self._slots.acquire()
+            batch = [await self._queue.get()]
+            stop = self._drain(batch)
+            if not stop and len(batch) < self.batch_size and \
+                    self.batch_window:
+                await asyncio.sleep(self.batch_window)
+                stop = self._drain(batch)
+            # the timed out requests are not run at all
+            batch = [r for r in batch if r is not None and not r.future.done()]
+            if not batch:
+                self._slots.release()
+                continue
+            running = loop.run_in_executor(self.executor, self._run, batch)
+            self._running.add(running)
+            running.add_done_callback(
+                lambda f, batch=batch: self._done(f, batch))
+
+    def _drain(self, batch):
+        '''
+        Move the queued requests to the batch,
+        return True when the service is closed
+        '''
+        while batch[-1] is not None and len(batch) < self.batch_size and \
+                not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch[-1] is None
+
+    def _done(self, running, batch):
+        self._running.discard(running)
+        self._slots.release()
+        if running.cancelled():
+            results = [(None, asyncio.CancelledError())] * len(batch)
+        elif running.exception() is not None:
+            results = [(None, running.exception())] * len(batch)
+        else:
+            results = running.result()
+        for request, (value, error) in zip(batch, results):
+            if request.future.done():
+                continue
+            if error is None:
+                request.future.set_result(value)
+            else:
+                request.future.set_exception(error)
+
+    def _run(self, batch):
+        '''
+        Worker side, one result (value, exception) per request
+        '''
+        groups = {}
+        for i, request in enumerate(batch):
+            groups.setdefault((request.team, request.phase), []).append(i)
+        results = [None] * len(batch)
+        for indexes in groups.values():
+            group_results = self._run_group([batch[i] for i in indexes])
+            for i, result in zip(indexes, group_results):
+                results[i] = result
+        return results
+
+    def _run_group(self, requests):
+        phase = requests[0].phase
+        if len(requests) > 1 and phase in BATCH_PHASES:
+            try:
+                batch = getattr(self.model(requests[0].team),
+                                BATCH_PHASES[phase])
+                return batch([r.params for r in requests])
+            except Exception:
+                pass
+        return [self._run_one(r) for r in requests]
+
+    def _run_one(self, request):
+        try:
+            method = getattr(self.model(request.team), request.phase)
+            return method(*request.params), None
+        except Exception as e:
+            return None, e
+
+
+class ServiceClient(object):
+    '''
+    Blocking client running the service in its own event loop thread:
+
+        with ServiceClient(service) as client:
+            client.pre_production(team, input_params, model_params,
+                                  components)
+    '''
+    def __init__(self, service):
+        self.service = service
+        self._loop = None
+        self._thread = None
+
+    def start(self):
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever,
+                                        name='model-service-loop')
+        self._thread.daemon = True
+        self._thread.start()
+        self.call(self.service.start())
+
+    def close(self):
+        try:
+            self.call(self.service.close())
+        finally:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop.close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def call(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(
+            coroutine, self._loop).result()
+
+    def team_arguments(self, *args, **kwargs):
+        return self.call(self.service.team_arguments(*args, **kwargs))
+
+    def pre_production(self, *args, **kwargs):
+        return self.call(self.service.pre_production(*args, **kwargs))
+
+    def production(self, *args, **kwargs):
+        return self.call(self.service.production(*args, **kwargs))
@@ -0,0 +1,112 @@
+import asyncio
+import threading
+import time
+import unittest
+
+from abstractmodel import AbstractModel
+from errors import ModelError
+from mockloader import MockModelLoader
+import service
+
+
+class MockModel(AbstractModel):
+    def __init__(self, ml, team, logger, output, **kwargs):
+        AbstractModel.__init__(self, ml, self.__class__.__name__,
+                               team, logger, output, **kwargs)
+        self.batches = []
+        self.release = threading.Event()
+        self.release.set()
+
+    def pre_production_batch(self, submissions):
+        self.batches.append(len(submissions))
+        return AbstractModel.pre_production_batch(self, submissions)
+
+    def simulate_pre_production(self, input_params, model_params,
+                                components):
+        self.release.wait()
+        x = model_params['x']
+        if x < 0:
+            raise ModelError('x < 0')
+        if x == 13:
+            raise ZeroDivisionError
+        return {'team': self.team}, {'quality': x}
+
+
+def factory(team):
+    return MockModel(MockModelLoader(allow_unknown=True), team, None, None)
+
+
+class CheckModelService(unittest.TestCase):
+    def run_service(self, coroutine, **kwargs):
+        async def main():
+            async with service.ModelService(factory, **kwargs) as s:
+                return await coroutine(s)
+        return asyncio.run(main())
+
+    def test_requests(self):
+        async def requests(s):
+            results = await asyncio.gather(
+                *[s.pre_production('team{}'.format(i % 2),
+                                   {}, {'x': i + 20}, {})
+                  for i in range(20)])
+            with self.assertRaises(ModelError):
+                await s.pre_production('team0', {}, {'x': -1}, {})
+            with self.assertRaises(ZeroDivisionError):
+                await s.pre_production('team0', {}, {'x': 13}, {})
+            output = await s.production('team0', {}, {}, {'quality': 3}, {})
+            return results, output, s
+        results, output, s = self.run_service(requests, workers=2,
+                                              batch_window=0.05)
+        self.assertEqual(results, [
+            ({'team': 'team{}'.format(i % 2)}, {'quality': i + 20})
+            for i in range(20)])
+        self.assertEqual(output, {'quality': 3})
+        self.assertEqual(sum(s.model('team0').batches), 10)
+        self.assertLess(len(s.model('team0').batches), 10)
+
+    def test_timeout(self):
+        async def requests(s):
+            s.model('team0').release.clear()
+            with self.assertRaises(asyncio.TimeoutError):
+                await s.pre_production('team0', {}, {'x': 1}, {},
+                                       timeout=0.05)
+            s.model('team0').release.set()
+            return await s.pre_production('team0', {}, {'x': 2}, {})
+        self.assertEqual(self.run_service(requests)[1], {'quality': 2})
+
+    def test_backpressure(self):
+        async def requests(s):
+            s.model('team0').release.clear()
+            tasks = [asyncio.ensure_future(
+                s.pre_production('team0', {}, {'x': i}, {}))
+                for i in range(5)]
+            await asyncio.sleep(0.05)
+            # one request is running, two are queued, the rest wait
+            self.assertTrue(s._queue.full())
+            s.model('team0').release.set()
+            return await asyncio.gather(*tasks)
+        results = self.run_service(requests, workers=1, queue_size=2,
+                                   batch_size=1, batch_window=0)
+        self.assertEqual([r[1]['quality'] for r in results], list(range(5)))
+
+    def test_closed(self):
+        s = service.ModelService(factory)
+        self.assertRaises(service.ServiceClosed, asyncio.run,
+                          s.pre_production('team0', {}, {'x': 1}, {}))
+
+
+class CheckServiceClient(unittest.TestCase):
+    def test_client(self):
+        with service.ServiceClient(service.ModelService(factory)) as client:
+            start = time.time()
+            self.assertEqual(
+                client.pre_production('team0', {}, {'x': 1}, {}),
+                ({'team': 'team0'}, {'quality': 1}))
+            self.assertLess(time.time() - start, 1)
+            self.assertRaises(ModelError, client.pre_production,
+                              'team0', {}, {'x': -1}, {})
+            self.assertEqual(client.team_arguments('team0', {}), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,19 +1,23 @@
 from abstractmodel import AbstractModel
 # from errors import ModelError
+# from schema import compile_schema, Field
 # import utils
 
 
 class ITravel(AbstractModel):
-    def __init__(self, ml, team, logger, output):
-        AbstractModel.__init__(self, ml, self.__class__.__name__,
-                               team, logger, output)
+    # input_params_schema = compile_schema(Field(...), ...)
+    # model_params_schema = compile_schema(Field(...), ...)
+    # components_schema = compile_schema(Field(...), ...)
 
-    def team_arguments(self, input_params):
-        AbstractModel.team_arguments(self, input_params)
+    def __init__(self, ml, team, logger, output, **kwargs):
+        AbstractModel.__init__(self, ml, self.__class__.__name__,
+                               team, logger, output, **kwargs)
 
+    def generate_team_arguments(self, input_params, rng):
         return {}
 
-    def pre_production(self, input_params, model_params, components):
+    def simulate_pre_production(self, clean_input_params, clean_model_params,
+                                clean_components):
         '''
             input_params:
 
@@ -22,26 +26,10 @@ class ITravel(AbstractModel):
             components:
 
         '''
-        AbstractModel.pre_production(
-            self, input_params, model_params, components)
-
-        # clean_input_params = self.validate_input_params(input_params)
-        # clean_model_params = self.validate_model_params(model_params)
-        # clean_components = self.validate_components(components)
-
         quality = 0
 
         interm_params = (
             {},
             {'quality': quality})
 
-        self.ml.check_interm_params(self.model, *interm_params)
         return interm_params
-
-    def production(self, input_params, interm_params,
-                   hidden_params, components):
-        AbstractModel.production(
-            self, input_params, interm_params, hidden_params, components)
-        output_params = {'quality': hidden_params['quality']}
-        self.ml.check_output_params(self.model, output_params)
-        return output_params
@@ -0,0 +1,133 @@
+"""
+Submission records validated once for all the phases.
+
+The phases take the parameters as dicts and every phase used to parse
+the same strings again, production validating the input_params that
+team_arguments and pre_production had already validated. Params is
+the dict that keeps its clean version, so the models validate it once:
+
+    submission = Submission('GlobalNav', 'foo', input_params,
+                            model_params, components)
+    model.team_arguments(submission.input_params)
+    interm_params, hidden_params = model.pre_production(
+        *submission.pre_production_params())
+    model.production(submission.input_params, interm_params,
+                     hidden_params, submission.components)
+
+Params is a dict, so the model loader, the caches and the JSON output
+take it as they took the plain dicts.
+"""
+
+PARAM_GROUPS = ('input_params', 'model_params', 'components',
+                'interm_params', 'hidden_params')
+
+
+class Params(dict):
+    '''
+    Parameters dict remembering its clean version, the clean params
+    are shared by the phases and must not be changed. Only the changes
+    of the Params itself make it validated again, a nested dict or list
+    changed in place is not noticed: replace the value instead.
+    '''
+    __slots__ = ('_clean',)
+
+    def __init__(self, *args, **kwargs):
+        dict.__init__(self, *args, **kwargs)
+        # (validator, clean params), one tuple so the threads
+        # never see the validator of other clean params
+        self._clean = None
+
+    def __setitem__(self, key, value):
+        self._clean = None
+        dict.__setitem__(self, key, value)
+
+    def __delitem__(self, key):
+        self._clean = None
+        dict.__delitem__(self, key)
+
+    def update(self, *args, **kwargs):
+        self._clean = None
+        dict.update(self, *args, **kwargs)
+
+    def __ior__(self, other):
+        self._clean = None
+        return dict.__ior__(self, other)
+
+    def setdefault(self, key, default=None):
+        self._clean = None
+        return dict.setdefault(self, key, default)
+
+    def pop(self, *args):
+        self._clean = None
+        return dict.pop(self, *args)
+
+    def popitem(self):
+        self._clean = None
+        return dict.popitem(self)
+
+    def clear(self):
+        self._clean = None
+        dict.clear(self)
+
+    def __reduce__(self):
+        # the clean params are not worth pickling
+        return (self.__class__, (dict(self),))
+
+
+def validated(params, validate):
+    '''
+    validate(params), made once per Params and validator
+    '''
+    if type(params) is not Params:
+        return validate(params)
+    clean = params._clean
+    if clean is None or clean[0] is not validate:
+        clean = (validate, validate(params))
+        params._clean = clean
+    return clean[1]
+
+
+class Submission(object):
+    '''
+    The parameters of one submission of a team
+    '''
+    __slots__ = ('model', 'team') + PARAM_GROUPS
+
+    def __init__(self, model, team, input_params, model_params=None,
+                 components=None, interm_params=None, hidden_params=None):
+        self.model = model
+        self.team = team
+        self.input_params = as_params(input_params)
+        self.model_params = as_params(model_params)
+        self.components = as_params(components)
+        self.interm_params = as_params(interm_params)
+        self.hidden_params = as_params(hidden_params)
+
+    @classmethod
+    def from_record(cls, record):
+        '''
+        Make the Submission of an ingest record dict, the missing
+        parameter groups are empty
+        '''
+        return cls(record.get('model'), record.get('team'),
+                   *[record.get(name) or {} for name in PARAM_GROUPS])
+
+    def pre_production_params(self):
+        return self.input_params, self.model_params, self.components
+
+    def production_params(self):
+        return (self.input_params, self.interm_params, self.hidden_params,
+                self.components)
+
+    def __repr__(self):
+        return 'Submission({})'.format(', '.join(
+            '{}={!r}'.format(name, getattr(self, name))
+            for name in self.__slots__))
+
+
+def as_params(params):
+    if params is None or type(params) is Params:
+        return params
+    if isinstance(params, dict):
+        return Params(params)
+    return params
@@ -0,0 +1,90 @@
+import json
+import pickle
+import random
+import unittest
+
+import benchmark
+import itravel
+from mockloader import MockModelLoader
+from submission import Params, Submission, validated
+
+
+class CountingSchema(object):
+    def __init__(self, schema):
+        self.schema = schema
+        self.calls = 0
+
+    def __call__(self, params):
+        self.calls += 1
+        return self.schema(params)
+
+
+class CheckParams(unittest.TestCase):
+    def test_validated(self):
+        params = Params({'x': '1'})
+        validate = CountingSchema(lambda p: {'x': int(p['x'])})
+        self.assertEqual(validated(params, validate), {'x': 1})
+        self.assertIs(validated(params, validate),
+                      validated(params, validate))
+        self.assertEqual(validate.calls, 1)
+        params['x'] = '2'
+        self.assertEqual(validated(params, validate), {'x': 2})
+        params |= {'x': '5'}
+        self.assertIs(type(params), Params)
+        self.assertEqual(validated(params, validate), {'x': 5})
+        self.assertEqual(validated(params, CountingSchema(dict)), params)
+        self.assertEqual(validate.calls, 3)
+        self.assertEqual(validated({'x': '3'}, validate), {'x': 3})
+        self.assertEqual(validated({'x': '3'}, validate), {'x': 3})
+        self.assertEqual(validate.calls, 5)
+
+    def test_dict(self):
+        params = Params({'x': '1'})
+        validated(params, dict)
+        copy = pickle.loads(pickle.dumps(params))
+        self.assertIs(type(copy), Params)
+        self.assertEqual(copy, {'x': '1'})
+        self.assertEqual(json.loads(json.dumps(params)), {'x': '1'})
+
+
+class CheckSubmission(unittest.TestCase):
+    def test_from_record(self):
+        submission = Submission.from_record(
+            {'model': 'GlobalNav', 'team': 'foo', 'input_params': {'x': 1}})
+        self.assertIs(type(submission.input_params), Params)
+        self.assertEqual(submission.pre_production_params(),
+                         ({'x': 1}, {}, {}))
+        self.assertFalse(hasattr(submission, '__dict__'))
+
+    def test_phases_validate_once(self):
+        model = itravel.ITravel(MockModelLoader(), 'foo', None, None)
+        schemas = {}
+        for name in ('input_params_schema', 'model_params_schema',
+                     'components_schema'):
+            schemas[name] = CountingSchema(getattr(model, name))
+            setattr(model, name, schemas[name])
+        params = benchmark.itravel_submission(model, random.Random(0))
+        schemas['input_params_schema'].calls = 0
+
+        submission = Submission('ITravel', 'foo', *params)
+        model.team_arguments(submission.input_params)
+        interm_params, hidden_params = model.pre_production(
+            *submission.pre_production_params())
+        output_params = model.production(
+            submission.input_params, interm_params, hidden_params,
+            submission.components)
+        self.assertEqual(
+            dict((name, schema.calls) for name, schema in schemas.items()),
+            {'input_params_schema': 1, 'model_params_schema': 1,
+             'components_schema': 1})
+
+        self.assertEqual(model.pre_production(*params),
+                         (interm_params, hidden_params))
+        self.assertEqual(model.production(params[0], interm_params,
+                                          hidden_params, params[2]),
+                         output_params)
+        self.assertEqual(schemas['input_params_schema'].calls, 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+"""
+Persistent store of the team arguments.
+
+The arguments of a team are generated once and then looked up by
+(model, team, input_params), so restarts and other worker processes
+give the team the same arguments.
+"""
+import pickle
+import sqlite3
+import threading
+
+import memo
+import utils
+
+
+class TeamArgumentsStore(object):
+    def __init__(self, path=':memory:', cache_size=4096):
+        '''
+        Parameters:
+            path    sqlite database file, shared by the worker processes
+            cache_size  arguments kept in memory, the least recently
+                        used ones are read from the database again
+        '''
+        self.path = path
+        # pickled, so every caller gets its own copy of the arguments
+        self._cache = memo.ResultCache(max_entries=cache_size)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(
+            path, check_same_thread=False, isolation_level=None)
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS team_arguments ('
+            ' model TEXT NOT NULL,'
+            ' team TEXT NOT NULL,'
+            ' input_params TEXT NOT NULL,'
+            ' arguments BLOB NOT NULL,'
+            ' PRIMARY KEY (model, team, input_params))')
+
+    @staticmethod
+    def key(model, team, input_params):
+        return model, team, utils.canonical_json(input_params)
+
+    def get(self, model, team, input_params):
+        '''
+        Return value:
+            stored arguments dict or None
+        '''
+        key = self.key(model, team, input_params)
+        arguments = self._cache.get(key)
+        if arguments is not None:
+            return arguments
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT arguments FROM team_arguments'
+                ' WHERE model = ? AND team = ? AND input_params = ?',
+                key).fetchone()
+        if row is None:
+            return None
+        arguments = pickle.loads(bytes(row[0]))
+        self._cache.put(key, arguments)
+        return arguments
+
+    def get_or_create(self, model, team, input_params, create):
+        '''
+        Get the stored arguments or store the ones made by create().
+        When another process stored the arguments first its ones win.
+        '''
+        arguments = self.get(model, team, input_params)
+        if arguments is not None:
+            return arguments
+        arguments = create()
+        key = self.key(model, team, input_params)
+        with self._lock:
+            self._connection.execute(
+                'INSERT OR IGNORE INTO team_arguments VALUES (?, ?, ?, ?)',
+                key + (sqlite3.Binary(pickle.dumps(arguments, 2)),))
+        return self.get(model, team, input_params)
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
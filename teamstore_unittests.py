@@ -0,0 +1,86 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import globalnav
+import itravel
+from mockloader import MockModelLoader
+import security
+import teamstore
+
+
+class CheckTeamArgumentsStore(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'team_arguments.sqlite')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_get_or_create(self):
+        store = teamstore.TeamArgumentsStore(self.path)
+        calls = []
+
+        def create():
+            calls.append(1)
+            return {('oxygen', 'DMH'): 0.5}
+
+        for _ in range(3):
+            self.assertEqual(
+                store.get_or_create('M', 'foo', {'a': '1'}, create),
+                {('oxygen', 'DMH'): 0.5})
+        self.assertEqual(len(calls), 1)
+        self.assertIsNone(store.get('M', 'bar', {'a': '1'}))
+        self.assertIsNone(store.get('M', 'foo', {'a': '2'}))
+
+    def test_persistent(self):
+        store = teamstore.TeamArgumentsStore(self.path)
+        store.get_or_create('M', 'foo', {'a': '1', 'b': '2'}, lambda: {'x': 1})
+        store.close()
+
+        store = teamstore.TeamArgumentsStore(self.path)
+        self.assertEqual(store.get('M', 'foo', {'b': '2', 'a': '1'}),
+                         {'x': 1})
+        self.assertEqual(
+            store.get_or_create('M', 'foo', {'a': '1', 'b': '2'},
+                                lambda: {'x': 2}),
+            {'x': 1})
+
+    def test_copies(self):
+        store = teamstore.TeamArgumentsStore(self.path, cache_size=1)
+        arguments = store.get_or_create('M', 'foo', {}, lambda: {'x': [1]})
+        arguments['x'].append(2)
+        self.assertEqual(store.get('M', 'foo', {}), {'x': [1]})
+        store.get_or_create('M', 'bar', {}, lambda: {'x': [3]})
+        self.assertEqual(len(store._cache), 1)
+        self.assertEqual(store.get('M', 'foo', {}), {'x': [1]})
+
+    def test_model(self):
+        store = teamstore.TeamArgumentsStore(self.path)
+        input_params = {'dimensions': '3D', 'device_class': 'tourist'}
+        model = itravel.ITravel(MockModelLoader(), 'foo', 'logger', 'out',
+                                store=store)
+        team_args = model.team_arguments(input_params)
+        self.assertEqual(
+            store.get('ITravel', 'foo', input_params), team_args)
+
+
+class CheckDeterministicArguments(unittest.TestCase):
+    def test_same_team(self):
+        for model_class, input_params in (
+                (itravel.ITravel,
+                 {'dimensions': '3D', 'device_class': 'tourist'}),
+                (globalnav.GlobalNav,
+                 {'revolution_period': '100', 'orbital_inclination': '45'}),
+                (security.Security, {'error_control': 'True'})):
+            arguments = [
+                model_class(MockModelLoader(), team, 'logger',
+                            'out').team_arguments(input_params)
+                for team in ('foo', 'foo', 'bar')]
+            self.assertEqual(arguments[0], arguments[1])
+            self.assertNotEqual(arguments[0], arguments[2])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -4,29 +4,101 @@ Utilities for my models. You can use them too!
 
 Comments are welcome at max@goldenforests.ru
 """
+import bisect
+import functools
+import hashlib
+import json
 import random
 
 from errors import ModelError
 
+# Distinct strings remembered by to_float
+PARSE_CACHE_SIZE = 4096
+
 
 def percentage_difference(original, copy):
     return 100.0 * abs(original - copy) / original
 
 
+class QualityScale(object):
+    '''
+        diff_to_quality compiled once for quality_by_precision
+        and quality_by_precision_array
+    '''
+    def __init__(self, diff_to_quality):
+        self.diff_to_quality = tuple(
+            (max_difference, quality)
+            for max_difference, quality in diff_to_quality)
+        # The first max_difference above the difference wins, the running
+        # maximum keeps that true for the binary search
+        self.thresholds = []
+        for max_difference, _ in self.diff_to_quality:
+            self.thresholds.append(max(
+                [max_difference] + self.thresholds[-1:]))
+        self.qualities = [q for _, q in self.diff_to_quality] + [0]
+        # made by grade_array, the scales are compiled when the models
+        # are imported and most never grade an array
+        self.arrays = None
+
+    def __iter__(self):
+        return iter(self.diff_to_quality)
+
+    def grade(self, difference):
+        return self.qualities[bisect.bisect_right(self.thresholds, difference)]
+
+    def grade_array(self, differences):
+        import numpy
+        if self.arrays is None:
+            threshold_array = numpy.array(self.thresholds, dtype=float)
+            quality_array = numpy.array(self.qualities)
+            threshold_array.flags.writeable = False
+            quality_array.flags.writeable = False
+            # one tuple, so the threads never see half of the arrays
+            self.arrays = (threshold_array, quality_array)
+        threshold_array, quality_array = self.arrays
+        return quality_array[numpy.searchsorted(
+            threshold_array, differences, side='right')]
+
+
+def compile_quality(diff_to_quality):
+    if isinstance(diff_to_quality, QualityScale):
+        return diff_to_quality
+    return QualityScale(diff_to_quality)
+
+
 def quality_by_precision(original, copy, diff_to_quality):
     '''
         If you want your quality to be 20 for difference<=15%,
         10 for difference in (15%, 30%] and 0 otherwise,
         your diff_to_quality should look like ((15, 20), (30, 10))
+        or compile_quality(((15, 20), (30, 10))) if you use it often
     '''
     difference = percentage_difference(original, copy)
+    if isinstance(diff_to_quality, QualityScale):
+        return diff_to_quality.grade(difference)
     for max_difference, quality in diff_to_quality:
         if difference < max_difference:
             return quality
     return 0
 
 
+def quality_by_precision_array(originals, copies, diff_to_quality):
+    '''
+        quality_by_precision of every pair of originals and copies,
+        zero originals get 0 instead of ZeroDivisionError
+    '''
+    import numpy
+    originals = numpy.asarray(originals, dtype=float)
+    copies = numpy.asarray(copies, dtype=float)
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        differences = percentage_difference(originals, copies)
+    # nan and inf are sorted after every threshold
+    return compile_quality(diff_to_quality).grade_array(differences)
+
+
 def to_int(param):
+    if type(param) is int:
+        return param
     try:
         return int(round(to_float(param)))
     except ValueError:
@@ -35,22 +107,60 @@ def to_int(param):
                 param=param))
 
 
-def to_float(param):
-    if not param:
-        return 0.0
-    s = str(param)  # Just in case
-    s = s.replace(',', '.')
+@functools.lru_cache(maxsize=PARSE_CACHE_SIZE)
+def _parse_float(s):
     try:
-        return float(s)
+        return float(s.replace(',', '.'))
     except ValueError:
         raise ModelError(
             "Не могу преобразовать {param} в число.".format(
-                param=param))
+                param=s))
 
 
-def percentage_frame(val, min_perc=5, max_perc=15):
-    left_border = (1 - random.randint(
+def to_float(param):
+    # Most of the values are already numbers or repeated strings
+    if type(param) is float:
+        return param
+    if type(param) is int:
+        return float(param)
+    if not param:
+        return 0.0
+    return _parse_float(str(param))  # Just in case
+
+
+def to_float_array(values):
+    '''
+        Convert a whole column of values at once, the same way as to_float
+    '''
+    import numpy
+    if isinstance(values, numpy.ndarray) and values.dtype.kind in 'iuf':
+        return values.astype(float)
+    values = list(values)
+    return numpy.fromiter(
+        (to_float(v) for v in values), dtype=float, count=len(values))
+
+
+def percentage_frame(val, min_perc=5, max_perc=15, rng=random):
+    left_border = (1 - rng.randint(
         int(min_perc * 100), int(max_perc * 100)) / 10000.) * val
-    right_border = (1 + random.randint(
+    right_border = (1 + rng.randint(
         int(min_perc * 100), int(max_perc * 100)) / 10000.) * val
     return '{l} - {r}'.format(l=left_border, r=right_border)
+
+
+def canonical_json(value):
+    return json.dumps(value, sort_keys=True, separators=(',', ':'))
+
+
+def stable_digest(*values):
+    '''
+        SHA1 hex digest of the values as canonical JSON
+    '''
+    return hashlib.sha1(canonical_json(values).encode('utf-8')).hexdigest()
+
+
+def stable_hash(*values):
+    '''
+        The same non-negative integer in every process, unlike hash()
+    '''
+    return int(stable_digest(*values)[:16], 16)
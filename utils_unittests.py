@@ -0,0 +1,85 @@
+# -*- coding: UTF-8 -*-
+import random
+import unittest
+
+import numpy
+
+from errors import ModelError
+import utils
+
+
+class CheckParsing(unittest.TestCase):
+    def test_to_float(self):
+        for param, value in ((1.5, 1.5), (2, 2.), ('1,5', 1.5), ('1.5', 1.5),
+                             ('', 0.), (None, 0.), (0, 0.), (' 3 ', 3.),
+                             (numpy.float64(.1), .1)):
+            self.assertEqual(utils.to_float(param), value)
+            self.assertIs(type(utils.to_float(param)), float)
+
+    def test_to_float_error(self):
+        for _ in range(2):  # the second time the string is cached
+            with self.assertRaises(ModelError) as cm:
+                utils.to_float('abc')
+            self.assertEqual(cm.exception.value,
+                             'Не могу преобразовать abc в число.')
+        self.assertRaises(ModelError, utils.to_float, True)
+
+    def test_to_int(self):
+        for param, value in ((3, 3), (2.6, 3), ('2,4', 2), ('', 0)):
+            self.assertEqual(utils.to_int(param), value)
+            self.assertIs(type(utils.to_int(param)), int)
+        self.assertRaises(ModelError, utils.to_int, 'x')
+
+    def test_to_float_array(self):
+        params = ['1,5', 2, '', 3.25, '4']
+        numpy.testing.assert_array_equal(
+            utils.to_float_array(params),
+            [utils.to_float(p) for p in params])
+        numpy.testing.assert_array_equal(
+            utils.to_float_array(numpy.arange(3)), [0., 1., 2.])
+        self.assertEqual(utils.to_float_array(iter([])).shape, (0,))
+        self.assertRaises(ModelError, utils.to_float_array, ['1', 'x'])
+
+
+class CheckPercentageFrame(unittest.TestCase):
+    def test_rng(self):
+        frames = [utils.percentage_frame(100, rng=random.Random(1))
+                  for _ in range(2)]
+        self.assertEqual(frames[0], frames[1])
+        left, right = map(float, frames[0].split(' - '))
+        self.assertTrue(85 <= left <= 95 and 105 <= right <= 115)
+
+
+class CheckQuality(unittest.TestCase):
+    DIFF_TO_QUALITY = ((5, 25), (10, 20), (20, 15))
+
+    def test_boundaries(self):
+        scale = utils.compile_quality(self.DIFF_TO_QUALITY)
+        self.assertIs(utils.compile_quality(scale), scale)
+        self.assertEqual(list(scale), list(self.DIFF_TO_QUALITY))
+        copies = [100, 104.9, 105, 95, 110, 119, 120, 300, float('nan')]
+        expected = [25, 25, 20, 20, 15, 15, 0, 0, 0]
+        for diff_to_quality in (self.DIFF_TO_QUALITY, scale):
+            self.assertEqual(
+                [utils.quality_by_precision(100, c, diff_to_quality)
+                 for c in copies], expected)
+            self.assertEqual(utils.quality_by_precision_array(
+                [100] * len(copies), copies, diff_to_quality).tolist(),
+                expected)
+
+    def test_unsorted(self):
+        diff_to_quality = ((10, 1), (5, 2), (30, 3))
+        scale = utils.compile_quality(diff_to_quality)
+        for copy in (100, 97, 107, 120, 140):
+            self.assertEqual(
+                utils.quality_by_precision(100, copy, scale),
+                utils.quality_by_precision(100, copy, diff_to_quality))
+
+    def test_zero_original(self):
+        self.assertEqual(utils.quality_by_precision_array(
+            [0, 0, 10], [0, 1, 10], self.DIFF_TO_QUALITY).tolist(),
+            [0, 0, 25])
+
+
+if __name__ == '__main__':
+    unittest.main()